@@ -1,58 +1,163 @@
-import subprocess
+import glob
+import http.client
 import json
-from typing import List
+import os
+import socket
+import subprocess
+import time
+import urllib.parse
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
 
+DOCKER_SOCKET = os.environ.get("DOCKER_SOCKET", "/var/run/docker.sock")
+CONTAINER_PREFIX = "factorio_"
+COMPOSE_DIR = os.path.dirname(os.path.abspath(__file__))
 
-def get_local_container_ips() -> List[str]:
-    """Get IP addresses of running Factorio containers in the local Docker setup."""
-    # Get container IDs for factorio containers
-    cmd = ['docker', 'ps', '--filter', 'name=factorio_', '--format', '"{{.ID}}"']
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    container_ids = result.stdout.strip().split('\n')
-    container_ids = [id.strip('"') for id in container_ids]
 
-    if not container_ids or container_ids[0] == '':
-        print("No running Factorio containers found")
+@dataclass(frozen=True)
+class ContainerEndpoint:
+    name: str
+    address: str
+    udp_port: int  # Game port
+    tcp_port: int  # RCON port
+
+
+_cache: Optional[Tuple[float, List[ContainerEndpoint]]] = None
+
+
+class _UnixHTTPConnection(http.client.HTTPConnection):
+    def __init__(self, path: str, timeout: float):
+        super().__init__("localhost", timeout=timeout)
+        self.path = path
+
+    def connect(self):
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.settimeout(self.timeout)
+        self.sock.connect(self.path)
+
+
+def _endpoint(name: str, ports: List[Tuple[str, int]]) -> Optional[ContainerEndpoint]:
+    """Build an endpoint from a container's (protocol, host port) bindings"""
+    udp_ports = [port for protocol, port in ports if protocol == "udp"]
+    tcp_ports = [port for protocol, port in ports if protocol == "tcp"]
+    if not udp_ports or not tcp_ports:
+        return None
+    return ContainerEndpoint(name=name.lstrip("/"), address="127.0.0.1", udp_port=udp_ports[0], tcp_port=tcp_ports[0])
+
+
+def _endpoints_from_engine(timeout: float) -> List[ContainerEndpoint]:
+    """List the containers with a single request to the Docker Engine API"""
+    filters = urllib.parse.quote(json.dumps({"name": [CONTAINER_PREFIX]}))
+    connection = _UnixHTTPConnection(DOCKER_SOCKET, timeout)
+    try:
+        connection.request("GET", f"/containers/json?filters={filters}")
+        response = connection.getresponse()
+        if response.status != 200:
+            raise RuntimeError(f"Docker Engine API returned {response.status}")
+        containers = json.loads(response.read())
+    finally:
+        connection.close()
+
+    endpoints = []
+    for container in containers:
+        ports = [(port["Type"], int(port["PublicPort"])) for port in container.get("Ports", []) if "PublicPort" in port]
+        endpoint = _endpoint(container["Names"][0], ports)
+        if endpoint:
+            endpoints.append(endpoint)
+    return endpoints
+
+
+def _endpoints_from_cli(timeout: float) -> List[ContainerEndpoint]:
+    """List the containers with `docker ps`, then a single `docker inspect` of all of them"""
+    cmd = ['docker', 'ps', '--filter', f'name={CONTAINER_PREFIX}', '--format', '{{.ID}}']
+    result = subprocess.run(cmd, capture_output=True, text=True, timeout=timeout, check=True)
+    container_ids = result.stdout.split()
+    if not container_ids:
         return []
 
-    ips = []
-    udp_ports = []
-    tcp_ports = []
-    for container_id in container_ids:
-        # Get container details in JSON format
-        cmd = ['docker', 'inspect', container_id]
-        result = subprocess.run(cmd, capture_output=True, text=True)
-        container_info = json.loads(result.stdout)
+    result = subprocess.run(['docker', 'inspect', *container_ids],
+                            capture_output=True, text=True, timeout=timeout, check=True)
+    endpoints = []
+    for container_info in json.loads(result.stdout):
+        ports = []
+        for port, bindings in (container_info['NetworkSettings']['Ports'] or {}).items():
+            if bindings:
+                ports.append((port.split('/')[-1], int(bindings[0]['HostPort'])))
+        endpoint = _endpoint(container_info['Name'], ports)
+        if endpoint:
+            endpoints.append(endpoint)
+    return endpoints
 
-        # Get host ports for UDP game port
-        ports = container_info[0]['NetworkSettings']['Ports']
 
-        # Find the UDP port mapping
-        for port, bindings in ports.items():
-            if '/udp' in port and bindings:
-                udp_port = bindings[0]['HostPort']
-                udp_ports.append(int(udp_port))
+def _endpoints_from_compose(compose_dir: str = COMPOSE_DIR) -> List[ContainerEndpoint]:
+    """Read the endpoints from the most recently generated docker-compose-*.yml, without asking the daemon"""
+    import yaml
 
-            if '/tcp' in port and bindings:
-                tcp_port = bindings[0]['HostPort']
-                tcp_ports.append(int(tcp_port))
+    compose_files = glob.glob(os.path.join(compose_dir, "docker-compose-*.yml"))
+    if not compose_files:
+        return []
+    with open(max(compose_files, key=os.path.getmtime)) as f:
+        config = yaml.safe_load(f)
 
-        # Append the IP address with the UDP port to the list
-        ips.append(f"127.0.0.1")
+    endpoints = []
+    for name, service in config.get("services", {}).items():
+        ports = []
+        for mapping in service.get("ports", []):
+            # e.g 34197:34197/udp
+            mapping, _, protocol = str(mapping).partition("/")
+            ports.append((protocol or "tcp", int(mapping.split(":")[0])))
+        endpoint = _endpoint(name, ports)
+        if endpoint:
+            endpoints.append(endpoint)
+    return endpoints
 
-    # order by port number
-    udp_ports.sort(key=lambda x: int(x))
-    tcp_ports.sort(key=lambda x: int(x))
 
-    return ips, udp_ports, tcp_ports
+def get_local_container_endpoints(ttl: float = 30, timeout: float = 5, refresh: bool = False) -> List[ContainerEndpoint]:
+    """
+    Get the endpoints of the running Factorio containers, ordered by RCON port.
+
+    The Docker Engine socket is asked first, then the docker CLI. If the daemon is unreachable or slower than
+    `timeout`, the endpoints are read from the generated compose file instead. Results are cached for `ttl` seconds.
+    """
+    global _cache
+    if not refresh and _cache is not None and time.time() - _cache[0] < ttl:
+        return list(_cache[1])
 
+    endpoints = None
+    sources = [_endpoints_from_cli]
+    if os.path.exists(DOCKER_SOCKET):
+        sources.insert(0, _endpoints_from_engine)
+    for source in sources:
+        try:
+            endpoints = source(timeout)
+            break
+        except Exception as e:
+            print(f"Could not list containers with {source.__name__}: {e}")
+    if endpoints is None:
+        endpoints = _endpoints_from_compose()
+
+    endpoints.sort(key=lambda endpoint: endpoint.tcp_port)
+    _cache = (time.time(), endpoints)
+    return list(endpoints)
+
+
+def get_local_container_ips() -> Tuple[List[str], List[int], List[int]]:
+    """Get IP addresses, UDP ports and TCP ports of running Factorio containers in the local Docker setup."""
+    endpoints = get_local_container_endpoints()
+    if not endpoints:
+        print("No running Factorio containers found")
+
+    ips = [endpoint.address for endpoint in endpoints]
+    udp_ports = [endpoint.udp_port for endpoint in endpoints]
+    tcp_ports = [endpoint.tcp_port for endpoint in endpoints]
+    return ips, udp_ports, tcp_ports
 
 
 if __name__ == "__main__":
-    ips, udp_ports, tcp_ports = get_local_container_ips()
-    if ips:
+    endpoints = get_local_container_endpoints()
+    if endpoints:
         print("Local Factorio container addresses:")
-        for ip in ips:
-            print(ip)
+        for endpoint in endpoints:
+            print(f"{endpoint.name}: {endpoint.address} (udp {endpoint.udp_port}, tcp {endpoint.tcp_port})")
     else:
-        print("No local Factorio containers found.")
\ No newline at end of file
+        print("No local Factorio containers found.")
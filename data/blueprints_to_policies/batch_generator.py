@@ -0,0 +1,268 @@
+"""
+Generates programs from a directory of blueprints in parallel, replaying each on one of a pool of Factorio servers to
+verify that it builds the blueprint.
+
+    python -m data.blueprints_to_policies.batch_generator blueprints/electricity full/electricity
+    python -m data.blueprints_to_policies.batch_generator blueprints full --method analyzer --endpoints localhost:27000
+
+There is one worker process per server (the local containers, unless --endpoints are given), each taking the next
+blueprint as soon as it finishes one, so the time taken falls with the number of servers. Workers are processes
+rather than threads because FactorioInstance times programs out with SIGALRM, which only a main thread can use.
+Servers that don't answer when the run starts are left out, with a warning.
+
+Results are cached in <output_dir>/.verified.json, keyed by a hash of the blueprint's content and the method, so
+regenerating a dataset only replays blueprints that are new or have changed. Pass --retry-failed to replay those that
+failed before too (e.g after fixing the generator), or --refresh to replay every one.
+"""
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
+
+from entities import Position
+from instance import FactorioInstance
+from rcon.factorio_rcon import RCONClient
+from data.blueprints_to_policies.trajectory_generator import (create_instance, generate_trace, get_inventory,
+                                                              verify_placement, write_error_test)
+
+CACHE_FILE = ".verified.json"
+# What FactorioInstance asks a server for when connecting, which fails until a player has joined the game
+PLAYER_PROBE = "/c rcon.print(game.players[1].position)"
+
+
+def _convert_trajectory(blueprint_json: str, instance: FactorioInstance) -> Tuple[str, Callable]:
+    return generate_trace(blueprint_json, instance), lambda entities: verify_placement(entities, blueprint_json)
+
+
+def _convert_analyzer(blueprint_json: str, instance: FactorioInstance) -> Tuple[str, Callable]:
+    from data.blueprints_to_policies.blueprint_analyzer import BlueprintAnalyzer
+    analyzer = BlueprintAnalyzer(json.loads(blueprint_json))
+    return analyzer.generate_program(), analyzer.verify_placement
+
+
+def _convert_analyzer_with_connect(blueprint_json: str, instance: FactorioInstance) -> Tuple[str, Callable]:
+    from data.blueprints_to_policies.blueprint_analyzer_with_connect import BlueprintAnalyzerWithConnect
+    analyzer = BlueprintAnalyzerWithConnect(json.loads(blueprint_json))
+    return analyzer.generate_program(), analyzer.verify_placement
+
+
+# Each converts a blueprint to a program, and a check that the entities in the game after running it match the blueprint
+METHODS: Dict[str, Callable[[str, FactorioInstance], Tuple[str, Callable]]] = {
+    "trajectory": _convert_trajectory,
+    "analyzer": _convert_analyzer,
+    "connect": _convert_analyzer_with_connect,
+}
+
+
+@dataclass
+class BlueprintResult:
+    name: str  # The blueprint's path relative to the blueprints directory, without the extension
+    blueprint_hash: str
+    verified: bool
+    program: Optional[str] = None
+    error: Optional[str] = None
+    seconds: float = 0.0
+
+
+def blueprint_hash(blueprint_json: str, method: str) -> str:
+    """Identifies a blueprint's content (however its JSON is formatted), as converted by a method"""
+    canonical = json.dumps(json.loads(blueprint_json), sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(f"{method}:{canonical}".encode()).hexdigest()
+
+
+class VerificationCache:
+    """The results of replaying blueprints, by blueprint hash, persisted as JSON"""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.results: Dict[str, BlueprintResult] = {}
+        if path.exists():
+            self.results = {key: BlueprintResult(**value) for key, value in json.loads(path.read_text()).items()}
+
+    def get(self, key: str) -> Optional[BlueprintResult]:
+        return self.results.get(key)
+
+    def put(self, result: BlueprintResult):
+        self.results[result.blueprint_hash] = result
+
+    def save(self):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = self.path.with_suffix(".tmp")
+        temp_path.write_text(json.dumps({key: asdict(result) for key, result in self.results.items()}))
+        os.replace(temp_path, self.path)
+
+
+def _start_game(instance: FactorioInstance, inventory: Dict[str, int]):
+    instance.reset()
+    instance.set_inventory(**inventory)
+    instance.move_to(Position(x=0, y=0))
+
+
+def process_blueprint(instance: FactorioInstance, name: str, blueprint_json: str, method: str) -> BlueprintResult:
+    """Convert a blueprint to a program, then run it from a fresh game and check that it built the blueprint"""
+    start = time.time()
+    key = blueprint_hash(blueprint_json, method)
+    program = None
+    try:
+        inventory = get_inventory(blueprint_json)
+        # Converting can use the game (e.g the trajectory method places entities to measure them), so whatever it did
+        # is reset before the program runs, for the result not to depend on which blueprints the worker did before
+        _start_game(instance, inventory)
+        program, verify = METHODS[method](blueprint_json, instance)
+        _start_game(instance, inventory)
+
+        score, goal, result = instance.eval_with_error(program.replace("game.", ""), timeout=60)
+        if "error" in result.lower():
+            raise Exception(result)
+        verify(instance.get_entities())
+        return BlueprintResult(name=name, blueprint_hash=key, verified=True, program=program,
+                               seconds=time.time() - start)
+    except Exception as e:
+        return BlueprintResult(name=name, blueprint_hash=key, verified=False, program=program,
+                               error=str(e) or repr(e), seconds=time.time() - start)
+
+
+# The instance of this worker process
+_instance: Optional[FactorioInstance] = None
+
+
+def _start_worker(endpoints: multiprocessing.Queue):
+    global _instance
+    address, tcp_port = endpoints.get()
+    _instance = create_instance(address, tcp_port)
+
+
+def _process_in_worker(name: str, blueprint_json: str, method: str) -> BlueprintResult:
+    return process_blueprint(_instance, name, blueprint_json, method)
+
+
+def probe_endpoint(address: str, tcp_port: int, timeout: float = 10) -> None:
+    """Raise if a server doesn't answer as FactorioInstance needs it to"""
+    client = RCONClient(address, tcp_port, "factorio", timeout=timeout)
+    try:
+        if not client.send_command(PLAYER_PROBE):
+            raise ConnectionError("No player has joined the game")
+    finally:
+        client.close()
+
+
+def reachable_endpoints(endpoints: List[Tuple[str, int]]) -> List[Tuple[str, int]]:
+    """
+    The endpoints whose servers answer, in order. A worker that can't connect would break the whole process pool, so
+    servers are probed before it starts rather than by the workers.
+    """
+    with ThreadPoolExecutor(max_workers=max(len(endpoints), 1)) as executor:
+        futures = [executor.submit(probe_endpoint, address, tcp_port) for address, tcp_port in endpoints]
+    reachable = []
+    for (address, tcp_port), future in zip(endpoints, futures):
+        if future.exception():
+            print(f"Leaving out {address}:{tcp_port}, which didn't answer: {future.exception()}")
+        else:
+            reachable.append((address, tcp_port))
+    return reachable
+
+
+def find_blueprints(blueprints_dir: Path) -> Dict[str, str]:
+    """The JSON of every blueprint under a directory, by path relative to it (without the extension)"""
+    return {str(path.relative_to(blueprints_dir).with_suffix("")): path.read_text()
+            for path in sorted(blueprints_dir.rglob("*.json"))}
+
+
+def write_result(output_dir: Path, result: BlueprintResult, blueprint_json: str):
+    path = output_dir / f"{result.name}.py"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    if result.verified:
+        path.write_text(result.program)
+    else:
+        write_error_test(str(path.with_name(f"test_{path.stem}_error.py")), get_inventory(blueprint_json),
+                         path.stem.replace(" ", "_"), result.program)
+
+
+def generate(blueprints_dir: Path,
+             output_dir: Path,
+             endpoints: List[Tuple[str, int]],
+             method: str = "trajectory",
+             refresh: bool = False,
+             retry_failed: bool = False) -> List[BlueprintResult]:
+    """
+    Generate and verify programs for the blueprints under `blueprints_dir`, writing them to `output_dir` (and a test
+    reproducing the failure for each that fails). Returns the results, including those from the cache.
+    """
+    if method not in METHODS:
+        raise ValueError(f"Unknown method {method}, expected one of {sorted(METHODS)}")
+    blueprints = find_blueprints(blueprints_dir)
+    cache = VerificationCache(output_dir / CACHE_FILE)
+
+    results, pending = [], {}
+    for name, blueprint_json in blueprints.items():
+        cached = None if refresh else cache.get(blueprint_hash(blueprint_json, method))
+        if cached is None or (retry_failed and not cached.verified):
+            pending[name] = blueprint_json
+            continue
+        # A blueprint that moved (or whose program was deleted) gets its program written without being replayed
+        if cached.name != name or (cached.verified and not (output_dir / f"{name}.py").exists()):
+            cached.name = name
+            write_result(output_dir, cached, blueprint_json)
+        results.append(cached)
+    print(f"{len(results)} of {len(blueprints)} blueprints are cached, replaying {len(pending)} "
+          f"on {len(endpoints)} servers")
+    if not pending:
+        cache.save()
+        return results
+
+    endpoints = reachable_endpoints(endpoints)
+    if not endpoints:
+        raise ValueError("No servers to replay blueprints on")
+    queue = multiprocessing.Queue()
+    for endpoint in endpoints:
+        queue.put(endpoint)
+    with ProcessPoolExecutor(max_workers=min(len(endpoints), len(pending)), initializer=_start_worker,
+                             initargs=(queue,)) as executor:
+        futures = {executor.submit(_process_in_worker, name, blueprint_json, method): name
+                   for name, blueprint_json in pending.items()}
+        try:
+            for future in as_completed(futures):
+                result = future.result()
+                write_result(output_dir, result, pending[result.name])
+                cache.put(result)
+                results.append(result)
+                print(f"{'Verified' if result.verified else 'Failed'} {result.name} in {result.seconds:.1f}s"
+                      + (f": {result.error}" if result.error else ""))
+        finally:
+            # Whatever was finished is kept, even if a worker died
+            cache.save()
+
+    verified = sum(result.verified for result in results)
+    print(f"{verified} of {len(results)} blueprints verified")
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("blueprints_dir", type=Path)
+    parser.add_argument("output_dir", type=Path)
+    parser.add_argument("--method", choices=sorted(METHODS), default="trajectory")
+    parser.add_argument("--endpoints", default="",
+                        help="Comma separated address:port of the servers, instead of the local containers")
+    parser.add_argument("--retry-failed", action="store_true", help="Replay the blueprints that failed before")
+    parser.add_argument("--refresh", action="store_true", help="Replay every blueprint, ignoring the cache")
+    args = parser.parse_args()
+
+    if args.endpoints:
+        endpoints = [(address, int(port)) for address, port in
+                     (endpoint.rsplit(":", 1) for endpoint in args.endpoints.split(","))]
+    else:
+        from cluster.local.cluster_ips import get_local_container_endpoints
+        endpoints = [(endpoint.address, endpoint.tcp_port) for endpoint in get_local_container_endpoints()]
+
+    generate(args.blueprints_dir, args.output_dir, endpoints, args.method, args.refresh, args.retry_failed)
+
+
+if __name__ == "__main__":
+    main()
@@ -264,48 +264,49 @@ def analyze_blueprint(blueprint_json: str) -> str:
     analyzer = BlueprintAnalyzer(blueprint_json)
     return analyzer.generate_program(), analyzer.get_inventory()
 
-execution_dir = os.path.dirname(os.path.realpath(__file__)) + "/blueprints/misc/"
-filename = "1a. Mining" #Early Mining"
-
-# iterate over all json files in the directory
-for filename in os.listdir(execution_dir):
-    if filename.endswith(".json"):
-        # skip if the python file exists
-        if os.path.exists(execution_dir+filename.replace(".json", ".py")):
-            continue
-        with open(execution_dir+filename, "r") as f:
-            print(filename)
-            blueprint_json = f.read()
-            blueprint = json.loads(blueprint_json)
-            if len(blueprint['entities']) > 200:
-                print("Skipping large blueprint")
+if __name__ == "__main__":
+    execution_dir = os.path.dirname(os.path.realpath(__file__)) + "/blueprints/misc/"
+    filename = "1a. Mining" #Early Mining"
+
+    # iterate over all json files in the directory
+    for filename in os.listdir(execution_dir):
+        if filename.endswith(".json"):
+            # skip if the python file exists
+            if os.path.exists(execution_dir+filename.replace(".json", ".py")):
                 continue
-            analyzer = BlueprintAnalyzer(blueprint)
-            code = analyzer.generate_program()
-            inventory = analyzer.get_inventory()
-            instance = FactorioInstance(address='localhost',
-                                        bounding_box=200,
-                                        tcp_port=27000,
-                                        fast=True,
-                                        cache_scripts=False,
-                                        inventory=inventory)
-            try:
-                score, goal, result = instance.eval_with_error(code.replace("game.", ""), timeout=60)
-                if "error" in result:
-                    raise Exception(result["error"])
-            except Exception as e:
-                print(e)
-                print("Error in blueprint")
-                continue
-
-            print(code)
-            game_entities = instance.get_entities()
-            try:
-                analyzer.verify_placement(game_entities)
-            except AssertionError as e:
-                print(e)
-                print("Error in blueprint")
-                continue
-            # Write the code to a python file of the same name
-            with open(execution_dir+filename.replace(".json", ".py"), "w") as f1:
-                f1.write(code)
\ No newline at end of file
+            with open(execution_dir+filename, "r") as f:
+                print(filename)
+                blueprint_json = f.read()
+                blueprint = json.loads(blueprint_json)
+                if len(blueprint['entities']) > 200:
+                    print("Skipping large blueprint")
+                    continue
+                analyzer = BlueprintAnalyzer(blueprint)
+                code = analyzer.generate_program()
+                inventory = analyzer.get_inventory()
+                instance = FactorioInstance(address='localhost',
+                                            bounding_box=200,
+                                            tcp_port=27000,
+                                            fast=True,
+                                            cache_scripts=False,
+                                            inventory=inventory)
+                try:
+                    score, goal, result = instance.eval_with_error(code.replace("game.", ""), timeout=60)
+                    if "error" in result:
+                        raise Exception(result["error"])
+                except Exception as e:
+                    print(e)
+                    print("Error in blueprint")
+                    continue
+
+                print(code)
+                game_entities = instance.get_entities()
+                try:
+                    analyzer.verify_placement(game_entities)
+                except AssertionError as e:
+                    print(e)
+                    print("Error in blueprint")
+                    continue
+                # Write the code to a python file of the same name
+                with open(execution_dir+filename.replace(".json", ".py"), "w") as f1:
+                    f1.write(code)
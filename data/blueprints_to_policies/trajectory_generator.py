@@ -1,8 +1,8 @@
+import bisect
 import math
 import os
 import textwrap
-
-from jinja2 import Template
+from collections import defaultdict
 
 from entities import Position, BoundingBox, EntityGroup
 from instance import FactorioInstance, Direction
@@ -41,21 +41,26 @@ class EntityPriority(Enum):
     CHEST = 6
     BELT = 7
 
-instance = FactorioInstance(address='localhost',
-                                bounding_box=200,
-                                tcp_port=27000,
-                                fast = True,
-                                cache_scripts=False,
-                                inventory={
-                                    'coal': 50,
-                                    'copper-plate': 50,
-                                    'burner-mining-drill': 10,
-                                    'electric-mining-drill': 15,
-                                    'transport-belt': 50,
-                                    'stone-furnace': 10,
-                                    'small-electric-pole': 15,
-                                    'small-lamp': 10
-                                })
+# Tile dimensions by entity name. They are the same in every game, so each is only measured once per process.
+_tile_dimensions: Dict[str, Tuple[int, int]] = {}
+
+
+def create_instance(address: str = 'localhost', tcp_port: int = 27000) -> FactorioInstance:
+    return FactorioInstance(address=address,
+                            bounding_box=200,
+                            tcp_port=tcp_port,
+                            fast=True,
+                            cache_scripts=False,
+                            inventory={
+                                'coal': 50,
+                                'copper-plate': 50,
+                                'burner-mining-drill': 10,
+                                'electric-mining-drill': 15,
+                                'transport-belt': 50,
+                                'stone-furnace': 10,
+                                'small-electric-pole': 15,
+                                'small-lamp': 10
+                            })
 
 def determine_resource_type(entities: List[BlueprintEntity]) -> Resource:
     """
@@ -296,9 +301,14 @@ def find_placement_references(entities: List[BlueprintEntity]) -> List[EntityPla
     """
     Determine relative positioning between entities.
     Returns list of EntityPlacement objects with reference entities and offsets.
+
+    Each entity is referenced to the closest entity placed before it in the same row or column (the earliest placed,
+    on a tie). The placed entities are indexed by row and column, so finding it is a binary search of each.
     """
     placements = []
-    placed_entities = {}  # Map of positions to entity numbers
+    placed_entities = {}  # Map of positions to (order first placed, entity number)
+    columns = defaultdict(list)  # Map of x to the sorted y positions placed in that column
+    rows = defaultdict(list)  # Map of y to the sorted x positions placed in that row
 
     # Sort entities by priority
     sorted_entities = sorted(
@@ -308,50 +318,57 @@ def find_placement_references(entities: List[BlueprintEntity]) -> List[EntityPla
 
     for entity in sorted_entities:
         current_pos = (entity.position["x"], entity.position["y"])
+        x, y = current_pos
+
+        # The nearest placed entity on either side, along the column and along the row
+        candidates = []
+        for position in _nearest_in_line(columns.get(x, []), y):
+            candidates.append((abs(position - y), placed_entities[(x, position)][0], (x, position)))
+        for position in _nearest_in_line(rows.get(y, []), x):
+            candidates.append((abs(position - x), placed_entities[(position, y)][0], (position, y)))
 
-        # Find closest already-placed entity
         closest_reference = None
-        min_distance = float('inf')
         relative_pos = None
-
-        for placed_pos, placed_num in placed_entities.items():
-            dx = current_pos[0] - placed_pos[0]
-            dy = current_pos[1] - placed_pos[1]
-            distance = abs(dx) + abs(dy)  # Manhattan distance
-
-            if distance < min_distance and (dx == 0 or dy == 0):
-                min_distance = distance
-                closest_reference = placed_num
-                relative_pos = (dx, dy)
+        if candidates:
+            _, _, placed_pos = min(candidates)
+            closest_reference = placed_entities[placed_pos][1]
+            relative_pos = (x - placed_pos[0], y - placed_pos[1])
 
         placements.append(EntityPlacement(entity, closest_reference, relative_pos))
-        placed_entities[current_pos] = entity.entity_number
+        if current_pos in placed_entities:
+            placed_entities[current_pos] = (placed_entities[current_pos][0], entity.entity_number)
+        else:
+            placed_entities[current_pos] = (len(placed_entities), entity.entity_number)
+            bisect.insort(columns[x], y)
+            bisect.insort(rows[y], x)
 
     return placements
 
-def get_tile_dimensions_of_all_entities(entities: List[BlueprintEntity]) -> Dict[str, Tuple[int, int]]:
-    tile_dimensions = {}
-    # Get counts of entitiies
-    entity_counts = {}
-    for entity in entities:
-        entity_counts[entity.name] = entity_counts.get(entity.name, 0) + 1
-    instance = FactorioInstance(address='localhost',
-                                bounding_box=200,
-                                tcp_port=27000,
-                                fast=True,
-                                cache_scripts=False,
-                                inventory=entity_counts)
+
+def _nearest_in_line(line: List[float], coordinate: float) -> List[float]:
+    """The positions either side of (or at) a coordinate in a sorted line of positions"""
+    index = bisect.bisect_left(line, coordinate)
+    return line[max(index - 1, 0):index + 1]
+
+def get_tile_dimensions_of_all_entities(entities: List[BlueprintEntity],
+                                        instance: FactorioInstance) -> Dict[str, Tuple[int, int]]:
+    """
+    The tile dimensions of each kind of entity, measuring those not seen before by placing them in the game (so the
+    instance's inventory must have them) and picking them up again.
+    """
     # get set of entities by name
     entity_names = set([entity.name for entity in entities])
-    position = instance.nearest(Resource.IronOre)
-    instance.move_to(position)
-    # get tile dimensions of all entities
-    for entity_name in entity_names:
-        entity = instance.place_entity(prototype_by_name[entity_name], Direction.UP, position)
-        tile_dimensions[entity_name] = (entity.tile_dimensions.tile_width, entity.tile_dimensions.tile_height)
-        instance.pickup_entity(entity)
+    unmeasured = entity_names - set(_tile_dimensions)
+    if unmeasured:
+        position = instance.nearest(Resource.IronOre)
+        instance.move_to(position)
+        # get tile dimensions of all entities
+        for entity_name in unmeasured:
+            entity = instance.place_entity(prototype_by_name[entity_name], Direction.UP, position)
+            _tile_dimensions[entity_name] = (entity.tile_dimensions.tile_width, entity.tile_dimensions.tile_height)
+            instance.pickup_entity(entity)
 
-    return tile_dimensions
+    return {entity_name: _tile_dimensions[entity_name] for entity_name in entity_names}
 
 
 def generate_entity_variable_name(entity_name: str, entities: List[BlueprintEntity], entity_number: int) -> str:
@@ -375,7 +392,7 @@ def generate_entity_variable_name(entity_name: str, entities: List[BlueprintEnti
         return f"{name}_{index + 1}"
 
 
-def convert_blueprint_to_trace(blueprint_json: str) -> List[str]:
+def convert_blueprint_to_trace(blueprint_json: str, instance: FactorioInstance) -> List[str]:
     """Convert a Factorio blueprint JSON to a sequence of game commands."""
     blueprint = json.loads(blueprint_json)
     entities = [BlueprintEntity(**e) for e in blueprint["entities"]]
@@ -432,7 +449,7 @@ def convert_blueprint_to_trace(blueprint_json: str) -> List[str]:
     # Find belt segments
     belt_segments = find_belt_segments(belt_entities)
 
-    tile_dimensions = get_tile_dimensions_of_all_entities(entities)
+    tile_dimensions = get_tile_dimensions_of_all_entities(entities, instance)
 
     placed_entity_vars = {}  # Map of entity numbers to their variable names
     placed_entity = {}
@@ -653,9 +670,9 @@ def convert_blueprint_to_trace(blueprint_json: str) -> List[str]:
     return trace
 
 
-def generate_trace(blueprint_json: str) -> str:
+def generate_trace(blueprint_json: str, instance: FactorioInstance) -> str:
     """Generate the complete trace as a string."""
-    trace_lines = convert_blueprint_to_trace(blueprint_json)
+    trace_lines = convert_blueprint_to_trace(blueprint_json, instance)
     return "\n".join(trace_lines)
 
 def get_inventory(blueprint_json):
@@ -742,59 +759,65 @@ def verify_placement(game_entities, blueprint_json):
 
     assert hash1 == hash2, f"The difference in entities is {set(blueprint_pairs) - set(pairs)}"
 
-# get execution dir dynamically
-execution_dir = os.path.dirname(os.path.realpath(__file__)) + "/blueprints/electricity/"
-output_dir = os.path.dirname(os.path.realpath(__file__)) + "/full/electricity/"
-#filename = "miner_cycle"
-
-files = os.listdir(execution_dir)
-# generate if python file doesn't exist
-for file in files:
-    filename = file.replace(".json", "").replace(".py", "")
-    if not os.path.exists(output_dir+filename+".py") and os.path.exists(execution_dir+filename+".json"):
-        with open(execution_dir+filename+".json", "r") as f:
-            blueprint_json = f.read()
-            inventory = get_inventory(blueprint_json)
-            instance.set_inventory(**inventory)
-            #instance.add_command(_create_more_ore(Position(x=0, y=0), 30))
-            instance.execute_transaction()
-            instance.move_to(Position(x=0, y=0))
-            trace = None
-            try:
-                trace = generate_trace(blueprint_json)
-
-                score, goal, result = instance.eval_with_error(trace.replace("game.", ""), timeout=60)
-                if "error" in result:
-                    raise Exception(result["error"])
-
-                game_entities = instance.get_entities()
-                verify_placement(game_entities, blueprint_json)
-
-                # Write the code to a python file of the same name
-                with open(output_dir + filename.split('.json')[0] + ".py", "w") as f1:
-                    f1.write(trace)
-
-            except Exception as e:
-                print(e)
-                print("Error in blueprint")
-
-                # Load template string from file
-                with open(os.path.dirname(os.path.realpath(__file__))+"/test_template.jinja2", "r") as f:
-                    template_str = f.read()
-                    # Create template object
-                    template = Template(template_str)
-
-                    # Render the template
-                    rendered = template.render(
-                        inventory=inventory,
-                        test_name=filename.replace(" ", "_"),
-                        test_content=trace,
-                    )
-
-                    # Write to file
-                    with open(output_dir + "test_"+ filename + "_error.py", 'w') as f:
-                        f.write(rendered)
-
-
-
+def write_error_test(path: str, inventory: Dict[str, int], test_name: str, trace: Optional[str]):
+    """Write a test of a trace that failed, to debug it against a running server"""
+    from jinja2 import Template
+
+    # Load template string from file
+    with open(os.path.dirname(os.path.realpath(__file__))+"/test_template.jinja2", "r") as f:
+        template_str = f.read()
+    # Create template object
+    template = Template(template_str)
+
+    # Render the template
+    rendered = template.render(
+        inventory=inventory,
+        test_name=test_name,
+        test_content=trace,
+    )
 
+    # Write to file
+    with open(path, 'w') as f:
+        f.write(rendered)
+
+
+if __name__ == "__main__":
+    instance = create_instance()
+
+    # get execution dir dynamically
+    execution_dir = os.path.dirname(os.path.realpath(__file__)) + "/blueprints/electricity/"
+    output_dir = os.path.dirname(os.path.realpath(__file__)) + "/full/electricity/"
+    #filename = "miner_cycle"
+
+    files = os.listdir(execution_dir)
+    # generate if python file doesn't exist
+    for file in files:
+        filename = file.replace(".json", "").replace(".py", "")
+        if not os.path.exists(output_dir+filename+".py") and os.path.exists(execution_dir+filename+".json"):
+            with open(execution_dir+filename+".json", "r") as f:
+                blueprint_json = f.read()
+                inventory = get_inventory(blueprint_json)
+                instance.set_inventory(**inventory)
+                #instance.add_command(_create_more_ore(Position(x=0, y=0), 30))
+                instance.execute_transaction()
+                instance.move_to(Position(x=0, y=0))
+                trace = None
+                try:
+                    trace = generate_trace(blueprint_json, instance)
+
+                    score, goal, result = instance.eval_with_error(trace.replace("game.", ""), timeout=60)
+                    if "error" in result:
+                        raise Exception(result["error"])
+
+                    game_entities = instance.get_entities()
+                    verify_placement(game_entities, blueprint_json)
+
+                    # Write the code to a python file of the same name
+                    with open(output_dir + filename.split('.json')[0] + ".py", "w") as f1:
+                        f1.write(trace)
+
+                except Exception as e:
+                    print(e)
+                    print("Error in blueprint")
+                    write_error_test(output_dir + "test_" + filename + "_error.py", inventory,
+                                     filename.replace(" ", "_"), trace)
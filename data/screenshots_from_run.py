@@ -5,6 +5,7 @@ import psycopg2
 from dotenv import load_dotenv
 
 from data.screenshots_to_mp4 import png_to_mp4
+from eval.open.db_client import HAS_JSON_STATE, HAS_STATE, has_state_blob
 from instance import FactorioInstance
 from models.program import Program
 from models.game_state import GameState
@@ -27,16 +28,15 @@ def get_db_connection():
 def get_program_chain(conn, version: int):
     """Get the chain of programs for a specific version using recursive CTE"""
 
-    # First get the most recent program id for this version
-    latest_query = """
-    SELECT id FROM programs 
-    WHERE version = %s 
-    AND state_json IS NOT NULL 
-    ORDER BY created_at DESC 
-    LIMIT 1
-    """
-
     with conn.cursor() as cur:
+        # First get the most recent program id for this version, with its state in either format
+        latest_query = f"""
+        SELECT id FROM programs 
+        WHERE version = %s 
+        AND {HAS_STATE if has_state_blob(cur) else HAS_JSON_STATE} 
+        ORDER BY created_at DESC 
+        LIMIT 1
+        """
         cur.execute(latest_query, (version,))
         latest_result = cur.fetchone()
         if not latest_result:
@@ -1,3 +1,4 @@
+import functools
 import math
 from typing import Tuple, Any, Union, Dict, Set, Literal
 from typing import List, Optional
@@ -383,6 +384,18 @@ class BurnerType(BaseModel):
     fuel: Inventory = Inventory()  # Use this to check the fuel levels of the entity
 
 
+# Fields of an entity that aren't presented to the agent
+REPR_EXCLUDED_FIELDS = {
+    "dimensions",
+    "prototype",
+    "type",
+    "health",
+    "game",
+    "id",
+    "tile_dimensions",
+}
+
+
 class EntityCore(BaseModel):
     # id: Optional[str] = None
     name: str
@@ -406,22 +419,37 @@ class Entity(EntityCore):
     warnings: List[str] = []
     status: EntityStatus = EntityStatus.NORMAL
     # game: Optional[Any] = None # RCON connection for refreshing attributes
+    _projected: bool = False  # Only some fields were fetched (see get_entities `fields`), the rest are unset
+
+    def __init_subclass__(cls, **kwargs):
+        super().__init_subclass__(**kwargs)
+        # Subclass reprs show fields that a projected entity doesn't have, so projected entities use the slim one
+        if "__repr__" in cls.__dict__:
+            full_repr = cls.__dict__["__repr__"]
+
+            @functools.wraps(full_repr)
+            def __repr__(self):
+                return self._projected_repr() if self._projected else full_repr(self)
+
+            cls.__repr__ = __repr__
+
+    def _projected_repr(self) -> str:
+        items = [
+            f"{key}={value!r}"
+            for key, value in self.__dict__.items()
+            if key in self.model_fields_set and key not in REPR_EXCLUDED_FIELDS
+        ]
+        return f"\n\t{self.__class__.__name__}({', '.join(items)})"
 
     def __repr__(self) -> str:
+        if self._projected:
+            return self._projected_repr()
         # Only includes the fields we want to present to the agent
         # Get all instance attributes
         all_fields = self.__dict__
 
         # Filter out private attributes and excluded fields
-        excluded_fields = {
-            "dimensions",
-            "prototype",
-            "type",
-            "health",
-            "game",
-            "id",
-            "tile_dimensions",
-        }
+        excluded_fields = REPR_EXCLUDED_FIELDS
         rename_fields = {}
         repr_dict = {}
 
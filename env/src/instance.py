@@ -25,6 +25,7 @@ from lua_manager import LuaScriptManager
 from models.camera import Camera
 from namespace import FactorioNamespace
 from utils.rcon import _lua2python, _get_dir
+from utils.tracing import Tracer
 from transaction import FactorioTransaction
 from models.research_state import ResearchState
 from rcon.factorio_rcon import RCONClient
@@ -33,6 +34,8 @@ from utils.controller_loader.system_prompt_generator import SystemPromptGenerato
 
 CHUNK_SIZE = 32
 MAX_SAMPLES = 5000
+TICKS_PER_SECOND = 60
+FAST_FORWARD_SPEED = 1000  # Far beyond what the server can simulate, so it runs as fast as it can
 
 load_dotenv()
 
@@ -80,6 +83,7 @@ class FactorioInstance:
         cache_scripts=True,
         all_technologies_researched=True,
         peaceful=True,
+        trace_events=0,
         **kwargs,
     ):
         self.persistent_vars = {}
@@ -87,6 +91,9 @@ class FactorioInstance:
         self.tcp_port = tcp_port
         print(f"Connecting to Factorio server at {address}:{tcp_port}...")
         self.rcon_client, self.address = self.connect_to_server(address, tcp_port)
+        # Tool latencies are always aggregated, but spans are only kept (for a Chrome trace) if asked for
+        self.tracer = Tracer(pid=tcp_port, max_events=trace_events)
+        self.tracer.instrument(self.rcon_client)
         self.all_technologies_researched = all_technologies_researched
         self.fast = fast
         self._speed = 1
@@ -199,6 +206,33 @@ class FactorioInstance:
         response = self.rcon_client.send_command(f"/c game.speed = {speed}")
         self._speed = speed
 
+    def fast_forward(self, ticks: int, poll_interval: float = 0.01, timeout: float = 600) -> int:
+        """
+        Advance the game by exactly `ticks` ticks, as fast as the server can simulate them, returning once it has.
+        Unlike sleeping, how much happens doesn't depend on the game speed or on how loaded the host is.
+        :param ticks: Number of ticks to run
+        :param poll_interval: Seconds between checks of whether the ticks have run
+        :param timeout: Seconds to wait for the ticks to run before giving up
+        :return: The tick the game reached
+        """
+        # The game pauses itself once it has run `ticks_to_run` ticks, so it can't overshoot
+        response = self.rcon_client.send_command(
+            f"/c game.tick_paused = true; game.speed = {FAST_FORWARD_SPEED}; "
+            f"game.ticks_to_run = {max(int(ticks), 0)}; rcon.print(game.tick)"
+        )
+        target = int(response) + max(int(ticks), 0)
+        deadline = time.time() + timeout
+        try:
+            while True:
+                tick = int(self.rcon_client.send_command("/c rcon.print(game.tick)"))
+                if tick >= target:
+                    return tick
+                if time.time() > deadline:
+                    raise TimeoutError(f"Fast forward reached tick {tick} of {target} in {timeout}s")
+                time.sleep(poll_interval)
+        finally:
+            self.rcon_client.send_command(f"/c game.ticks_to_run = 0; game.speed = {self._speed}; game.tick_paused = false")
+
     def get_elapsed_ticks(self):
         response = self.rcon_client.send_command(
             f"/c rcon.print(global.elapsed_ticks or 0)"
@@ -213,6 +247,7 @@ class FactorioInstance:
         This includes all the available actions, objects, and entities that the agent can interact with.
         We get the system prompt by loading the schema, definitions, and entity definitions from their source files.
         These are converted to their signatures - leaving out the implementations.
+        The result is cached on disk (keyed by a hash of the source files) and memoised in-process.
         :return:
         """
         execution_path = Path(os.path.dirname(os.path.realpath(__file__)))
@@ -273,7 +308,8 @@ class FactorioInstance:
                     print(f"Error in pre-tool hook for {tool_name}: {e}")
 
                 # Execute the original callable
-                result = original_callable(*args, **kwargs)
+                with self.tracer.trace(tool_name):
+                    result = original_callable(*args, **kwargs)
 
                 # Execute post-tool hooks
                 try:
@@ -673,10 +709,12 @@ class FactorioInstance:
         self.lua_script_manager.load_init_into_game("clear_entities")
         self.lua_script_manager.load_init_into_game("alerts")
         self.lua_script_manager.load_init_into_game("util")
+        self.lua_script_manager.load_init_into_game("resource_index")
         self.lua_script_manager.load_init_into_game("priority_queue")
         self.lua_script_manager.load_init_into_game("connection_points")
         self.lua_script_manager.load_init_into_game("recipe_fluid_connection_mappings")
         self.lua_script_manager.load_init_into_game("serialize")
+        self.lua_script_manager.load_init_into_game("entity_changes")
         self.lua_script_manager.load_init_into_game("production_score")
         self.lua_script_manager.load_init_into_game("initialise_inventory")
 
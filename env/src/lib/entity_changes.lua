@@ -0,0 +1,209 @@
+-- entity_changes.lua
+-- Keeps a feed of the player force's entities that have changed, so that observers can fetch what changed since
+-- they last looked rather than re-serializing the whole factory.
+--
+-- global.entity_changes = {
+--     cursor = n,                               -- incremented on every change
+--     horizon = n,                              -- cursors before this get every entity again (see below)
+--     entities = {[unit_number] = entity},      -- every entity the feed knows about
+--     changed = {[unit_number] = cursor},       -- cursor at which each entity last changed
+--     removed = {[unit_number] = cursor},       -- cursor at which each entity was removed
+--     signatures = {[unit_number] = signature}  -- cheap summary of the state observers care about
+-- }
+--
+-- Entities are marked as they are built, removed, rotated or reconfigured, by events (which the agent tools raise)
+-- or by the tools calling mark_entity_changed. There are no events for inventory or status changes, so an observer
+-- that needs those asks for a sweep of the force's entities, which compares their signatures - far cheaper than
+-- serializing them, but still proportional to the factory.
+--
+-- Removals are only remembered for the last MAX_REMOVED entities, and not across resets. An observer whose cursor
+-- is older than that (before the horizon) gets every entity, with `reset` set.
+
+if not global.utils then
+    global.utils = {}
+end
+
+local MAX_REMOVED = 10000
+
+local function new_feed(cursor)
+    return {cursor = cursor, horizon = cursor, entities = {}, changed = {}, removed = {}, signatures = {},
+            removed_count = 0}
+end
+
+-- (Feeds from before the horizon was added are replaced too)
+if not global.entity_changes or not global.entity_changes.horizon then
+    global.entity_changes = new_feed(global.entity_changes and global.entity_changes.cursor or 0)
+end
+
+local function is_tracked(entity)
+    return entity and entity.valid and entity.unit_number and entity.force.name == "player" and entity.name ~= "character"
+end
+
+local function item_count(entity)
+    if entity.type == "transport-belt" or entity.type == "underground-belt" or entity.type == "splitter" then
+        local count = 0
+        for i = 1, entity.get_max_transport_line_index() do
+            count = count + entity.get_transport_line(i).get_item_count()
+        end
+        return count
+    end
+    return entity.get_item_count()
+end
+
+local function signature(entity)
+    local parts = {
+        entity.status or 0,
+        entity.direction or 0,
+        entity.position.x,
+        entity.position.y,
+        item_count(entity),
+    }
+    if entity.type == "assembling-machine" or entity.type == "furnace" then
+        local recipe = entity.get_recipe()
+        table.insert(parts, recipe and recipe.name or "")
+    end
+    if entity.fluidbox and #entity.fluidbox > 0 then
+        local fluid = entity.fluidbox[1]
+        table.insert(parts, fluid and fluid.name or "")
+    end
+    return table.concat(parts, "|")
+end
+
+local function mark_changed(entity, entity_signature)
+    local feed = global.entity_changes
+    local unit_number = entity.unit_number
+    feed.cursor = feed.cursor + 1
+    feed.entities[unit_number] = entity
+    feed.changed[unit_number] = feed.cursor
+    feed.removed[unit_number] = nil
+    feed.signatures[unit_number] = entity_signature or signature(entity)
+end
+
+-- Forget the oldest half of the removals, moving the horizon past them
+local function prune_removed(feed)
+    local cursors = {}
+    for _, cursor in pairs(feed.removed) do
+        table.insert(cursors, cursor)
+    end
+    table.sort(cursors)
+    local horizon = cursors[math.floor(#cursors / 2)]
+    for unit_number, cursor in pairs(feed.removed) do
+        if cursor <= horizon then
+            feed.removed[unit_number] = nil
+            feed.removed_count = feed.removed_count - 1
+        end
+    end
+    feed.horizon = math.max(feed.horizon, horizon)
+end
+
+local function mark_removed(unit_number)
+    local feed = global.entity_changes
+    feed.cursor = feed.cursor + 1
+    feed.entities[unit_number] = nil
+    feed.changed[unit_number] = nil
+    feed.signatures[unit_number] = nil
+    if not feed.removed[unit_number] then
+        feed.removed_count = feed.removed_count + 1
+    end
+    feed.removed[unit_number] = feed.cursor
+    if feed.removed_count > MAX_REMOVED then
+        prune_removed(feed)
+    end
+end
+
+global.utils.mark_entity_changed = function(entity)
+    if is_tracked(entity) then
+        mark_changed(entity)
+    end
+end
+
+-- Forget everything, e.g when the map is cleared. Every observer gets every entity on its next query.
+global.utils.reset_entity_changes = function()
+    global.entity_changes = new_feed(global.entity_changes.cursor + 1)
+end
+
+-- Pick up changes that no event told us about
+global.utils.sweep_entity_changes = function(surface)
+    local feed = global.entity_changes
+    local seen = {}
+    for _, entity in pairs(surface.find_entities_filtered{force = "player"}) do
+        if is_tracked(entity) then
+            local unit_number = entity.unit_number
+            seen[unit_number] = true
+            local entity_signature = signature(entity)
+            if feed.signatures[unit_number] ~= entity_signature then
+                mark_changed(entity, entity_signature)
+            end
+        end
+    end
+    for unit_number, entity in pairs(feed.entities) do
+        if not seen[unit_number] and (not entity.valid or entity.surface == surface) then
+            mark_removed(unit_number)
+        end
+    end
+end
+
+-- Get the entities changed and removed after `since`. A cursor the feed has never handed out (e.g 0), or one from
+-- before the horizon, gets every entity, and `reset` is set so the observer knows to drop what it has. The force is
+-- swept for changes that raise no event when `sweep` is set, or when every entity is sent.
+global.utils.get_entity_changes = function(surface, since, sweep)
+    local feed = global.entity_changes
+    local reset = since <= 0 or since < feed.horizon or since > feed.cursor
+    if reset or sweep then
+        global.utils.sweep_entity_changes(surface)
+    end
+    if reset then
+        since = 0
+    end
+
+    local changed = {}
+    for unit_number, cursor in pairs(feed.changed) do
+        local entity = feed.entities[unit_number]
+        if cursor > since and entity and entity.valid then
+            table.insert(changed, entity)
+        end
+    end
+    local removed = {}
+    if not reset then
+        for unit_number, cursor in pairs(feed.removed) do
+            if cursor > since then
+                table.insert(removed, unit_number)
+            end
+        end
+    end
+    return {cursor = feed.cursor, reset = reset, changed = changed, removed = removed}
+end
+
+local built_events = {
+    defines.events.on_built_entity,
+    defines.events.on_robot_built_entity,
+    defines.events.script_raised_built,
+    defines.events.script_raised_revive,
+}
+script.on_event(built_events, function(event)
+    global.utils.mark_entity_changed(event.created_entity or event.entity)
+end)
+
+local removed_events = {
+    defines.events.on_player_mined_entity,
+    defines.events.on_robot_mined_entity,
+    defines.events.on_entity_died,
+    defines.events.script_raised_destroy,
+}
+script.on_event(removed_events, function(event)
+    if is_tracked(event.entity) then
+        mark_removed(event.entity.unit_number)
+    end
+end)
+
+script.on_event(defines.events.on_player_rotated_entity, function(event)
+    global.utils.mark_entity_changed(event.entity)
+end)
+
+script.on_event(defines.events.on_entity_settings_pasted, function(event)
+    global.utils.mark_entity_changed(event.destination)
+end)
+
+script.on_event(defines.events.on_player_fast_transferred, function(event)
+    global.utils.mark_entity_changed(event.entity)
+end)
@@ -358,23 +358,53 @@ for key, entity in pairs(surface.find_entities_filtered({force="enemy", radius=2
 	entity.destroy()
  end
 
-global.crafting_queue = {}
+-- Handcrafting tasks, ordered by the tick they complete on
+global.crafting_queue = nil
 
-script.on_event(defines.events.on_tick, function(event)
-  -- Iterate over the crafting queue and update the remaining ticks
-  for i, task in ipairs(global.crafting_queue) do
-    task.remaining_ticks = task.remaining_ticks - 1
+local function complete_crafting_task(task)
+  if not task.player.valid then
+    return
+  end
+  -- Consume the ingredients and insert the crafted entity
+  for _, ingredient in pairs(task.recipe.ingredients) do
+    task.player.remove_item({name = ingredient.name, count = ingredient.amount * task.count})
+  end
+  task.player.insert({name = task.entity_name, count = task.count})
+end
 
-    -- If the crafting is finished, consume the ingredients, insert the crafted entity, and remove the task from the queue
-    if task.remaining_ticks <= 0 then
-      for _, ingredient in pairs(task.recipe.ingredients) do
-        task.player.remove_item({name = ingredient.name, count = ingredient.amount * task.count})
-      end
-      task.player.insert({name = task.entity_name, count = task.count})
-      table.remove(global.crafting_queue, i)
-    end
+-- Runs every tick, but is only registered while there are tasks in the queue. on_nth_tick is used rather than
+-- on_tick, as alerts.lua owns the on_tick handler.
+local function process_crafting_queue(event)
+  local queue = global.crafting_queue
+  while queue and not queue:is_empty() and queue:peek().completion_tick <= event.tick do
+    complete_crafting_task(queue:pop())
+  end
+  if not queue or queue:is_empty() then
+    script.on_nth_tick(1, nil)
   end
-end)
+end
+
+global.utils.queue_crafting_task = function(player, entity_name, recipe, count, ticks)
+  if not global.crafting_queue then
+    global.crafting_queue = global.utils.PriorityQueue.new(function(a, b)
+      return a.completion_tick < b.completion_tick
+    end)
+  end
+  local was_empty = global.crafting_queue:is_empty()
+  global.crafting_queue:insert({
+    player = player,
+    entity_name = entity_name,
+    recipe = recipe,
+    count = count,
+    completion_tick = game.tick + math.max(ticks, 1)
+  })
+  if was_empty then
+    script.on_nth_tick(1, process_crafting_queue)
+  end
+end
+
+-- Stop processing any queue left over from a previous load
+script.on_nth_tick(1, nil)
 
 function abort(message)
     local msg = tostring(message):gsub(" ", "_")
@@ -53,9 +53,20 @@ function PriorityQueue:pop()
     return top
 end
 
+-- Return the top element of the queue without removing it.
+function PriorityQueue:peek()
+    return self.queue[1]
+end
+
 -- Check if the queue is empty.
 function PriorityQueue:is_empty()
     return #self.queue == 0
 end
 
+-- Scripts are loaded over RCON, so the return value is discarded. Expose the queue for other scripts.
+if not global.utils then
+    global.utils = {}
+end
+global.utils.PriorityQueue = PriorityQueue
+
 return PriorityQueue
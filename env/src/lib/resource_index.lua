@@ -0,0 +1,263 @@
+-- resource_index.lua
+-- Labels connected resource patches once, so that patch and nearest queries are lookups rather than world scans.
+--
+-- global.resource_index = {
+--     tiles = {[name] = {[tile_key] = patch_id}},
+--     patches = {[patch_id] = {name = name, entities = {[tile_key] = entity}, count = n}},
+--     chunks = {[name] = {[chunk_key] = {[tile_key] = entity}}},
+--     next_id = 1
+-- }
+--
+-- Tiles are 8-connected, matching the 3x3 neighbourhood the flood fill in get_resource_patch used to search.
+-- Amounts change every time something is mined, so patch totals and bounding boxes are summed from the
+-- indexed entities when queried.
+
+if not global.utils then
+    global.utils = {}
+end
+
+local CHUNK_SIZE = 32
+
+local function tile_key(x, y)
+    return x .. "," .. y
+end
+
+local function entity_tile(entity)
+    return math.floor(entity.position.x), math.floor(entity.position.y)
+end
+
+local function chunk_key_of(x, y)
+    return tile_key(math.floor(x / CHUNK_SIZE), math.floor(y / CHUNK_SIZE))
+end
+
+local function new_index()
+    return {tiles = {}, patches = {}, chunks = {}, next_id = 1}
+end
+
+-- Move every tile of the smaller patch into the larger one
+local function merge_patches(index, into_id, from_id)
+    local into = index.patches[into_id]
+    local from = index.patches[from_id]
+    local tiles = index.tiles[from.name]
+    for key, entity in pairs(from.entities) do
+        into.entities[key] = entity
+        tiles[key] = into_id
+    end
+    into.count = into.count + from.count
+    index.patches[from_id] = nil
+end
+
+local function add_entity(index, entity)
+    local name = entity.name
+    local x, y = entity_tile(entity)
+    local key = tile_key(x, y)
+
+    index.tiles[name] = index.tiles[name] or {}
+    local tiles = index.tiles[name]
+    if tiles[key] then
+        return
+    end
+
+    -- Find the patches this tile touches, keeping the largest
+    local patch_id = nil
+    local neighbours = {}
+    for dx = -1, 1 do
+        for dy = -1, 1 do
+            local neighbour_id = tiles[tile_key(x + dx, y + dy)]
+            if neighbour_id and not neighbours[neighbour_id] then
+                neighbours[neighbour_id] = true
+                if not patch_id or index.patches[neighbour_id].count > index.patches[patch_id].count then
+                    patch_id = neighbour_id
+                end
+            end
+        end
+    end
+
+    if not patch_id then
+        patch_id = index.next_id
+        index.next_id = index.next_id + 1
+        index.patches[patch_id] = {name = name, entities = {}, count = 0}
+    end
+
+    -- This tile bridges several patches, so they become one
+    for neighbour_id, _ in pairs(neighbours) do
+        if neighbour_id ~= patch_id then
+            merge_patches(index, patch_id, neighbour_id)
+        end
+    end
+
+    local patch = index.patches[patch_id]
+    patch.entities[key] = entity
+    patch.count = patch.count + 1
+    tiles[key] = patch_id
+
+    index.chunks[name] = index.chunks[name] or {}
+    local chunk_key = chunk_key_of(x, y)
+    index.chunks[name][chunk_key] = index.chunks[name][chunk_key] or {}
+    index.chunks[name][chunk_key][key] = entity
+end
+
+local function remove_tile(index, name, x, y)
+    local key = tile_key(x, y)
+    local tiles = index.tiles[name]
+    if not tiles or not tiles[key] then
+        return
+    end
+
+    local patch = index.patches[tiles[key]]
+    if patch then
+        patch.entities[key] = nil
+        patch.count = patch.count - 1
+        if patch.count <= 0 then
+            index.patches[tiles[key]] = nil
+        end
+    end
+    tiles[key] = nil
+
+    local bucket = index.chunks[name] and index.chunks[name][chunk_key_of(x, y)]
+    if bucket then
+        bucket[key] = nil
+    end
+end
+
+global.utils.build_resource_index = function(surface)
+    local index = new_index()
+    for _, entity in pairs(surface.find_entities_filtered{type = "resource"}) do
+        add_entity(index, entity)
+    end
+    global.resource_index = index
+    return index
+end
+
+global.utils.get_resource_index = function(surface)
+    if not global.resource_index then
+        return global.utils.build_resource_index(surface)
+    end
+    return global.resource_index
+end
+
+-- Get the patch containing a resource entity, with its live total amount and bounding box
+global.utils.get_indexed_resource_patch = function(surface, entity)
+    local index = global.utils.get_resource_index(surface)
+    local x, y = entity_tile(entity)
+    local tiles = index.tiles[entity.name]
+    local patch_id = tiles and tiles[tile_key(x, y)]
+    if not patch_id then
+        -- The entity was created after the index was built (e.g by regenerating resources)
+        index = global.utils.build_resource_index(surface)
+        patch_id = index.tiles[entity.name] and index.tiles[entity.name][tile_key(x, y)]
+        if not patch_id then
+            return nil
+        end
+    end
+
+    local patch = index.patches[patch_id]
+    local total = 0
+    local left_top, right_bottom = nil, nil
+    local stale = {}
+    for key, patch_entity in pairs(patch.entities) do
+        if patch_entity.valid then
+            local position = patch_entity.position
+            total = total + patch_entity.amount
+            if not left_top then
+                left_top = {x = position.x, y = position.y}
+                right_bottom = {x = position.x, y = position.y}
+            else
+                left_top.x = math.min(left_top.x, position.x)
+                left_top.y = math.min(left_top.y, position.y)
+                right_bottom.x = math.max(right_bottom.x, position.x)
+                right_bottom.y = math.max(right_bottom.y, position.y)
+            end
+        else
+            table.insert(stale, key)
+        end
+    end
+
+    -- Drop entities that were depleted without an event reaching us
+    for _, key in pairs(stale) do
+        local tx, ty = key:match("^(-?%d+),(-?%d+)$")
+        remove_tile(index, patch.name, tonumber(tx), tonumber(ty))
+    end
+
+    if not left_top then
+        return nil
+    end
+    return {bounding_box = {left_top = left_top, right_bottom = right_bottom}, size = total}
+end
+
+local function find_nearest_in_index(index, name, position, max_distance)
+    local buckets = index.chunks[name]
+    if not buckets then
+        return nil, false
+    end
+
+    local pcx = math.floor(position.x / CHUNK_SIZE)
+    local pcy = math.floor(position.y / CHUNK_SIZE)
+    local max_ring = math.ceil(max_distance / CHUNK_SIZE) + 1
+    local closest, closest_distance = nil, math.huge
+    local found_invalid = false
+
+    for ring = 0, max_ring do
+        -- Every tile in this ring is at least (ring - 1) chunks away, so nothing further out can be closer
+        if closest and closest_distance <= (ring - 1) * CHUNK_SIZE then
+            break
+        end
+        for dx = -ring, ring do
+            for dy = -ring, ring do
+                if math.max(math.abs(dx), math.abs(dy)) == ring then
+                    local bucket = buckets[tile_key(pcx + dx, pcy + dy)]
+                    if bucket then
+                        for _, entity in pairs(bucket) do
+                            if entity.valid then
+                                local ex, ey = entity.position.x, entity.position.y
+                                if math.abs(ex - position.x) <= max_distance and math.abs(ey - position.y) <= max_distance then
+                                    local distance = ((position.x - ex) ^ 2 + (position.y - ey) ^ 2) ^ 0.5
+                                    if distance < closest_distance then
+                                        closest_distance = distance
+                                        closest = {x = ex, y = ey}
+                                    end
+                                end
+                            else
+                                found_invalid = true
+                            end
+                        end
+                    end
+                end
+            end
+        end
+    end
+
+    return closest, found_invalid
+end
+
+-- Find the nearest indexed resource tile within `max_distance` tiles (in each axis) of a position
+global.utils.nearest_indexed_resource = function(surface, name, position, max_distance)
+    local closest, found_invalid = find_nearest_in_index(global.utils.get_resource_index(surface), name, position, max_distance)
+    if not closest and found_invalid then
+        -- Every candidate is stale (e.g the resources were regenerated after the index was built), so re-index
+        closest = find_nearest_in_index(global.utils.build_resource_index(surface), name, position, max_distance)
+    end
+    return closest
+end
+
+-- Keep the index current as the map grows and resources run out
+script.on_event(defines.events.on_chunk_generated, function(event)
+    if not global.resource_index then
+        return
+    end
+    for _, entity in pairs(event.surface.find_entities_filtered{area = event.area, type = "resource"}) do
+        add_entity(global.resource_index, entity)
+    end
+end)
+
+script.on_event(defines.events.on_resource_depleted, function(event)
+    if not global.resource_index then
+        return
+    end
+    local entity = event.entity
+    local x, y = entity_tile(entity)
+    remove_tile(global.resource_index, entity.name, x, y)
+end)
+
+-- Build the index as soon as the map is loaded
+global.utils.build_resource_index(game.surfaces[1])
@@ -442,9 +442,86 @@ local function expand_box(box, amount)
     }
 end
 
-local function serialize_neighbours(entity)
-    local neighbours = {}
+-- Spatial index shared by every entity serialized in one batch (see global.utils.serialize_entities)
+local batch_index = nil
+
+local function boxes_overlap(a, b)
+    return a.left_top.x < b.right_bottom.x and b.left_top.x < a.right_bottom.x
+        and a.left_top.y < b.right_bottom.y and b.left_top.y < a.right_bottom.y
+end
+
+-- Bucket entities by every tile their bounding box covers
+local function build_spatial_hash(entities)
+    local hash = {cells = {}, boxes = {}, entities = entities}
+    for i, entity in ipairs(entities) do
+        local box = entity.bounding_box
+        hash.boxes[i] = box
+        for x = math.floor(box.left_top.x), math.floor(box.right_bottom.x) do
+            for y = math.floor(box.left_top.y), math.floor(box.right_bottom.y) do
+                local key = x .. "," .. y
+                local cell = hash.cells[key]
+                if not cell then
+                    cell = {}
+                    hash.cells[key] = cell
+                end
+                table.insert(cell, i)
+            end
+        end
+    end
+    return hash
+end
+
+-- Equivalent of find_entities_filtered{area = area, type = entity_type} against the batch index
+local function query_spatial_hash(hash, area, entity_type)
+    local seen, found = {}, {}
+    for x = math.floor(area.left_top.x), math.floor(area.right_bottom.x) do
+        for y = math.floor(area.left_top.y), math.floor(area.right_bottom.y) do
+            local cell = hash.cells[x .. "," .. y]
+            if cell then
+                for _, i in ipairs(cell) do
+                    if not seen[i] then
+                        seen[i] = true
+                        if boxes_overlap(hash.boxes[i], area)
+                                and (not entity_type or hash.entities[i].type == entity_type) then
+                            table.insert(found, i)
+                        end
+                    end
+                end
+            end
+        end
+    end
+
+    -- Keep the order the surface query returned them in
+    table.sort(found)
+    local result = {}
+    for _, i in ipairs(found) do
+        table.insert(result, hash.entities[i])
+    end
+    return result
+end
+
+-- The smallest area covering both `area` (which may be nil) and `box`
+local function extend_area(area, box)
+    if not area then
+        return {left_top = {x = box.left_top.x, y = box.left_top.y},
+                right_bottom = {x = box.right_bottom.x, y = box.right_bottom.y}}
+    end
+    area.left_top.x = math.min(area.left_top.x, box.left_top.x)
+    area.left_top.y = math.min(area.left_top.y, box.left_top.y)
+    area.right_bottom.x = math.max(area.right_bottom.x, box.right_bottom.x)
+    area.right_bottom.y = math.max(area.right_bottom.y, box.right_bottom.y)
+    return area
+end
+
+-- Find entities in an area, using the batch index when serializing a batch on this tick
+local function find_entities_in_area(surface, area, entity_type)
+    if batch_index and batch_index.tick == game.tick and batch_index.surface == surface then
+        return query_spatial_hash(batch_index.hash, area, entity_type)
+    end
+    return surface.find_entities_filtered{area = area, type = entity_type}
+end
 
+local function neighbour_search_area(entity)
     -- Get entity's prototype collision box
     local prototype = game.entity_prototypes[entity.name]
     local collision_box = prototype.collision_box
@@ -453,7 +530,7 @@ local function serialize_neighbours(entity)
     local search_box = expand_box(collision_box, 0.707) -- Expand by 0.5 tiles
 
     -- Convert to world coordinates
-    local world_box = {
+    return {
         left_top = {
             x = entity.position.x + search_box.left_top.x,
             y = entity.position.y + search_box.left_top.y
@@ -463,11 +540,22 @@ local function serialize_neighbours(entity)
             y = entity.position.y + search_box.right_bottom.y
         }
     }
+end
 
-    -- Find entities within the expanded collision box
-    local nearby = entity.surface.find_entities_filtered{
-        area = world_box
+local function mining_area(entity)
+    local radius = game.entity_prototypes[entity.name].mining_drill_radius
+    local position = entity.position
+    return {
+        left_top = {x = position.x - radius, y = position.y - radius},
+        right_bottom = {x = position.x + radius, y = position.y + radius}
     }
+end
+
+local function serialize_neighbours(entity)
+    local neighbours = {}
+
+    -- Find entities within the expanded collision box
+    local nearby = find_entities_in_area(entity.surface, neighbour_search_area(entity))
 
     -- Process each nearby entity
     for _, neighbor in pairs(nearby) do
@@ -1567,25 +1655,11 @@ global.utils.serialize_entity = function(entity)
         serialized.drop_position.y = math.round(serialized.drop_position.y * 2) / 2
         game.print("Mining drill drop position: " .. serpent.line(serialized.drop_position))
 
-        -- Get the mining area
-        local prototype = game.entity_prototypes[entity.name]
-        local mining_area = prototype.mining_drill_radius * 2
-
-        local position = entity.position
-
         -- Initialize resources table
         serialized.resources = {}
 
-        -- Calculate the area to check based on mining drill radius
-        local start_x = position.x - mining_area/2
-        local start_y = position.y - mining_area/2
-        local end_x = position.x + mining_area/2
-        local end_y = position.y + mining_area/2
-
-        local resources = game.surfaces[1].find_entities_filtered{
-            area = {{start_x, start_y}, {end_x, end_y}},
-            type = "resource",
-        }
+        -- Find the resources within the mining drill radius
+        local resources = find_entities_in_area(entity.surface, mining_area(entity), "resource")
 
         for _, resource in pairs(resources) do
             if not serialized.resources[resource.name] then
@@ -1871,3 +1945,150 @@ global.utils.serialize_entity = function(entity)
 
     return serialized
 end
+
+-- Fields that can be read straight off the entity, without the neighbour, inventory, fluid and connection point work
+local SLIM_FIELDS = {
+    name = true, type = true, position = true, direction = true, health = true, energy = true,
+    status = true, id = true, electrical_id = true, dimensions = true, tile_dimensions = true
+}
+
+-- Entities whose status is worked out by serialize_entity rather than read from the entity
+local function has_derived_status(entity)
+    return entity.type == "mining-drill" or entity.type == "rocket-silo" or is_fluid_handler(entity.type)
+end
+
+local function is_slim(entity, fields)
+    for field, _ in pairs(fields) do
+        if not SLIM_FIELDS[field] then
+            return false
+        end
+    end
+    return not (fields.status and has_derived_status(entity))
+end
+
+local function serialize_slim(entity, fields)
+    local serialized = {}
+    local prototype = (fields.dimensions or fields.tile_dimensions) and game.entity_prototypes[entity.name]
+    if fields.name then serialized.name = "\""..entity.name.."\"" end
+    if fields.type then serialized.type = "\""..entity.type.."\"" end
+    if fields.position then serialized.position = entity.position end
+    if fields.direction then serialized.direction = get_inverse_entity_direction(entity.name, entity.direction) end
+    if fields.health then serialized.health = entity.health end
+    if fields.energy then serialized.energy = entity.energy end
+    if fields.status then serialized.status = global.entity_status_names[entity.status] or "\"normal\"" end
+    if fields.id then serialized.id = entity.unit_number end
+    if fields.electrical_id then serialized.electrical_id = entity.electric_network_id end
+    if fields.dimensions then
+        local collision_box = prototype.collision_box
+        serialized.dimensions = {
+            width = math.abs(collision_box.right_bottom.x - collision_box.left_top.x),
+            height = math.abs(collision_box.right_bottom.y - collision_box.left_top.y),
+        }
+    end
+    if fields.tile_dimensions then
+        serialized.tile_dimensions = {
+            tile_width = prototype.tile_width,
+            tile_height = prototype.tile_height,
+        }
+    end
+    return serialized
+end
+
+-- Serialize only the requested fields of an entity (`fields` is a set of field names).
+-- Cheap fields are read directly; anything else needs the full serialization, which is then cut down.
+global.utils.serialize_entity_fields = function(entity, fields)
+    if is_slim(entity, fields) then
+        return serialize_slim(entity, fields)
+    end
+    local serialized = global.utils.serialize_entity(entity)
+    local projected = {}
+    for field, _ in pairs(fields) do
+        projected[field] = serialized[field]
+    end
+    return projected
+end
+
+-- Serialize many entities at once. Everything the neighbour and mining area lookups of the entities in a chunk could
+-- touch is fetched with a single surface query and indexed by tile, instead of querying the surface once per lookup.
+-- If `fields` is given, only those fields are serialized, and entities that only need cheap fields skip the
+-- surface query altogether.
+global.utils.serialize_entities = function(entities, fields)
+    if #entities == 0 then
+        return {}
+    end
+
+    local serialize = global.utils.serialize_entity
+    if fields then
+        serialize = function(entity)
+            return global.utils.serialize_entity_fields(entity, fields)
+        end
+        local needs_index = false
+        for _, entity in ipairs(entities) do
+            if not is_slim(entity, fields) then
+                needs_index = true
+                break
+            end
+        end
+        if not needs_index then
+            local serialized = {}
+            for _, entity in ipairs(entities) do
+                table.insert(serialized, serialize(entity))
+            end
+            return serialized
+        end
+    end
+
+    -- Targets are grouped by chunk, and each group's lookups are answered from one query over just the area they can
+    -- touch, so the cost follows the number of targets rather than the area they are spread over
+    local surface = entities[1].surface
+    local groups, group_order = {}, {}
+    for i, entity in ipairs(entities) do
+        if entity.surface == surface then
+            local key = math.floor(entity.position.x / 32) .. "," .. math.floor(entity.position.y / 32)
+            local group = groups[key]
+            if not group then
+                group = {indices = {}}
+                groups[key] = group
+                table.insert(group_order, group)
+            end
+            table.insert(group.indices, i)
+            group.area = extend_area(group.area, neighbour_search_area(entity))
+            if entity.type == "mining-drill" then
+                group.area = extend_area(group.area, mining_area(entity))
+            end
+        end
+    end
+
+    local ok, result = pcall(function()
+        local serialized, done = {}, {}
+        for _, group in ipairs(group_order) do
+            batch_index = {
+                tick = game.tick,
+                surface = surface,
+                hash = build_spatial_hash(surface.find_entities_filtered{area = group.area})
+            }
+            for _, i in ipairs(group.indices) do
+                serialized[i] = serialize(entities[i])
+                done[i] = true
+            end
+        end
+        batch_index = nil
+
+        -- Entities on other surfaces query the surface directly
+        local ordered = {}
+        for i, entity in ipairs(entities) do
+            if done[i] then
+                table.insert(ordered, serialized[i])
+            else
+                table.insert(ordered, serialize(entity))
+            end
+        end
+        return ordered
+    end)
+    batch_index = nil
+
+    if not ok then
+        error(result, 0)
+    end
+    return result
+end
@@ -1,6 +1,35 @@
-from copy import deepcopy
+from collections import Counter
 from dataclasses import dataclass
-from typing import Dict, List, Any, Optional
+from typing import Dict, List, Any, Optional, Hashable
+
+
+def _freeze(value: Any) -> Hashable:
+    if isinstance(value, dict):
+        return tuple(sorted((key, _freeze(item)) for key, item in value.items()))
+    if isinstance(value, (list, tuple)):
+        return tuple(_freeze(item) for item in value)
+    return value
+
+
+def crafted_signature(craft: Dict[str, Any]) -> Hashable:
+    """Canonical, hashable form of a crafted record (count, inputs and outputs), equal for equal records."""
+    return _freeze(craft)
+
+
+def get_new_crafted(pre_crafted: List[Dict[str, Any]], post_crafted: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+    """
+    Get the crafted records in `post_crafted` that are not in `pre_crafted`, treating both as multisets
+    (i.e. a record that was crafted twice before and three times after is new once).
+    """
+    remaining = Counter(crafted_signature(craft) for craft in pre_crafted)
+    new_crafted = []
+    for craft in post_crafted:
+        signature = crafted_signature(craft)
+        if remaining[signature] > 0:
+            remaining[signature] -= 1
+        else:
+            new_crafted.append(craft)
+    return new_crafted
 
 
 @dataclass
@@ -69,11 +98,6 @@ class ProductionFlows:
                 if diff > 0:
                     new_dict[item] = diff
 
-        pre_crafted = deepcopy(cls.crafted)
-        for item in post.crafted:
-            if item in pre_crafted:
-                pre_crafted.remove(item)
-            else:
-                new_flows.crafted.append(item)
+        new_flows.crafted = get_new_crafted(cls.crafted, post.crafted)
 
         return new_flows
@@ -1,6 +1,9 @@
+import hashlib
 import json
 import pickle
+import struct
 import time
+import zlib
 from dataclasses import dataclass, field, asdict
 from enum import Enum
 from typing import Dict, Optional, Any
@@ -9,6 +12,52 @@ from typing import Dict, Optional, Any
 from models.research_state import ResearchState
 from models.technology_state import TechnologyState
 
+# Binary snapshot layout (integers little-endian):
+#   magic | version u8 | timestamp f64 | section count u16
+#   then per section: name length u8 | name | compressed length u32
+#   then each section's zlib-compressed payload, in the same order
+SNAPSHOT_MAGIC = b"FGS"
+SNAPSHOT_VERSION = 1
+_SNAPSHOT_HEADER = struct.Struct("<3sBdH")
+_SECTION_LENGTH = struct.Struct("<I")
+
+
+def _research_to_dict(research: ResearchState) -> Dict[str, Any]:
+    return {
+        "technologies": {
+            name: asdict(tech)
+            for name, tech in research.technologies.items()
+        },
+        "current_research": research.current_research,
+        "research_progress": research.research_progress,
+        "research_queue": research.research_queue,
+        "progress": research.progress,
+    }
+
+
+def _research_from_dict(data: Dict[str, Any]) -> ResearchState:
+    return ResearchState(
+        technologies={
+            name: TechnologyState(**tech)
+            for name, tech in data["technologies"].items()
+        },
+        current_research=data["current_research"],
+        research_progress=data["research_progress"],
+        research_queue=data["research_queue"],
+        progress=data["progress"]
+        if "progress" in data
+        else {},
+    )
+
+
+# How each snapshot section is decoded. A missing section decodes from None.
+_SECTION_DECODERS = {
+    "entities": lambda data: json.loads(data),
+    "inventory": lambda data: json.loads(data),
+    "research": lambda data: _research_from_dict(json.loads(data)) if data else None,
+    "namespace": lambda data: bytes(data) if data else bytes(),
+}
+
 
 @dataclass
 class GameState:
@@ -50,31 +99,7 @@ class GameState:
 
     @classmethod
     def parse_raw(cls, json_str: str) -> "GameState":
-        data = json.loads(json_str)
-        namespace = bytes.fromhex(data["namespace"]) if "namespace" in data else bytes()
-        # Parse research state if present
-        research = None
-        if "research" in data:
-            research = ResearchState(
-                technologies={
-                    name: TechnologyState(**tech)
-                    for name, tech in data["research"]["technologies"].items()
-                },
-                current_research=data["research"]["current_research"],
-                research_progress=data["research"]["research_progress"],
-                research_queue=data["research"]["research_queue"],
-                progress=data["research"]["progress"]
-                if "progress" in data["research"]
-                else {},
-            )
-
-        return cls(
-            entities=data["entities"],
-            inventory=data["inventory"],
-            timestamp=data["timestamp"] if "timestamp" in data else time.time(),
-            namespace=namespace,
-            research=research,
-        )
+        return cls.parse(json.loads(json_str))
 
     @classmethod
     def parse(cls, data) -> "GameState":
@@ -83,18 +108,7 @@ class GameState:
         # Parse research state if present
         research = None
         if "research" in data:
-            research = ResearchState(
-                technologies={
-                    name: TechnologyState(**tech)
-                    for name, tech in data["research"]["technologies"].items()
-                },
-                current_research=data["research"]["current_research"],
-                research_progress=data["research"]["research_progress"],
-                research_queue=data["research"]["research_queue"],
-                progress=data["research"]["progress"]
-                if "progress" in data["research"]
-                else {},
-            )
+            research = _research_from_dict(data["research"])
 
         return cls(
             entities=data["entities"],
@@ -117,19 +131,96 @@ class GameState:
 
         # Add research state if present
         if self.research:
-            data["research"] = {
-                "technologies": {
-                    name: asdict(tech)
-                    for name, tech in self.research.technologies.items()
-                },
-                "current_research": self.research.current_research,
-                "research_progress": self.research.research_progress,
-                "research_queue": self.research.research_queue,
-                "progress": self.research.progress,
-            }
+            data["research"] = _research_to_dict(self.research)
 
         return json.dumps(data)
 
+    def content_hash(self) -> str:
+        """Hash of everything the state restores, ignoring when it was captured"""
+        data = {
+            "entities": self.entities,
+            "inventory": self.inventory.__dict__
+            if hasattr(self.inventory, "__dict__")
+            else self.inventory,
+            "namespace": self.namespace.hex() if self.namespace else "",
+            "research": _research_to_dict(self.research) if self.research else None,
+        }
+        return hashlib.sha256(json.dumps(data, sort_keys=True).encode()).hexdigest()
+
+    def to_binary(self) -> bytes:
+        """Convert state to a versioned binary snapshot, with each section compressed separately"""
+        sections = {
+            "entities": json.dumps(self.entities).encode(),
+            "inventory": json.dumps(
+                self.inventory.__dict__
+                if hasattr(self.inventory, "__dict__")
+                else self.inventory
+            ).encode(),
+            "namespace": self.namespace or bytes(),
+        }
+        if self.research:
+            sections["research"] = json.dumps(_research_to_dict(self.research)).encode()
+
+        header = [_SNAPSHOT_HEADER.pack(SNAPSHOT_MAGIC, SNAPSHOT_VERSION, self.timestamp, len(sections))]
+        payloads = []
+        for name, data in sections.items():
+            compressed = zlib.compress(data)
+            header.append(bytes([len(name)]) + name.encode() + _SECTION_LENGTH.pack(len(compressed)))
+            payloads.append(compressed)
+        return b"".join(header + payloads)
+
+    @classmethod
+    def from_binary(cls, blob) -> "GameState":
+        """
+        Read a snapshot written by `to_binary`. Only the header is read here - each section is decompressed
+        and decoded the first time it is accessed.
+        """
+        view = memoryview(blob)
+        magic, version, timestamp, count = _SNAPSHOT_HEADER.unpack_from(view)
+        if magic != SNAPSHOT_MAGIC:
+            raise ValueError("Not a GameState snapshot")
+        if version > SNAPSHOT_VERSION:
+            raise ValueError(f"Unsupported GameState snapshot version {version}")
+
+        offset = _SNAPSHOT_HEADER.size
+        lengths = []
+        for _ in range(count):
+            name_length = view[offset]
+            name = bytes(view[offset + 1:offset + 1 + name_length]).decode()
+            offset += 1 + name_length
+            (length,) = _SECTION_LENGTH.unpack_from(view, offset)
+            offset += _SECTION_LENGTH.size
+            lengths.append((name, length))
+
+        sections = {}
+        for name, length in lengths:
+            sections[name] = bytes(view[offset:offset + length])
+            offset += length
+
+        state = cls.__new__(cls)
+        state.timestamp = timestamp
+        state._sections = sections
+        return state
+
+    @classmethod
+    def load(cls, data) -> "GameState":
+        """Read a state as stored in the database: a binary snapshot, a JSON string or an already parsed dict"""
+        if isinstance(data, (bytes, bytearray, memoryview)):
+            return cls.from_binary(data)
+        if isinstance(data, str):
+            return cls.parse_raw(data)
+        return cls.parse(data)
+
+    def __getattr__(self, name):
+        # Only reached for unset attributes, i.e. sections of a snapshot that have not been decoded yet
+        sections = self.__dict__.get("_sections")
+        if sections is None or name not in _SECTION_DECODERS:
+            raise AttributeError(name)
+        data = zlib.decompress(sections[name]) if name in sections else None
+        value = _SECTION_DECODERS[name](data)
+        setattr(self, name, value)
+        return value
+
     # def to_raw(self) -> str:
     #     """Convert state to JSON string"""
     #     return json.dumps({
@@ -63,7 +63,8 @@ class Program(BaseModel):
             value=row["value"],
             visits=row["visits"],
             parent_id=row["parent_id"],
-            state=GameState.parse(row["state_json"]) if row["state_json"] else None,
+            state=GameState.load(row["state_blob"]) if row.get("state_blob")
+            else GameState.load(row["state_json"]) if row["state_json"] else None,
             raw_reward=row["raw_reward"],
             holdout_value=row["holdout_value"],
             created_at=row["created_at"],
@@ -18,6 +18,12 @@ from game_types import Prototype, Resource, Technology, prototype_by_name, Recip
 from models.serializable_function import SerializableFunction
 from models.game_state import GameState
 
+# Marks a variable that did not exist before a statement was executed
+_UNSET = object()
+
+# Public builtins exposed to agent programs. These never change, so we only collect them once.
+_BUILTINS = {name: getattr(builtins, name) for name in dir(builtins) if not name.startswith('_')}
+
 
 class LoopContext:
     def __init__(self):
@@ -53,6 +59,9 @@ class FactorioNamespace:
     def __init__(self, instance):
         self.logging_results = {}
         self.line_value = 0
+        # Static variables (builtins, prototypes, entity classes) that are the same for every agent
+        self.static_vars = {}
+        # Variables defined by the agent. Only these are rolled back on error and serialized into the game state.
         self.persistent_vars = {}
         self.instance = instance
         self.tcp_port = instance.tcp_port
@@ -68,7 +77,7 @@ class FactorioNamespace:
             if not name.startswith('_'):  # Skip private/special names
                 try:
                     setattr(self, name, getattr(builtins, name))
-                    self.persistent_vars[name] = getattr(builtins, name)
+                    self.static_vars[name] = getattr(builtins, name)
                 except Exception as e:
                     print(f"Failed to add builtin {name}: {e}")
 
@@ -110,7 +119,7 @@ class FactorioNamespace:
 
         for name, func in self.essential_builtins.items():
             setattr(self, name, func)
-            self.persistent_vars[name] = func
+            self.static_vars[name] = func
 
         # Turn this on to capture the outputs of all statements, rather than just `print` statement logs.
         self.capture_whole_output = False
@@ -118,6 +127,17 @@ class FactorioNamespace:
         # We capture prints in order of them being run
         self.execution_trace = True
 
+        # Compile each AST node once per program and keep the evaluation dict up to date incrementally,
+        # rather than recompiling on every loop iteration and rebuilding it after every statement.
+        self.cache_compiled_code = True
+        self._code_cache = {}
+        self._rewritten_nodes = set()
+        self._dirty_vars = set()
+        self._function_names = set()
+        self._class_members = None
+        # Previous values of the variables persisted by the statement currently being executed
+        self._journal = {}
+
         # Available objects that the agent can interact with
         self.Prototype = Prototype
         self.Resource = Resource
@@ -180,9 +200,16 @@ class FactorioNamespace:
             )
         )
 
-        # Add each entity class to both the namespace and persistent vars
+        # Add each entity class to both the namespace and static vars
         for name, entity_class in entity_classes:
             setattr(self, name, entity_class)
+            self.static_vars[name] = entity_class
+
+        for name in ('Prototype', 'Resource', 'Direction', 'EntityStatus', 'Technology', 'RecipeName'):
+            self.static_vars[name] = getattr(self, name)
+        for name, value in self.prototype_by_name.items():
+            if value.entity_class:
+                self.static_vars[value.name] = value.entity_class
 
         # Add all the members of this class as static members so they can be accessed by the agent program.
         self._static_members = [attr for attr in dir(self)
@@ -213,6 +240,96 @@ class FactorioNamespace:
             print(f"Error restoring namespace: {e}")
             pass
 
+    def _compile(self, node, mode='eval'):
+        """
+        Compile a single AST node, either as an expression (`eval`) or as a statement (`exec`).
+        Code objects are cached by node identity for the duration of the current program.
+        """
+        key = (id(node), mode)
+        if self.cache_compiled_code and key in self._code_cache:
+            return self._code_cache[key]
+
+        if mode == 'eval':
+            compiled = compile(ast.Expression(node), 'file', 'eval')
+        else:
+            compiled = compile(ast.Module([node], type_ignores=[]), 'file', 'exec')
+
+        if self.cache_compiled_code:
+            self._code_cache[key] = compiled
+        return compiled
+
+    def _persist(self, name, value):
+        """Store a variable in the persistent namespace, and mark it for syncing into the running program"""
+        if name not in self._journal:
+            self._journal[name] = self.persistent_vars.get(name, _UNSET)
+        self.persistent_vars[name] = value
+        self._dirty_vars.add(name)
+
+    def _commit(self):
+        """Keep the variables persisted by the last statement"""
+        self._journal = {}
+
+    def _rollback(self):
+        """Restore the variables persisted by the last statement to their previous values"""
+        for name, value in self._journal.items():
+            if value is _UNSET:
+                self.persistent_vars.pop(name, None)
+            else:
+                self.persistent_vars[name] = value
+        self._journal = {}
+
+    def _get_class_members(self):
+        """Public class-level members (i.e methods) bound to this namespace. These are static, so we collect them once."""
+        if self._class_members is None:
+            self._class_members = {name: getattr(self, name) for name in dir(type(self)) if not name.startswith('_')}
+        return self._class_members
+
+    def _build_eval_dict(self):
+        """Build the globals that an agent program is evaluated in"""
+        if not self.cache_compiled_code:
+            return {
+                **_BUILTINS,
+                **{name: getattr(self, name) for name in dir(self) if not name.startswith('_')},
+                **self.static_vars,
+                **self.persistent_vars
+            }
+
+        return {
+            **_BUILTINS,
+            **self._get_class_members(),
+            **{name: value for name, value in vars(self).items() if not name.startswith('_')},
+            **self.static_vars,
+            **self.persistent_vars
+        }
+
+    def _sync_eval_dict(self, eval_dict):
+        """Bring the evaluation dict up to date with the persistent namespace after a top-level statement"""
+        if not self.cache_compiled_code:
+            eval_dict.update(self.static_vars)
+            eval_dict.update(self.persistent_vars)
+            # Re-bind any new SerializableFunction objects after dict update
+            for key, value in eval_dict.items():
+                if isinstance(value, SerializableFunction):
+                    eval_dict[key] = value.bind(self)
+            return
+
+        if not self._dirty_vars:
+            return
+
+        for name in self._dirty_vars:
+            if name in self.persistent_vars:
+                value = self.persistent_vars[name]
+                eval_dict[name] = value
+                if isinstance(value, SerializableFunction):
+                    self._function_names.add(name)
+        self._dirty_vars.clear()
+
+        # Re-bind functions so that they are reconstructed with the newly persisted variables in scope
+        for name in self._function_names:
+            value = eval_dict.get(name)
+            if isinstance(value, SerializableFunction):
+                eval_dict[name] = value.bind(self)
+
     def _assign_target(self, target, value, eval_dict):
         """Helper function to handle different types of assignment targets"""
         if isinstance(target, ast.Name):
@@ -303,6 +420,12 @@ class FactorioNamespace:
         return error_lines
 
     def _change_print_to_log(self, node):
+        # Nodes are rewritten in place, so each only needs visiting once per program
+        if self.cache_compiled_code:
+            if id(node) in self._rewritten_nodes:
+                return node
+            self._rewritten_nodes.add(id(node))
+
         if isinstance(node, ast.Expr):
             # check if its print, if it is, then we route to log
             if isinstance(node.value, ast.Call) and isinstance(node.value.func, ast.Name) and node.value.func.id == 'print':
@@ -366,7 +489,7 @@ class FactorioNamespace:
                     return f"{base_type}[{type_arg}]"
 
             try:
-                compiled = compile(ast.Expression(annotation), 'annotation', 'eval')
+                compiled = self._compile(annotation, 'eval')
                 return eval(compiled, eval_dict)
             except Exception as e:
                 return ast.unparse(annotation)
@@ -383,7 +506,7 @@ class FactorioNamespace:
         elif isinstance(node, ast.For):
             try:
                 self.loop_context.enter_loop(node)
-                iter_obj = eval(compile(ast.Expression(node.iter), 'file', 'eval'), eval_dict)
+                iter_obj = eval(self._compile(node.iter, 'eval'), eval_dict)
                 for item in iter_obj:
                     self._assign_target(node.target, item, eval_dict)
                     result = self.execute_body(node.body, eval_dict, node)
@@ -403,7 +526,7 @@ class FactorioNamespace:
         elif isinstance(node, ast.While):
             self.loop_context.enter_loop(node)
             try:
-                while eval(compile(ast.Expression(node.test), 'file', 'eval'), eval_dict):
+                while eval(self._compile(node.test, 'eval'), eval_dict):
                     result = self.execute_body(node.body, eval_dict, node)
 
                     if self.loop_context.state == "BREAK":
@@ -420,7 +543,7 @@ class FactorioNamespace:
 
         elif isinstance(node, ast.If):
             # Handle if statements
-            test_result = eval(compile(ast.Expression(node.test), 'file', 'eval'), eval_dict)
+            test_result = eval(self._compile(node.test, 'eval'), eval_dict)
             if test_result:
                 self.execute_body(node.body, eval_dict, node)
             elif node.orelse:
@@ -471,8 +594,7 @@ class FactorioNamespace:
                 **eval_dict
             }
 
-            wrapped_node = ast.Module([node], type_ignores=[])
-            compiled = compile(wrapped_node, 'file', 'exec')
+            compiled = self._compile(node, 'exec')
             exec(compiled, function_namespace)
 
             func = function_namespace[node.name]
@@ -481,7 +603,7 @@ class FactorioNamespace:
                 func.__annotations__ = getattr(node, '__annotations__')
 
             serialized_func = SerializableFunction(func, self)
-            self.persistent_vars[node.name] = serialized_func
+            self._persist(node.name, serialized_func)
             setattr(self, node.name, serialized_func)
             eval_dict[node.name] = serialized_func
 
@@ -493,7 +615,7 @@ class FactorioNamespace:
             original_keys = set(eval_dict.keys())
 
             # Compile and execute the assignment
-            compiled = compile(ast.Module([node], type_ignores=[]), 'file', 'exec')
+            compiled = self._compile(node, 'exec')
             exec(compiled, eval_dict)
 
             # Find all new or updated variables
@@ -512,25 +634,37 @@ class FactorioNamespace:
             for name in new_or_updated_keys:
                 if name in eval_dict and not name.startswith('_'):
                     value = eval_dict[name]
-                    self.persistent_vars[name] = wrap_for_serialization(value)
+                    self._persist(name, wrap_for_serialization(value))
                     setattr(self, name, value)
             return True
 
         elif isinstance(node, ast.AnnAssign):
             if node.value:
-                compiled = compile(ast.Module([node], type_ignores=[]), 'file', 'exec')
+                compiled = self._compile(node, 'exec')
                 exec(compiled, eval_dict)
 
                 if isinstance(node.target, ast.Name):
                     name = node.target.id
                     if name in eval_dict:
                         value = eval_dict[name]
-                        self.persistent_vars[name] = wrap_for_serialization(value)
+                        self._persist(name, wrap_for_serialization(value))
                         setattr(self, name, value)
                         #print(f"{self.tcp_port}: Stored annotated variable {name} - {type(value)}")
 
             return True
 
+        elif isinstance(node, ast.AugAssign):
+            compiled = self._compile(node, 'exec')
+            exec(compiled, eval_dict)
+
+            # Persisted like any other assignment, so that the new value isn't lost when the namespace is synced
+            if isinstance(node.target, ast.Name) and not node.target.id.startswith('_'):
+                name = node.target.id
+                value = eval_dict[name]
+                self._persist(name, wrap_for_serialization(value))
+                setattr(self, name, value)
+            return True
+
 
         elif isinstance(node, ast.Expr):
 
@@ -557,17 +691,17 @@ class FactorioNamespace:
                     args = []
                     kwargs = {}
                     for arg in node.value.args:
-                        args.append(eval(compile(ast.Expression(arg), 'file', 'eval'), eval_dict, eval_dict))
+                        args.append(eval(self._compile(arg, 'eval'), eval_dict, eval_dict))
                     for keyword in node.value.keywords:
                         key = keyword.arg
-                        value = eval(compile(ast.Expression(keyword.value), 'file', 'eval'), eval_dict, eval_dict)
+                        value = eval(self._compile(keyword.value, 'eval'), eval_dict, eval_dict)
                         kwargs[key] = value
 
                     # Call the function and let exceptions propagate
                     response = func(*args, **kwargs)
             else:
                 # For non-function call expressions
-                compiled = compile(ast.Expression(node.value), 'file', 'eval')
+                compiled = self._compile(node.value, 'eval')
                 response = eval(compiled, eval_dict, eval_dict)
 
             # Only log if it's not a print statement (which has already been converted to log)
@@ -591,8 +725,7 @@ class FactorioNamespace:
             except Exception as e:
                 handled = False
                 for handler in node.handlers:
-                    if handler.type is None or isinstance(e, eval(compile(ast.Expression(handler.type), 'file',
-                                                                          'eval'), eval_dict)):
+                    if handler.type is None or isinstance(e, eval(self._compile(handler.type, 'eval'), eval_dict)):
                         if handler.name:
                             eval_dict[handler.name] = e
                         self.execute_body(handler.body, eval_dict, handler)
@@ -610,7 +743,7 @@ class FactorioNamespace:
             return True
 
         else:
-            compiled = compile(ast.Module([node], type_ignores=[]), 'file', 'exec')
+            compiled = self._compile(node, 'exec')
             exec(compiled, eval_dict)
             return True
 
@@ -647,18 +780,21 @@ class FactorioNamespace:
         self.line_value = 0
         self.loop_context = LoopContext()
 
-        eval_dict = {
-            **{name: getattr(builtins, name) for name in dir(builtins) if not name.startswith('_')},
-            **{name: getattr(self, name) for name in dir(self) if not name.startswith('_')},
-            **self.persistent_vars
-        }
+        self._code_cache = {}
+        self._rewritten_nodes = set()
+        self._dirty_vars = set()
+        self._function_names = set()
+
+        eval_dict = self._build_eval_dict()
 
         # Bind any SerializableFunction objects
         for key, value in eval_dict.items():
             if isinstance(value, SerializableFunction):
                 eval_dict[key] = value.bind(self)
+                self._function_names.add(key)
 
-        last_successful_state = None
+        self._journal = {}
+        has_successful_state = False
         had_error = False
 
         # Execute the expression
@@ -666,7 +802,8 @@ class FactorioNamespace:
             try:
                 node = self._change_print_to_log(node)
                 self.execute_node(node, eval_dict)
-                last_successful_state = dict(self.persistent_vars)
+                self._commit()
+                has_successful_state = True
             except (Exception, NameError) as e:
 
                 had_error = True
@@ -691,17 +828,20 @@ class FactorioNamespace:
 
                 self.log(error_message)
 
-                if last_successful_state is not None:
-                    self.persistent_vars = last_successful_state.copy()
+                # Undo the variables persisted by the failed statement
+                if has_successful_state:
+                    self._rollback()
+                else:
+                    self._commit()
 
                 #if self._sequential_exception_count >= self.max_sequential_exception_count:
                 break
 
-            eval_dict.update(self.persistent_vars)
-            # Re-bind any new SerializableFunction objects after dict update
-            for key, value in eval_dict.items():
-                if isinstance(value, SerializableFunction):
-                    eval_dict[key] = value.bind(self)
+            self._sync_eval_dict(eval_dict)
+
+        # Release the compiled code objects, which are only valid for this program's AST
+        self._code_cache = {}
+        self._rewritten_nodes = set()
 
         score, goal = self.score()
         result_output = parse_result_into_str(self.logging_results)
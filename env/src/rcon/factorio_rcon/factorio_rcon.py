@@ -1,7 +1,9 @@
 """RCON client for factorio servers"""
 
 import functools
+import select
 import socket
+import struct
 
 import construct
 
@@ -25,6 +27,46 @@ PACKET_PARSER = construct.GreedyRange(
 )
 
 
+# Little-endian int32 length prefix, then the packet id and type
+LENGTH_PREFIX = struct.Struct("<i")
+PACKET_HEADER = struct.Struct("<ii")
+# Smallest valid packet: id, type, empty body terminator and empty padding terminator
+MIN_PACKET_SIZE = PACKET_HEADER.size + 2
+# Largest packet accepted. The largest responses (the serialized entities of a whole factory) are a few MB, so a length
+# prefix above this means the stream is corrupt or out of sync, rather than a buffer that should be allocated
+MAX_PACKET_SIZE = 256 * 1024 * 1024
+
+
+def decode_packet(packet):
+    """Decodes a single packet (without its length prefix) into a response with id, type and body
+
+    Params:
+        packet: bytes-like; the packet contents, as sized by its length prefix.
+    Raises:
+        InvalidResponse: if the packet is too short or the body is not null terminated.
+    Returns:
+        construct.Container with id, type and body, as PACKET_PARSER would parse it.
+    """
+    if len(packet) < MIN_PACKET_SIZE:
+        raise InvalidResponse(PARSE_FAILED)
+    packet_id, packet_type = PACKET_HEADER.unpack_from(packet)
+    end = packet.find(b"\x00", PACKET_HEADER.size)
+    if end == -1:
+        raise InvalidResponse(PARSE_FAILED)
+    try:
+        body = packet[PACKET_HEADER.size:end].decode("utf8")
+    except UnicodeDecodeError as exc:
+        raise InvalidResponse(PARSE_FAILED) from exc
+    return construct.Container(id=packet_id, type=packet_type, body=body)
+
+
+def check_packet_size(size):
+    """Validates a length prefix read from the server"""
+    if size < MIN_PACKET_SIZE or size > MAX_PACKET_SIZE:
+        raise InvalidResponse(PARSE_FAILED)
+    return size
+
+
 class RCONBaseError(Exception):
     """Exception base for all exceptions in this library"""
 
@@ -196,6 +238,9 @@ class RCONClient(RCONSharedBase):
         try:
             self.send_packet(0, 3, self.password)
             responses = self.receive_packets()
+            # Some servers send an empty response value before the auth response
+            while responses and all(response.type == 0 and not response.body for response in responses):
+                responses = self.receive_packets()
         except RCONBaseError as exc:
             raise RCONConnectError(CONNECT_COMMUNICATION_ERROR) from exc
         for response in responses:
@@ -260,28 +305,48 @@ class RCONClient(RCONSharedBase):
         Extra information:
             Each element of the list will be a response with id, type and body.
             These attributes can be accessed with response.id, response.type etc.
+            Packets are framed by their length prefix and decoded as soon as each is complete.
+            Packets that have already arrived after the first are returned with it.
         """
         try:
-            data = b""
+            responses = []
             while True:
-                read_data = self.rcon_socket.recv(4096)
-                if not read_data:
-                    raise RCONClosed(CONN_CLOSED)
-                data += read_data
-                if len(data) > 2:
-                    if data.endswith(b"\x00\x00"):
-                        break
-            responses = PACKET_PARSER.parse(data)
-        except RCONClosed:
+                size = check_packet_size(LENGTH_PREFIX.unpack(self.receive_exact(LENGTH_PREFIX.size))[0])
+                responses.append(decode_packet(self.receive_exact(size)))
+                # Keep going while further packets have already arrived
+                if not select.select([self.rcon_socket], [], [], 0)[0]:
+                    break
+        except (RCONClosed, InvalidResponse):
             raise
         except socket.timeout as exc:
             raise RCONReceiveError(CONN_TIMEOUT) from exc
-        except construct.ConstructError as exc:
-            raise InvalidResponse(PARSE_FAILED) from exc
         except Exception as exc:
             raise RCONReceiveError(RECEIVE_ERROR) from exc
         return responses
 
+    def receive_exact(self, size):
+        """Receives exactly size bytes from the RCON server
+
+        Params:
+            size: int; number of bytes to receive.
+        Raises:
+            RCONClosed: if the server closes the connection first.
+        Returns:
+            bytearray of length size.
+        Extra information:
+            Data is read straight into a buffer allocated up front from the packet's length prefix,
+            so multi-megabyte responses are not repeatedly copied as they arrive.
+        """
+        buffer = bytearray(size)
+        view = memoryview(buffer)
+        received = 0
+        while received < size:
+            read = self.rcon_socket.recv_into(view[received:])
+            if not read:
+                raise RCONClosed(CONN_CLOSED)
+            received += read
+        return buffer
+
     def send_command(self, command, max_retries=3):
         """Sends a single command to the RCON server
 
@@ -417,6 +482,9 @@ class AsyncRCONClient(RCONSharedBase):
         try:
             await self.send_packet(0, 3, self.password)
             responses = await self.receive_packets()
+            # Some servers send an empty response value before the auth response
+            while responses and all(response.type == 0 and not response.body for response in responses):
+                responses = await self.receive_packets()
         except RCONBaseError as exc:
             raise RCONConnectError(CONNECT_COMMUNICATION_ERROR) from exc
         for response in responses:
@@ -462,7 +530,7 @@ class AsyncRCONClient(RCONSharedBase):
             [dict(id=packet_id, type=packet_type, body=packet_body)]
         )
         try:
-            await self.rcon_socket.execute_script(packet)
+            await self.rcon_socket.send(packet)
         except Exception as exc:
             raise RCONSendError(SEND_ERROR) from exc
 
@@ -479,26 +547,41 @@ class AsyncRCONClient(RCONSharedBase):
         Extra information:
             Each element of the list will be a response with id, type and body.
             These attributes can be accessed with response.id, response.type etc.
+            Packets are framed by their length prefix, and one packet is returned per call.
         """
         try:
-            data = b""
-            while True:
-                try:
-                    data += await self.rcon_socket.receive()
-                except anyio.EndOfStream as exc:
-                    raise RCONClosed(CONN_CLOSED) from exc
-                if len(data) > 2:
-                    if data.endswith(b"\x00\x00"):
-                        break
-            responses = PACKET_PARSER.parse(data)
-        except RCONClosed:
+            size = check_packet_size(LENGTH_PREFIX.unpack(await self.receive_exact(LENGTH_PREFIX.size))[0])
+            responses = [decode_packet(await self.receive_exact(size))]
+        except (RCONClosed, InvalidResponse):
             raise
-        except construct.ConstructError as exc:
-            raise InvalidResponse(PARSE_FAILED) from exc
         except Exception as exc:
             raise RCONReceiveError(RECEIVE_ERROR) from exc
         return responses
 
+    async def receive_exact(self, size):
+        """Receives exactly size bytes from the RCON server asynchronously
+
+        Params:
+            size: int; number of bytes to receive.
+        Raises:
+            RCONClosed: if the server closes the connection first.
+        Returns:
+            bytearray of length size.
+        Extra information:
+            Data is copied into a buffer allocated up front from the packet's length prefix,
+            so multi-megabyte responses are not repeatedly copied as they arrive.
+        """
+        buffer = bytearray(size)
+        received = 0
+        while received < size:
+            try:
+                data = await self.rcon_socket.receive(size - received)
+            except anyio.EndOfStream as exc:
+                raise RCONClosed(CONN_CLOSED) from exc
+            buffer[received:received + len(data)] = data
+            received += len(data)
+        return buffer
+
     async def send_command(self, command):
         """Sends a command to the RCON server asynchronously
 
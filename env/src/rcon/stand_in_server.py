@@ -0,0 +1,226 @@
+"""A stand-in for a Factorio server's RCON endpoint, for profiling the client side without the game
+
+The server speaks the Source RCON protocol and answers commands as the game would, after a configurable delay.
+Lua is not executed. Each command is keyed by the tool it invokes (`global.actions.<tool>`) or, failing that, its
+text. A command's response is taken from the first of these that has one for its key:
+    1. Responses recorded from a real server with ResponseRecorder, replayed in order.
+    2. Built-in responses for the commands FactorioInstance needs to start up (e.g the player and score probes).
+    3. Tool invocations get a synthetic successful response of `payload_size` bytes. Other commands get nothing,
+       as a /c command that doesn't rcon.print anything would.
+
+Usage:
+    with StandInServer(latency=0.005, recording="recording.json") as server:
+        instance = FactorioInstance(address=server.address, tcp_port=server.port, fast=True)
+"""
+
+import itertools
+import json
+import random
+import re
+import socketserver
+import threading
+import time
+from collections import Counter, defaultdict
+
+from rcon.factorio_rcon.factorio_rcon import (LENGTH_PREFIX, PACKET_PARSER, RCONBaseError, check_packet_size,
+                                              decode_packet)
+
+# Packet types of the Source RCON protocol
+SERVERDATA_RESPONSE_VALUE = 0
+SERVERDATA_EXECCOMMAND = 2
+SERVERDATA_AUTH_RESPONSE = 2
+SERVERDATA_AUTH = 3
+
+COMMAND_PREFIXES = ("/silent-command ", "/sc ", "/command ", "/c ")
+TOOL_PATTERN = re.compile(r"global\.actions\.(\w+)")
+TICKS_PER_SECOND = 60
+
+BUILT_IN_RESPONSES = {
+    "rcon.print(game.players[1].position)": "{x = 0, y = 0}",
+    "rcon.print(global.get_lua_script_checksums())": "{}",
+    "score": '{ ["a"] = true, ["b"] = { ["player"] = 0 } }',
+}
+
+
+def invoked_tool(command):
+    """The tool a command invokes, if any"""
+    match = TOOL_PATTERN.search(command)
+    # Loading a tool's script defines global.actions.<tool>, which is not an invocation of it
+    if match and "pcall(" in command:
+        return match.group(1)
+    return None
+
+
+def command_key(command):
+    """The key that a command's responses are recorded and replayed under"""
+    tool = invoked_tool(command)
+    if tool:
+        return tool
+    for prefix in COMMAND_PREFIXES:
+        if command.startswith(prefix):
+            return command[len(prefix):].strip()
+    return command.strip()
+
+
+def synthetic_payload(size):
+    """A successful tool response, of a list of entity-like tables, of at least `size` bytes"""
+    entities = []
+    length = 0
+    for i in itertools.count():
+        if length >= size:
+            break
+        entity = (f'{{ ["name"] = "iron-chest", ["position"] = {{ ["x"] = {i}.5, ["y"] = 0.5 }}, '
+                  f'["direction"] = 0, ["status"] = "working", ["health"] = 200 }}')
+        entities.append(entity)
+        length += len(entity) + 2
+    return '{ ["a"] = true, ["b"] = { ' + ", ".join(entities) + " } }"
+
+
+class ResponseRecorder:
+    """Records the responses a real server gives a client, keyed as the stand-in replays them
+
+    Params:
+        rcon_client: RCONClient; the client to record, e.g. a FactorioInstance's rcon_client.
+    """
+
+    def __init__(self, rcon_client):
+        self.responses = defaultdict(list)
+        self.rcon_client = rcon_client
+        self._send_commands = rcon_client.send_commands
+        rcon_client.send_commands = self.send_commands
+
+    def send_commands(self, commands):
+        results = self._send_commands(commands)
+        for key, command in commands.items():
+            response = results.get(key) or ""
+            # Commands that print nothing are answered with nothing anyway, so only tools' empty responses are kept
+            if response or invoked_tool(command):
+                self.responses[command_key(command)].append(response)
+        return results
+
+    def detach(self):
+        self.rcon_client.send_commands = self._send_commands
+
+    def save(self, path):
+        with open(path, "w") as f:
+            json.dump(self.responses, f)
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def receive_exact(self, size):
+        buffer = bytearray(size)
+        view = memoryview(buffer)
+        received = 0
+        while received < size:
+            read = self.request.recv_into(view[received:])
+            if not read:
+                raise ConnectionError("Client closed the connection")
+            received += read
+        return buffer
+
+    def send(self, packet_id, packet_type, body):
+        self.request.sendall(PACKET_PARSER.build([dict(id=packet_id, type=packet_type, body=body)]))
+
+    def handle(self):
+        server = self.server.stand_in
+        authenticated = False
+        try:
+            while True:
+                size = check_packet_size(LENGTH_PREFIX.unpack(self.receive_exact(LENGTH_PREFIX.size))[0])
+                packet = decode_packet(self.receive_exact(size))
+                if packet.type == SERVERDATA_AUTH:
+                    authenticated = packet.body == server.password
+                    # As Factorio does, acknowledge with an empty response before the auth response
+                    self.send(packet.id, SERVERDATA_RESPONSE_VALUE, "")
+                    self.send(packet.id if authenticated else -1, SERVERDATA_AUTH_RESPONSE, "")
+                elif authenticated and packet.type == SERVERDATA_EXECCOMMAND:
+                    self.send(packet.id, SERVERDATA_RESPONSE_VALUE, server.respond(packet.body))
+                else:
+                    return
+        except (ConnectionError, OSError, RCONBaseError):
+            return
+
+
+class StandInServer:
+    """Pure-Python stand-in for a Factorio server's RCON endpoint
+
+    Params:
+        host (optional, default 127.0.0.1): str; address to listen on.
+        port (optional, default 0): int; port to listen on, or 0 for any free port.
+        password (optional, default factorio): str; password clients must authenticate with.
+        latency (optional, default 0): float; seconds each command takes to execute.
+        jitter (optional, default 0): float; up to this many seconds are randomly added to the latency.
+        payload_size (optional, default 64): int; bytes in the synthetic response to tool invocations.
+        responses (optional): dict; responses to replay, by command key (see command_key).
+        recording (optional): str; path to responses saved by ResponseRecorder, to replay.
+    Extra information:
+        Commands are executed one at a time, as they are in the game, however many clients are connected.
+        `game.tick` advances at 60 ticks per second of wall time.
+    """
+
+    def __init__(self, host="127.0.0.1", port=0, password="factorio", latency=0.0, jitter=0.0, payload_size=64,
+                 responses=None, recording=None):
+        self.password = password
+        self.latency = latency
+        self.jitter = jitter
+        self.payload = synthetic_payload(payload_size)
+
+        responses = dict(responses or {})
+        if recording:
+            with open(recording) as f:
+                responses.update(json.load(f))
+        self._replays = {key: itertools.cycle(values) for key, values in responses.items() if values}
+        self.commands = Counter()
+
+        self._lock = threading.Lock()
+        self._started = time.time()
+        self._server = socketserver.ThreadingTCPServer((host, port), _Handler, bind_and_activate=False)
+        self._server.allow_reuse_address = True
+        self._server.daemon_threads = True
+        self._server.server_bind()
+        self._server.server_activate()
+        self._server.stand_in = self
+        self._thread = None
+
+    @property
+    def address(self):
+        return self._server.server_address[0]
+
+    @property
+    def port(self):
+        return self._server.server_address[1]
+
+    def respond(self, command):
+        """The response to a command, after its latency has elapsed"""
+        key = command_key(command)
+        with self._lock:
+            self.commands[key] += 1
+            delay = self.latency + (random.uniform(0, self.jitter) if self.jitter else 0)
+            if delay:
+                time.sleep(delay)
+            if key in self._replays:
+                return next(self._replays[key])
+        if key in BUILT_IN_RESPONSES:
+            return BUILT_IN_RESPONSES[key]
+        if "rcon.print(game.tick)" in key:
+            return str(int((time.time() - self._started) * TICKS_PER_SECOND))
+        if invoked_tool(command):
+            return self.payload
+        return ""
+
+    def start(self):
+        self._thread = threading.Thread(target=self._server.serve_forever, args=(0.05,), daemon=True, name="stand-in-rcon")
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
+        if self._thread:
+            self._thread.join()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
@@ -61,5 +61,7 @@ global.actions.clear_entities = function(player_index)
 
     reset_character_inventory(player)
     player.force.reset()
+    -- Every entity was destroyed without an event, so observers start again from the entities loaded next
+    global.utils.reset_entity_changes()
     return 1
 end
\ No newline at end of file
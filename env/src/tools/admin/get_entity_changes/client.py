@@ -0,0 +1,74 @@
+from dataclasses import dataclass, field
+from typing import Dict, List, Union
+
+from entities import Entity, EntityGroup
+from instance import PLAYER
+from tools.agent.get_entities.client import GetEntities
+from tools.tool import Tool
+
+
+@dataclass
+class EntityChanges:
+    cursor: int
+    reset: bool = False
+    changed: List[Entity] = field(default_factory=list)
+    removed: List[int] = field(default_factory=list)
+
+    def __bool__(self):
+        return self.reset or bool(self.changed) or bool(self.removed)
+
+
+class GetEntityChanges(Tool):
+    """
+    Fetches the player's entities that changed since a cursor, and keeps a mirror of all of them up to date from
+    those changes, so that observing the factory costs as much as the change rather than the whole factory.
+    """
+
+    def __init__(self, connection, game_state):
+        super().__init__(connection, game_state)
+        self.builder = GetEntities(connection, game_state)
+        self.cursor = 0
+        self.mirror: Dict[int, Entity] = {}
+
+    def __call__(self, cursor: int = 0, sweep: bool = False) -> EntityChanges:
+        """
+        Get the entities that changed, and the ids of those removed, since `cursor`.
+        :param cursor: The cursor returned by a previous call, or 0 to get every entity.
+        :param sweep: Also check every entity for changes that raise no event (inventories, status and the like),
+        which costs time proportional to the factory. Built, removed and reconfigured entities are always included.
+        :return: The changes, and the cursor to pass next time.
+        """
+        response, _ = self.execute(PLAYER, cursor, sweep)
+        if not isinstance(response, dict):
+            raise Exception("Could not get entity changes", response)
+
+        changed = response.get("changed") or []
+        removed = response.get("removed") or []
+        if isinstance(changed, dict):
+            changed = list(changed.values())
+        if isinstance(removed, dict):
+            removed = list(removed.values())
+
+        return EntityChanges(
+            cursor=int(response.get("cursor", 0)),
+            reset=bool(response.get("reset")),
+            changed=self.builder.build_entities(changed),
+            removed=[int(unit_number) for unit_number in removed],
+        )
+
+    def sync(self, sweep: bool = False) -> EntityChanges:
+        """Bring the mirror up to date, returning what changed since the last sync (see __call__ for `sweep`)"""
+        changes = self(self.cursor, sweep)
+        if changes.reset:
+            self.mirror = {}
+        for unit_number in changes.removed:
+            self.mirror.pop(unit_number, None)
+        for entity in changes.changed:
+            self.mirror[entity.id] = entity
+        self.cursor = changes.cursor
+        return changes
+
+    def entities(self) -> List[Union[Entity, EntityGroup]]:
+        """The mirrored entities, grouped as `get_entities` would group them"""
+        # Grouping marks belts as sources and termini, which mustn't leak into the mirror
+        return self.builder.group_entities([entity.model_copy() for entity in self.mirror.values()])
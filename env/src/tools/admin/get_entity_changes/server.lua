@@ -0,0 +1,10 @@
+global.actions.get_entity_changes = function(player_index, cursor, sweep)
+    local player = game.get_player(player_index)
+    local changes = global.utils.get_entity_changes(player.surface, tonumber(cursor) or 0, sweep == true)
+    return dump({
+        cursor = changes.cursor,
+        reset = changes.reset,
+        removed = changes.removed,
+        changed = global.utils.serialize_entities(changes.changed)
+    })
+end
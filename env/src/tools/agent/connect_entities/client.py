@@ -607,7 +607,7 @@ class ConnectEntities(Tool):
         )
 
         for group in entity_groups:
-            if source_pos in [entity.position for entity in group.belts]:
+            if any(entity.position == source_pos for entity in group.belts):
                 return cast(List[BeltGroup], [group])
 
         return cast(List[BeltGroup], entity_groups)
@@ -717,7 +717,7 @@ class ConnectEntities(Tool):
 
         for group in entity_groups:
             group.pipes = _deduplicate_entities(group.pipes)
-            if source_pos in [entity.position for entity in group.pipes]:
+            if any(entity.position == source_pos for entity in group.pipes):
                 return [group]
 
         return entity_groups
@@ -731,7 +731,7 @@ class ConnectEntities(Tool):
 
         for group in entity_groups:
             group.entities = _deduplicate_entities(group.entities)
-            if source_pos in [entity.position for entity in group.entities]:
+            if any(entity.position == source_pos for entity in group.entities):
                 return [group]
 
         return entity_groups
@@ -744,7 +744,7 @@ class ConnectEntities(Tool):
 
         for group in entity_groups:
             group.pipes = _deduplicate_entities(group.pipes)
-            if source_pos in [entity.position for entity in group.pipes]:
+            if any(entity.position == source_pos for entity in group.pipes):
                 return [group]
 
         return entity_groups
@@ -22,6 +22,14 @@ def _deduplicate_entities(entities: List[Entity]) -> List[Entity]:
     return list(reversed(unique_entities))
 
 
+def _without(entities: List[Entity], removed: List[Entity]) -> List[Entity]:
+    """
+    Remove the given entities (by identity) in a single pass, rather than calling list.remove for each one.
+    """
+    removed_ids = {id(entity) for entity in removed}
+    return [entity for entity in entities if id(entity) not in removed_ids]
+
+
 def _construct_group(id: int,
                      entities: List[Entity],
                      prototype: Prototype,
@@ -104,6 +112,8 @@ def consolidate_underground_belts(belt_groups):
                     underground_pairs[belt.connected_to]['exit'] = belt
                     underground_pairs[belt.id]['entrance'] = belt
 
+        belt_indices = {id(belt): i for i, belt in enumerate(group.belts)}
+
         # Third pass: create consolidated underground belts and build new belt list
         for i, belt in enumerate(group.belts):
             if i in removed_indices:
@@ -143,7 +153,7 @@ def consolidate_underground_belts(belt_groups):
                             pass
 
                         # Mark both entrance and exit for removal
-                        exit_idx = group.belts.index(exit)
+                        exit_idx = belt_indices[id(exit)]
                         removed_indices.add(i)
                         removed_indices.add(exit_idx)
                     #continue
@@ -154,14 +164,14 @@ def consolidate_underground_belts(belt_groups):
         # Update group's belt list
         group.belts = new_belts
 
-        # Update inputs and outputs
-        group.inputs = [belt for belt in group.inputs if belt not in group.belts]
-        group.outputs = [belt for belt in group.outputs if belt not in group.belts]
-
         position_dict = {}
         for belt in group.belts:
             position_dict[belt.position] = belt
 
+        # Update inputs and outputs (belts compare by position)
+        group.inputs = [belt for belt in group.inputs if belt.position not in position_dict]
+        group.outputs = [belt for belt in group.outputs if belt.position not in position_dict]
+
         for belt in new_belts:
             if belt.is_source and (belt.input_position not in position_dict or position_dict[belt.input_position].output_position != belt.position):
                 group.inputs.append(belt)
@@ -183,7 +193,7 @@ def construct_belt_groups(belts: List[Union[TransportBelt, UndergroundBelt]], pr
 
     # Maps to store underground connections
     underground_entrances = []  # List of (position, direction) for entrances
-    underground_exits = []  # List of (position, direction) for exits
+    underground_exits = {}  # Map of position -> direction for exits
 
     # First pass: organize belts and identify underground entrances/exits
     for belt in belts:
@@ -194,62 +204,50 @@ def construct_belt_groups(belts: List[Union[TransportBelt, UndergroundBelt]], pr
             if belt.is_input:
                 underground_entrances.append((pos, belt.direction))
             else:
-                underground_exits.append((pos, belt.direction))
+                underground_exits[pos] = belt.direction
 
         if belt.is_source:
             source_belts.append(belt)
         if belt.is_terminus:
             terminal_belts.append(belt)
 
+    underground_offsets = {
+        Direction.EAST.value: (1, 0),  # Looking right
+        Direction.WEST.value: (-1, 0),  # Looking left
+        Direction.SOUTH.value: (0, 1),  # Looking down
+        Direction.NORTH.value: (0, -1),  # Looking up
+    }
+
     def find_matching_exit(entrance_pos, direction):
+        offset = underground_offsets.get(direction.value)
+        if not offset:
+            return None
+
         entrance_x, entrance_y = entrance_pos
-        closest_exit = None
-        min_distance = float('inf')
+        max_range = 4  # Default underground belt range
 
-        for exit_pos, exit_dir in underground_exits:
-            exit_x, exit_y = exit_pos
-            if exit_dir != direction:
-                continue
+        # Step along the direction of travel, so the first exit found is the closest
+        for distance in range(1, max_range + 1):
+            exit_pos = (entrance_x + offset[0] * distance, entrance_y + offset[1] * distance)
+            if exit_pos in underground_exits and underground_exits[exit_pos] == direction:
+                return exit_pos
+        return None
 
-            dx = exit_x - entrance_x
-            dy = exit_y - entrance_y
-            max_range = 4  # Default underground belt range
-
-            # Check if they're in line and in the correct direction
-            match direction.value:
-                case Direction.EAST.value:  # Looking right
-                    if dy == 0 and 0 < dx <= max_range:
-                        distance = dx
-                        if distance < min_distance:
-                            min_distance = distance
-                            closest_exit = exit_pos
-                case Direction.WEST.value:  # Looking left
-                    if dy == 0 and -max_range <= dx < 0:
-                        distance = abs(dx)
-                        if distance < min_distance:
-                            min_distance = distance
-                            closest_exit = exit_pos
-                case Direction.SOUTH.value:  # Looking down
-                    if dx == 0 and 0 < dy <= max_range:
-                        distance = dy
-                        if distance < min_distance:
-                            min_distance = distance
-                            closest_exit = exit_pos
-                case Direction.NORTH.value:  # Looking up
-                    if dx == 0 and -max_range <= dy < 0:
-                        distance = abs(dy)
-                        if distance < min_distance:
-                            min_distance = distance
-                            closest_exit = exit_pos
-
-        return closest_exit
+    # Pair every entrance with its exit up front, keeping the first entrance found for each exit
+    exits_by_entrance = {}
+    entrances_by_exit = {}
+    for entrance_pos, direction in underground_entrances:
+        exit_pos = find_matching_exit(entrance_pos, direction)
+        exits_by_entrance[entrance_pos] = exit_pos
+        if exit_pos:
+            entrances_by_exit.setdefault(exit_pos, entrance_pos)
 
     def get_next_belt_position(belt):
         pos = (belt.position.x, belt.position.y)
 
         # If this is an underground entrance, find its matching exit
         if isinstance(belt, UndergroundBelt) and belt.is_input:
-            exit_pos = find_matching_exit(pos, belt.direction)
+            exit_pos = exits_by_entrance.get(pos)
             if exit_pos:
                 return exit_pos
 
@@ -262,108 +260,87 @@ def construct_belt_groups(belts: List[Union[TransportBelt, UndergroundBelt]], pr
 
         # If this is an underground exit, find its matching entrance
         if isinstance(belt, UndergroundBelt) and not belt.is_input:
-            for entrance_pos, direction in underground_entrances:
-                if find_matching_exit(entrance_pos, direction) == pos:
-                    return entrance_pos
+            if pos in entrances_by_exit:
+                return entrances_by_exit[pos]
 
         # Otherwise use normal input position
         input = belt.input_position
         return (input.x, input.y)
 
-    def walk_forward(belt, group):
-        pos = (belt.position.x, belt.position.y)
-        if pos in visited:
-            return group
-
-        if not group:
-            belt.is_source = True
-            group.append(belt)
-        elif belt not in group:
+    def walk_forward(belt):
+        group = []
+        while (belt.position.x, belt.position.y) not in visited:
+            if not group:
+                belt.is_source = True
             group.append(belt)
+            visited.add((belt.position.x, belt.position.y))
 
-        visited.add(pos)
-        next_pos = get_next_belt_position(belt)
-
-        if next_pos in belts_by_position:
-            next_belt = belts_by_position[next_pos]
-            walk_forward(next_belt, group)
-        else:
-            if group and group[-1] not in terminal_belts:
+            next_pos = get_next_belt_position(belt)
+            if next_pos not in belts_by_position:
                 group[-1].is_terminus = True
+                break
+            belt = belts_by_position[next_pos]
         return group
 
-    def walk_backward(belt, group):
-        pos = (belt.position.x, belt.position.y)
-        if pos in visited:
-            return group
-
-        if not group:
-            belt.is_terminus = True
+    def walk_backward(belt):
+        group = []
+        while (belt.position.x, belt.position.y) not in visited:
+            if not group:
+                belt.is_terminus = True
             group.append(belt)
-        elif belt not in group:
-            group.insert(0, belt)
-
-        visited.add(pos)
-        prev_pos = get_prev_belt_position(belt)
+            visited.add((belt.position.x, belt.position.y))
 
-        if prev_pos in belts_by_position:
-            prev_belt = belts_by_position[prev_pos]
-            walk_backward(prev_belt, group)
-        else:
-            if group and group[0] not in source_belts:
-                group[0].is_source = True
+            prev_pos = get_prev_belt_position(belt)
+            if prev_pos not in belts_by_position:
+                group[-1].is_source = True
+                break
+            belt = belts_by_position[prev_pos]
+        group.reverse()
         return group
 
     # Build initial groups starting from sources
     for source in source_belts:
-        if (source.position.x, source.position.y) not in visited:
-            group = walk_forward(source, [])
-            if group:
-                initial_groups.append(group)
+        group = walk_forward(source)
+        if group:
+            initial_groups.append(group)
 
     # Then try terminals if we missed any
     for terminal in terminal_belts:
-        if (terminal.position.x, terminal.position.y) not in visited:
-            group = walk_backward(terminal, [])
-            if group:
-                initial_groups.append(group)
+        group = walk_backward(terminal)
+        if group:
+            initial_groups.append(group)
 
     # If still no groups, try starting from any underground entrance
     if not initial_groups:
         for entrance_pos, _ in underground_entrances:
-            if entrance_pos not in visited:
-                belt = belts_by_position[entrance_pos]
-                group = walk_forward(belt, [])
-                if group:
-                    initial_groups.append(group)
+            group = walk_forward(belts_by_position[entrance_pos])
+            if group:
+                initial_groups.append(group)
 
     # Finally, if still no groups, start from any belt
     if not initial_groups and belts:
-        start_belt = belts[0]
-        group = walk_forward(start_belt, [])
+        group = walk_forward(belts[0])
         if group:
             initial_groups.append(group)
 
-    # Merge overlapping groups
+    # Merge each group into the first earlier group that one of its belts outputs into (e.g side-loading), looking
+    # outputs up in a position -> group map rather than comparing against the belts of every earlier group
     final_groups = []
-    visited_belts = set()
-
+    final_group_by_position = {}
     for group in initial_groups:
-        merged = False
-        for final_group in final_groups:
-            # Check if this group should be merged with an existing group
-            if any((belt.output_position.x, belt.output_position.y) in
-                   {(b.position.x, b.position.y) for b in final_group}
-                   for belt in group):
-                # Merge groups
-                for belt in group:
-                    if belt not in final_group:
-                        final_group.append(belt)
-                merged = True
-                break
-
-        if not merged:
+        targets = [
+            final_group_by_position[output]
+            for output in ((belt.output_position.x, belt.output_position.y) for belt in group)
+            if output in final_group_by_position
+        ]
+        if targets:
+            index = min(targets)
+            final_groups[index].extend(group)
+        else:
+            index = len(final_groups)
             final_groups.append(group)
+        for belt in group:
+            final_group_by_position[(belt.position.x, belt.position.y)] = index
 
     groups = [_construct_group(
         id=i,
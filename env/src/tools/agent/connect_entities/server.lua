@@ -561,6 +561,7 @@ local function place_at_position(player, connection_type, current_position, dir,
         if can_place and not dry_run then
             local placed_entity = game.surfaces[1].create_entity(entity_variant)
             if placed_entity then
+                global.utils.mark_entity_changed(placed_entity)
                 player.remove_item({name = connection_type, count = 1})
                 counter_state.place_counter = counter_state.place_counter + 1
                 table.insert(serialized_entities, global.utils.serialize_entity(placed_entity))
@@ -628,7 +629,8 @@ local function place_at_position(player, connection_type, current_position, dir,
             position = placement_position,
             direction = dir,
             force = player.force,
-            move_stuck_players=true
+            move_stuck_players=true,
+            raise_built=true
         })
 
         if placed_entity then
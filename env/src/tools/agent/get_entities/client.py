@@ -1,13 +1,35 @@
 from time import sleep
-from typing import List, Set, Union
-from entities import Position, Entity
+from typing import Iterable, List, Optional, Set, Union
+from entities import Position, Entity, EntityGroup, Direction, Dimensions, TileDimensions
 from instance import PLAYER
 from game_types import Prototype
 from tools.agent.connect_entities.groupable_entities import (
+    _without,
     agglomerate_groupable_entities,
 )
 from tools.tool import Tool
 
+# Fields that are always serialized when a projection is requested, as every entity needs them to be displayed
+BASE_FIELDS = ("name", "position", "direction", "tile_dimensions")
+
+# How to build the nested values of a projected entity, which skips pydantic validation.
+# `status` is already an EntityStatus once the response has been cleaned.
+SLIM_FIELD_TYPES = {
+    "position": lambda value: Position(**value),
+    "direction": Direction,
+    "dimensions": lambda value: Dimensions(**value),
+    "tile_dimensions": lambda value: TileDimensions(**value),
+}
+
+_prototypes_by_name = {}
+
+
+def prototype_by_name(name: str) -> Optional[Prototype]:
+    if not _prototypes_by_name:
+        for prototype in Prototype:
+            _prototypes_by_name.setdefault(prototype.value[0], prototype)
+    return _prototypes_by_name.get(name.replace("_", "-"))
+
 
 class GetEntities(Tool):
     def __init__(self, connection, game_state):
@@ -18,12 +40,16 @@ class GetEntities(Tool):
         entities: Union[Set[Prototype], Prototype] = set(),
         position: Position = None,
         radius: float = 1000,
+        fields: Optional[Union[Iterable[str], str]] = None,
     ) -> List[Entity]:
         """
         Get entities within a radius of a given position.
         :param entities: Set of entity prototypes to filter by. If empty, all entities are returned.
         :param position: Position to search around. Can be a Position object or "player" for player's position.
         :param radius: Radius to search within.
+        :param fields: Only fetch these fields of each entity (e.g {"status"}, or a single field name), rather than the
+        whole entity.
+        Entities fetched this way are not grouped into belt, pipe, pole or wall groups.
         :return: Found entities
         """
         try:
@@ -32,6 +58,8 @@ class GetEntities(Tool):
 
             if not isinstance(entities, Set):
                 entities = set([entities])
+            else:
+                entities = set(entities)
 
             if Prototype.PipeGroup in entities:
                 entities.add(Prototype.Pipe)
@@ -54,15 +82,26 @@ class GetEntities(Tool):
                 else "[]"
             )
 
+            field_names = None
+            if isinstance(fields, str):
+                # A single field, rather than the characters of its name
+                fields = {fields}
+            if fields is not None:
+                field_names = (
+                    "[" + ",".join(f'"{field}"' for field in {*BASE_FIELDS, *fields}) + "]"
+                )
+
             # We need to add a small 50ms sleep to ensure that the entities have updated after previous actions
             sleep(0.05)
 
-            if position is None:
-                response, time_elapsed = self.execute(PLAYER, radius, entity_names)
-            else:
-                response, time_elapsed = self.execute(
-                    PLAYER, radius, entity_names, position.x, position.y
-                )
+            response, time_elapsed = self.execute(
+                PLAYER,
+                radius,
+                entity_names,
+                position.x if position else None,
+                position.y if position else None,
+                field_names,
+            )
 
             if not response:
                 return []
@@ -72,108 +111,131 @@ class GetEntities(Tool):
             ):  # or (isinstance(response, dict) and not response):
                 raise Exception("Could not get entities", response)
 
-            entities_list = []
-            belt_list = []
-            for raw_entity_data in response:
-                if isinstance(raw_entity_data, list):
-                    continue
-
-                entity_data = self.clean_response(raw_entity_data)
-                # Find the matching Prototype
-                matching_prototype = None
-                for prototype in Prototype:
-                    if prototype.value[0] == entity_data["name"].replace("_", "-"):
-                        matching_prototype = prototype
-                        break
-
-                if matching_prototype is None:
-                    print(
-                        f"Warning: No matching Prototype found for {entity_data['name']}"
-                    )
-                    continue
-
-                if matching_prototype not in entities and entities:
-                    continue
-                metaclass = matching_prototype.value[1]
-                while isinstance(metaclass, tuple):
-                    metaclass = metaclass[1]
-
-                # Process nested dictionaries (like inventories)
-                for key, value in entity_data.items():
-                    if isinstance(value, dict):
-                        entity_data[key] = self.process_nested_dict(value)
-
-                entity_data["prototype"] = prototype
-
-                # remove all empty values from the entity_data dictionary
-                entity_data = {
-                    k: v for k, v in entity_data.items() if v or isinstance(v, int)
-                }
-
-                try:
-                    entity = metaclass(**entity_data)
-                    entities_list.append(entity)
-                except Exception as e1:
-                    print(f"Could not create {entity_data['name']} object: {e1}")
-
-            # get all pipes into a list
-            pipes = [
-                entity
-                for entity in entities_list
-                if hasattr(entity, "prototype")
-                and entity.prototype in (Prototype.Pipe, Prototype.UndergroundPipe)
-            ]
-            group = agglomerate_groupable_entities(pipes)
-            [entities_list.remove(pipe) for pipe in pipes]
-            entities_list.extend(group)
-
-            poles = [
-                entity
-                for entity in entities_list
-                if hasattr(entity, "prototype")
-                and entity.prototype
-                in (
-                    Prototype.SmallElectricPole,
-                    Prototype.BigElectricPole,
-                    Prototype.MediumElectricPole,
-                )
-            ]
-            group = agglomerate_groupable_entities(poles)
-            [entities_list.remove(pole) for pole in poles]
-            entities_list.extend(group)
-
-            walls = [
-                entity
-                for entity in entities_list
-                if hasattr(entity, "prototype")
-                and entity.prototype == Prototype.StoneWall
-            ]
-            group = agglomerate_groupable_entities(walls)
-            [entities_list.remove(wall) for wall in walls]
-            entities_list.extend(group)
-
-            belt_types = (
-                Prototype.TransportBelt,
-                Prototype.FastTransportBelt,
-                Prototype.ExpressTransportBelt,
-                Prototype.UndergroundBelt,
-                Prototype.FastUndergroundBelt,
-                Prototype.ExpressUndergroundBelt,
-            )
-            belts = [
-                entity
-                for entity in entities_list
-                if hasattr(entity, "prototype") and entity.prototype in belt_types
-            ]
-            group = agglomerate_groupable_entities(belts)
-            [entities_list.remove(belt) for belt in belts]
-            entities_list.extend(group)
+            entities_list = self.build_entities(response, projected=fields is not None)
+            if fields is not None:
+                return entities_list
 
-            return entities_list
+            return self.group_entities(entities_list)
 
         except Exception as e:
             raise Exception(f"Error in GetEntities: {e}")
 
+    def build_entities(self, response, projected: bool = False) -> List[Entity]:
+        """Build entity models from serialized entities, skipping validation if they only have projected fields"""
+        entities_list = []
+        for raw_entity_data in response:
+            if isinstance(raw_entity_data, list):
+                continue
+
+            entity_data = self.clean_response(raw_entity_data)
+            # The server has already filtered by prototype, so this only maps names to prototypes
+            matching_prototype = prototype_by_name(entity_data["name"])
+
+            if matching_prototype is None:
+                print(
+                    f"Warning: No matching Prototype found for {entity_data['name']}"
+                )
+                continue
+
+            metaclass = matching_prototype.value[1]
+            while isinstance(metaclass, tuple):
+                metaclass = metaclass[1]
+
+            # Process nested dictionaries (like inventories)
+            for key, value in entity_data.items():
+                if isinstance(value, dict):
+                    entity_data[key] = self.process_nested_dict(value)
+
+            entity_data["prototype"] = matching_prototype
+
+            if projected:
+                entities_list.append(self._construct(metaclass, entity_data))
+                continue
+
+            # remove all empty values from the entity_data dictionary
+            entity_data = {
+                k: v for k, v in entity_data.items() if v or isinstance(v, int)
+            }
+
+            try:
+                entity = metaclass(**entity_data)
+                entities_list.append(entity)
+            except Exception as e1:
+                print(f"Could not create {entity_data['name']} object: {e1}")
+
+        return entities_list
+
+    def group_entities(self, entities_list: List[Entity]) -> List[Union[Entity, EntityGroup]]:
+        """Replace pipes, poles, walls and belts with the groups they form"""
+        # get all pipes into a list
+        pipes = [
+            entity
+            for entity in entities_list
+            if hasattr(entity, "prototype")
+            and entity.prototype in (Prototype.Pipe, Prototype.UndergroundPipe)
+        ]
+        group = agglomerate_groupable_entities(pipes)
+        entities_list = _without(entities_list, pipes)
+        entities_list.extend(group)
+
+        poles = [
+            entity
+            for entity in entities_list
+            if hasattr(entity, "prototype")
+            and entity.prototype
+            in (
+                Prototype.SmallElectricPole,
+                Prototype.BigElectricPole,
+                Prototype.MediumElectricPole,
+            )
+        ]
+        group = agglomerate_groupable_entities(poles)
+        entities_list = _without(entities_list, poles)
+        entities_list.extend(group)
+
+        walls = [
+            entity
+            for entity in entities_list
+            if hasattr(entity, "prototype")
+            and entity.prototype == Prototype.StoneWall
+        ]
+        group = agglomerate_groupable_entities(walls)
+        entities_list = _without(entities_list, walls)
+        entities_list.extend(group)
+
+        belt_types = (
+            Prototype.TransportBelt,
+            Prototype.FastTransportBelt,
+            Prototype.ExpressTransportBelt,
+            Prototype.UndergroundBelt,
+            Prototype.FastUndergroundBelt,
+            Prototype.ExpressUndergroundBelt,
+        )
+        belts = [
+            entity
+            for entity in entities_list
+            if hasattr(entity, "prototype") and entity.prototype in belt_types
+        ]
+        group = agglomerate_groupable_entities(belts)
+        entities_list = _without(entities_list, belts)
+        entities_list.extend(group)
+
+        return entities_list
+
+    def _construct(self, metaclass, entity_data):
+        """
+        Build a partially populated entity from projected fields, without validating the missing ones.
+        It is marked as projected, so that its repr only shows the fields that were fetched rather than defaults.
+        """
+        values = {}
+        for key, value in entity_data.items():
+            if key in SLIM_FIELD_TYPES and value is not None:
+                value = SLIM_FIELD_TYPES[key](value)
+            values[key] = value
+        entity = metaclass.model_construct(**values)
+        entity._projected = True
+        return entity
+
     def process_nested_dict(self, nested_dict):
         """Helper method to process nested dictionaries"""
         if isinstance(nested_dict, dict):
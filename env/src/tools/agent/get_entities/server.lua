@@ -1,4 +1,4 @@
-global.actions.get_entities = function(player_index, radius, entity_names_json, position_x, position_y)
+global.actions.get_entities = function(player_index, radius, entity_names_json, position_x, position_y, fields_json)
     local player = game.get_player(player_index)
     local position
     if position_x and position_y then
@@ -14,24 +14,27 @@ global.actions.get_entities = function(player_index, radius, entity_names_json,
         {position.x + radius, position.y + radius}
     }
 
-    local filter = {}
-    if entity_names and #entity_names > 0 then
-        filter = {name = entity_names}
-    end
-
     local entities
     if #entity_names > 0 then
-        entities = player.surface.find_entities_filtered{area = area, force = player.force, filter=filter}
+        entities = player.surface.find_entities_filtered{area = area, force = player.force, name = entity_names}
     else
         entities = player.surface.find_entities_filtered{area = area, force = player.force}
     end
 
-    local result = {}
+    -- An optional list of field names to serialize, instead of the whole entity
+    local fields = nil
+    if fields_json then
+        fields = {}
+        for _, field in pairs(game.json_to_table(fields_json) or {}) do
+            fields[field] = true
+        end
+    end
+
+    local targets = {}
     for _, entity in ipairs(entities) do
         if entity.name ~= 'character' then
-            local serialized = global.utils.serialize_entity(entity)
-            table.insert(result, serialized)
+            table.insert(targets, entity)
         end
     end
-    return dump(result)
-end
\ No newline at end of file
+    return dump(global.utils.serialize_entities(targets, fields))
+end
@@ -73,31 +73,14 @@ global.actions.get_resource_patch = function(player_index, resource, x, y, radiu
             error("\"No resource of type " .. resource .. " at the specified location.\"")
         end
 
-        -- Recursive function to explore all connected resource entities
-        local function explore_resource_patch(entity, visited)
-            local key = entity.position.x .. "," .. entity.position.y
-            if visited[key] then
-                return 0
-            end
-            visited[key] = true
-            expand_bounding_box(bounding_box, entity.position)
-            local resource_count = entity.amount
-
-            local neighbors = surface.find_entities_filtered{
-                area = {{entity.position.x - 1, entity.position.y - 1}, {entity.position.x + 1, entity.position.y + 1}},
-                type = "resource",
-                name = resource
-            }
-            for _, neighbor in pairs(neighbors) do
-                if neighbor ~= entity then
-                    resource_count = resource_count + explore_resource_patch(neighbor, visited)
-                end
-            end
-            return resource_count
+        -- Look up the connected patch in the resource index, rather than flood-filling the world
+        local patch = global.utils.get_indexed_resource_patch(surface, resource_entities[1])
+        if not patch then
+            error("\"No resource of type " .. resource .. " at the specified location.\"")
         end
-
-        local visited = {}
-        local total_resource = explore_resource_patch(resource_entities[1], visited)
+        expand_bounding_box(bounding_box, patch.bounding_box.left_top)
+        expand_bounding_box(bounding_box, patch.bounding_box.right_bottom)
+        local total_resource = patch.size
 
         render_box(bounding_box)
         return {bounding_box = bounding_box, size = total_resource}
@@ -54,6 +54,13 @@ global.actions.nearest = function(player_index, resource)
             end
             --return { x = position.x - closest.x, y = position.y - closest.y }
             return {x = closest.x, y = closest.y}
+        elseif game.entity_prototypes[resource] and game.entity_prototypes[resource].type == "resource" then
+            -- Ores are looked up in the resource index instead of scanning the surrounding area
+            closest = global.utils.nearest_indexed_resource(surface, resource, position, 500)
+            if closest == nil then
+                error("\"Could not find an entity called "..resource.."\"")
+            end
+            return {x = closest.x, y = closest.y}
         else
             entities = surface.find_entities_filtered{
                 area = {{position.x - 500, position.y - 500}, {position.x + 500, position.y + 500}},
@@ -408,6 +408,7 @@ global.actions.place_entity_next_to = function(player_index, entity, ref_x, ref_
         force = player.force,
         direction = orientation,
         move_stuck_players = true,
+        raise_built = true,
     })
 
     if not new_entity then
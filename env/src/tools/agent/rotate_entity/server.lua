@@ -58,6 +58,7 @@ global.actions.rotate_entity = function(player_index, x, y, direction, entity)
     end
 
     game.print("Rotated " .. closest_entity.name .. " to " .. closest_entity.direction)
+    global.utils.mark_entity_changed(closest_entity)
 
     local serialized = global.utils.serialize_entity(closest_entity)
     return serialized
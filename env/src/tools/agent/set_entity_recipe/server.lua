@@ -38,6 +38,7 @@ global.actions.set_entity_recipe = function(player_index, recipe_name, x, y)
             serialized = global.utils.serialize_entity(closest_building)
         end
 
+        global.utils.mark_entity_changed(closest_building)
         local entity_json = game.table_to_json(serialized)
         game.print(entity_json)
         return serialized
@@ -8,6 +8,7 @@ from entities import EntityStatus, Direction
 from lua_manager import LuaScriptManager
 from namespace import FactorioNamespace
 from utils.rcon import _lua2python
+from utils.tracing import span
 
 COMMAND = "/silent-command"
 
@@ -120,12 +121,14 @@ class Controller:
     def execute(self, *args) -> Tuple[Dict, Any]:
         try:
             start = time.time()
-            parameters = [lua.encode(arg) for arg in args]
-            invocation = f"pcall(global.actions.{self.name}{(', ' if parameters else '') + ','.join(parameters)})"
-            wrapped = f"{COMMAND} a, b = {invocation}; rcon.print(dump({{a=a, b=b}}))"
+            with span("serialize"):
+                parameters = [lua.encode(arg) for arg in args]
+                invocation = f"pcall(global.actions.{self.name}{(', ' if parameters else '') + ','.join(parameters)})"
+                wrapped = f"{COMMAND} a, b = {invocation}; rcon.print(dump({{a=a, b=b}}))"
             lua_response = self.connection.rcon_client.send_command(wrapped)
 
-            parsed, elapsed = _lua2python(invocation, lua_response, start=start)
+            with span("parse"):
+                parsed, elapsed = _lua2python(invocation, lua_response, start=start)
             if parsed is None:
                 return {}, lua_response#elapsed
 
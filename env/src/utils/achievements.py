@@ -1,5 +1,5 @@
 from typing import Dict, List, Tuple, Any, Optional
-from copy import deepcopy
+from dataclasses import replace
 
 from models.achievements import ProfitConfig, ProductionFlows
 
@@ -12,8 +12,7 @@ class AchievementTracker:
         if not pre.is_valid() or not post.is_valid():
             return {'static': {}, 'dynamic': {}}
 
-        post = deepcopy(post)
-        post.static_items = AchievementTracker._get_static_items(pre, post)
+        post = replace(post, static_items=AchievementTracker._get_static_items(pre, post))
 
         return AchievementTracker._process_achievements(pre, post)
 
@@ -21,7 +20,7 @@ class AchievementTracker:
     def _get_static_items(pre: ProductionFlows, post: ProductionFlows) -> Dict[str, float]:
         """Calculate static items from production flows."""
         new_flows = pre.get_new_flows(post)
-        static_items = deepcopy(new_flows.harvested)
+        static_items = dict(new_flows.harvested)
 
         for craft in new_flows.crafted:
             for item, value in craft['outputs'].items():
@@ -70,4 +69,12 @@ def eval_program_with_achievements(
     post_flows = ProductionFlows.from_dict(instance.namespace._get_production_stats())
     achievements = AchievementTracker.calculate_achievements(pre_flows, post_flows)
 
-    return result.splitlines(), result, error, achievements
\ No newline at end of file
+    return result.splitlines(), result, error, achievements
+
+
+def fast_forward_with_achievements(instance: Any, ticks: int) -> Dict[str, Dict[str, float]]:
+    """Run the game for exactly `ticks` ticks and calculate what the factory achieved meanwhile."""
+    pre_flows = ProductionFlows.from_dict(instance.namespace._get_production_stats())
+    instance.fast_forward(ticks)
+    post_flows = ProductionFlows.from_dict(instance.namespace._get_production_stats())
+    return AchievementTracker.calculate_achievements(pre_flows, post_flows)
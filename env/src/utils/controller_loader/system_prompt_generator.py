@@ -1,19 +1,97 @@
+import hashlib
+import os
+import tempfile
 from pathlib import Path
+from typing import Dict, List, Optional
 
 from utils.controller_loader.code_analyzer import CodeAnalyzer
 from utils.controller_loader.manual_generator import ManualGenerator
 from utils.controller_loader.schema_generator import SchemaGenerator
 from utils.controller_loader.type_definition_processor import TypeDefinitionProcessor
 
+# In-process memo of generated prompts, keyed by the hash of their source files
+_PROMPT_MEMO: Dict[str, str] = {}
+
 
 class SystemPromptGenerator:
     """Generates system prompts for the Factorio environment."""
 
-    def __init__(self, base_path: str):
+    def __init__(self, base_path: str, cache_dir: Optional[str] = None):
+        """
+        @param base_path: Path to the environment source directory (containing `tools`, `entities.py` etc)
+        @param cache_dir: Directory to persist generated prompts in. Defaults to `.system_prompt_cache` under
+        `base_path`. Pass an empty string to disable the on-disk cache.
+        """
         self.base_path = Path(base_path)
         self.tool_path = self.base_path / "tools" / "agent"
+        if cache_dir is None:
+            cache_dir = str(self.base_path / ".system_prompt_cache")
+        self.cache_dir = cache_dir
+
+    def _source_files(self) -> List[Path]:
+        """All files that contribute to the generated prompt, in a deterministic order."""
+        files = [
+            self.base_path / "game_types.py",
+            self.base_path / "entities.py",
+            self.base_path / "tools" / "agent.md",
+        ]
+        for tool in sorted(os.listdir(self.tool_path)):
+            for name in ("client.py", "agent.md"):
+                path = self.tool_path / tool / name
+                if path.is_file():
+                    files.append(path)
+        return files
+
+    def source_hash(self) -> str:
+        """Hash of the contents of every source file the prompt is generated from."""
+        digest = hashlib.sha256()
+        for path in self._source_files():
+            digest.update(str(path.relative_to(self.base_path)).encode())
+            try:
+                digest.update(path.read_bytes())
+            except FileNotFoundError:
+                digest.update(b"\0")
+        return digest.hexdigest()
+
+    def _cache_path(self, source_hash: str) -> Path:
+        return Path(self.cache_dir) / f"{source_hash}.md"
+
+    def _load_cached(self, source_hash: str) -> Optional[str]:
+        if not self.cache_dir:
+            return None
+        try:
+            return self._cache_path(source_hash).read_text(encoding="utf-8")
+        except OSError:
+            return None
+
+    def _save_cached(self, source_hash: str, prompt: str) -> None:
+        if not self.cache_dir:
+            return
+        try:
+            os.makedirs(self.cache_dir, exist_ok=True)
+            # Write to a temporary file and rename, so concurrent processes never read a partial prompt
+            fd, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix=".tmp")
+            with os.fdopen(fd, "w", encoding="utf-8") as f:
+                f.write(prompt)
+            os.replace(tmp_path, self._cache_path(source_hash))
+        except OSError as e:
+            print(f"Could not cache system prompt in {self.cache_dir}: {e}")
 
     def generate(self) -> str:
+        """Return the system prompt, using the in-process memo or on-disk cache where the sources are unchanged."""
+        source_hash = self.source_hash()
+        if source_hash in _PROMPT_MEMO:
+            return _PROMPT_MEMO[source_hash]
+
+        prompt = self._load_cached(source_hash)
+        if prompt is None:
+            prompt = self._generate()
+            self._save_cached(source_hash, prompt)
+
+        _PROMPT_MEMO[source_hash] = prompt
+        return prompt
+
+    def _generate(self) -> str:
         # Generate schema
         schema_generator = SchemaGenerator(str(self.tool_path))
         schema = schema_generator.generate_schema(with_docstring=True).replace("temp_module.", "")
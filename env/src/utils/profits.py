@@ -1,3 +1,6 @@
+from models.achievements import get_new_crafted
+
+
 
 def eval_program_with_profits(instance, program, profit_config):
         pre_production_flows = instance.get_production_stats()
@@ -63,12 +66,7 @@ def get_new_production_flows(pre_production_flows, post_production_flows):
             diff = value - pre_item_value
             if diff > 0:
                 new_production_flows[flow_key][item] = diff
-    for item in post_production_flows["crafted"]:
-        if item in pre_production_flows["crafted"]:
-            # pop the item from the pre_production_flows
-            pre_production_flows["crafted"].remove(item)
-        else:
-            new_production_flows["crafted"].append(item)
+    new_production_flows["crafted"] = get_new_crafted(pre_production_flows["crafted"], post_production_flows["crafted"])
     return new_production_flows
 
 def get_static_profits(new_production_flows, price_list, max_craft_cap = 5):
@@ -0,0 +1,220 @@
+"""
+Tracing of tool calls, to attribute their latency without a profiler.
+
+Each call is split into phases:
+    serialize - encoding the arguments into the Lua invocation
+    rcon_send - writing the command to the RCON socket
+    server    - waiting for and reading the response, i.e the game executing the Lua (and the transfer back)
+    parse     - decoding the Lua response into Python
+    client    - everything else the tool does in Python, e.g building entities from the response
+"""
+import json
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional, Tuple
+
+PHASES = ("serialize", "rcon_send", "server", "parse", "client")
+
+# Log-spaced bucket bounds, from 10us to ~3 minutes
+BUCKET_BOUNDS = [1e-5 * 2 ** i for i in range(25)]
+
+_local = threading.local()
+
+
+class LatencyHistogram:
+    """Fixed-size histogram of durations in seconds, so that long runs can be aggregated cheaply"""
+
+    def __init__(self):
+        self.counts = [0] * (len(BUCKET_BOUNDS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.max = 0.0
+
+    def add(self, seconds: float):
+        index = 0
+        while index < len(BUCKET_BOUNDS) and seconds > BUCKET_BOUNDS[index]:
+            index += 1
+        self.counts[index] += 1
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def quantile(self, q: float) -> float:
+        """The upper bound of the bucket containing the q-th quantile"""
+        if not self.count:
+            return 0.0
+        target = q * self.count
+        cumulative = 0
+        for index, count in enumerate(self.counts):
+            cumulative += count
+            if cumulative >= target:
+                return min(BUCKET_BOUNDS[index], self.max) if index < len(BUCKET_BOUNDS) else self.max
+        return self.max
+
+    def to_dict(self) -> Dict[str, float]:
+        return {
+            "count": self.count,
+            "mean_ms": round(self.total / self.count * 1000, 3) if self.count else 0.0,
+            "p50_ms": round(self.quantile(0.5) * 1000, 3),
+            "p95_ms": round(self.quantile(0.95) * 1000, 3),
+            "p99_ms": round(self.quantile(0.99) * 1000, 3),
+            "max_ms": round(self.max * 1000, 3),
+        }
+
+
+@dataclass
+class ToolCall:
+    tool: str
+    start: float
+    end: float = 0.0
+    phases: Dict[str, float] = field(default_factory=dict)
+    nested: float = 0.0  # Time spent in tools called from this one
+
+    @property
+    def duration(self) -> float:
+        return self.end - self.start
+
+
+@contextmanager
+def span(phase: str):
+    """Attribute the enclosed time to a phase of the tool call in progress on this thread, if there is one"""
+    calls = getattr(_local, "calls", None)
+    if not calls:
+        yield
+        return
+    tracer, call = calls[-1]
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        tracer._record_phase(call, phase, start, time.perf_counter())
+
+
+class Tracer:
+    """
+    Records the tool calls made on one instance, aggregating them into per-tool, per-phase latency histograms. If
+    `max_events` is given, the most recent spans are also kept for export as a Chrome trace (chrome://tracing, or
+    Perfetto); this is off by default, as spans take far more memory than the histograms on long runs.
+    """
+
+    def __init__(self, pid: int = 0, max_events: int = 0, enabled: bool = True):
+        self.pid = pid
+        self.enabled = enabled
+        self.histograms: Dict[str, Dict[str, LatencyHistogram]] = {}
+        self.events: deque = deque(maxlen=max_events)
+        self._lock = threading.Lock()
+        # perf_counter is precise but has no epoch, so spans are shifted onto wall time for merging traces
+        self._epoch = time.time() - time.perf_counter()
+
+    @contextmanager
+    def trace(self, tool: str):
+        """Trace a call of `tool` for the duration of the block"""
+        if not self.enabled:
+            yield
+            return
+        calls = getattr(_local, "calls", None)
+        if calls is None:
+            calls = _local.calls = []
+        call = ToolCall(tool=tool, start=time.perf_counter())
+        calls.append((self, call))
+        try:
+            yield call
+        finally:
+            calls.pop()
+            call.end = time.perf_counter()
+            if calls:
+                calls[-1][1].nested += call.duration
+            self._record_call(call)
+
+    def instrument(self, rcon_client):
+        """Attribute the RCON client's sends and receives to the tool calls they are made for"""
+        send_packet, receive_packets = rcon_client.send_packet, rcon_client.receive_packets
+
+        def traced_send_packet(*args, **kwargs):
+            with span("rcon_send"):
+                return send_packet(*args, **kwargs)
+
+        def traced_receive_packets(*args, **kwargs):
+            with span("server"):
+                return receive_packets(*args, **kwargs)
+
+        rcon_client.send_packet = traced_send_packet
+        rcon_client.receive_packets = traced_receive_packets
+
+    def _event(self, name: str, category: str, start: float, end: float, args: Optional[dict] = None) -> dict:
+        event = {"name": name, "cat": category, "ph": "X", "pid": self.pid, "tid": threading.get_ident(),
+                 "ts": round((self._epoch + start) * 1e6, 1), "dur": round((end - start) * 1e6, 1)}
+        if args:
+            event["args"] = args
+        return event
+
+    def _record_phase(self, call: ToolCall, phase: str, start: float, end: float):
+        call.phases[phase] = call.phases.get(phase, 0.0) + end - start
+        if self.events.maxlen:
+            with self._lock:
+                self.events.append(self._event(phase, call.tool, start, end))
+
+    def _record_call(self, call: ToolCall):
+        # Whatever wasn't spent in a measured phase (or a nested tool) was spent in the tool's own Python
+        call.phases["client"] = max(call.duration - call.nested - sum(call.phases.values()), 0.0)
+        with self._lock:
+            histograms = self.histograms.setdefault(call.tool, {})
+            histograms.setdefault("total", LatencyHistogram()).add(call.duration)
+            for phase, seconds in call.phases.items():
+                histograms.setdefault(phase, LatencyHistogram()).add(seconds)
+            if self.events.maxlen:
+                phases = {phase: round(seconds * 1000, 3) for phase, seconds in call.phases.items()}
+                self.events.append(self._event(call.tool, "tool", call.start, call.end, phases))
+
+    def latency(self) -> Dict[str, Dict[str, Dict[str, float]]]:
+        """Latency percentiles by tool and phase, over every traced call"""
+        with self._lock:
+            return {tool: {phase: histogram.to_dict() for phase, histogram in histograms.items()}
+                    for tool, histograms in self.histograms.items()}
+
+    def checkpoint(self) -> Dict[str, Dict[str, Tuple[int, float]]]:
+        """The number of calls and seconds spent so far, by tool and phase, to summarise what follows from"""
+        with self._lock:
+            return {tool: {phase: (histogram.count, histogram.total) for phase, histogram in histograms.items()}
+                    for tool, histograms in self.histograms.items()}
+
+    def summary(self, since: Optional[Dict[str, Dict[str, Tuple[int, float]]]] = None) -> Dict[str, Dict[str, float]]:
+        """
+        Milliseconds spent in each tool and phase, over the calls made after the `since` checkpoint (or ever).
+        This is small and JSON serializable, so that it can be attached to a program's meta.
+        """
+        since = since or {}
+        summary = {}
+        for tool, totals in self.checkpoint().items():
+            before = since.get(tool, {})
+            calls = totals["total"][0] - before.get("total", (0, 0.0))[0]
+            if calls <= 0:
+                continue
+            summary[tool] = {"calls": calls}
+            for phase, (count, seconds) in totals.items():
+                previous_count, previous_seconds = before.get(phase, (0, 0.0))
+                if count > previous_count:
+                    summary[tool][f"{phase}_ms"] = round((seconds - previous_seconds) * 1000, 3)
+        return summary
+
+    def to_chrome_trace(self) -> dict:
+        with self._lock:
+            events = list(self.events)
+        metadata = {"name": "process_name", "ph": "M", "pid": self.pid, "args": {"name": f"instance {self.pid}"}}
+        return {"traceEvents": [metadata, *events], "displayTimeUnit": "ms"}
+
+    def export(self, path: str, tracers: Optional[List["Tracer"]] = None):
+        """Write a Chrome trace of this tracer's spans, and those of any other `tracers` (e.g other instances)"""
+        events = []
+        for tracer in [self, *(tracers or [])]:
+            events.extend(tracer.to_chrome_trace()["traceEvents"])
+        with open(path, "w") as f:
+            json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, f)
+
+    def reset(self):
+        with self._lock:
+            self.histograms = {}
+            self.events.clear()
@@ -1,3 +1,4 @@
+import sys
 import time
 from instance import FactorioInstance, Direction
 from entities import Position
@@ -218,9 +219,17 @@ if __name__ == "__main__":
         'assembling-machine-1': 20,
         'iron-chest': 10,
     }
-    game = FactorioInstance(address='localhost',
+    address, tcp_port = 'localhost', 27000
+    # `--stand-in [recording.json]` benchmarks the client side against a local RCON stand-in, without the game
+    if "--stand-in" in sys.argv:
+        from rcon.stand_in_server import StandInServer
+        arguments = sys.argv[sys.argv.index("--stand-in") + 1:]
+        server = StandInServer(recording=arguments[0] if arguments else None).start()
+        address, tcp_port = server.address, server.port
+
+    game = FactorioInstance(address=address,
                             bounding_box=200,
-                            tcp_port=27000,
+                            tcp_port=tcp_port,
                             fast=True,
                             cache_scripts=False,
                             inventory=inventory)
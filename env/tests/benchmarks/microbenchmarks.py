@@ -0,0 +1,270 @@
+"""
+Microbenchmarks of the client-side hot paths, which need neither the game nor a database server.
+
+    python env/tests/benchmarks/microbenchmarks.py             # Run, and compare against the baseline
+    python env/tests/benchmarks/microbenchmarks.py --save      # Also record the results as this commit's
+    python env/tests/benchmarks/microbenchmarks.py -k rcon     # Only the benchmarks with 'rcon' in their name
+
+Results are kept in .benchmarks/baselines.json, keyed by machine fingerprint and then by git commit, as timings
+are only comparable on the same machine. A run is compared to the most recently saved other commit on this
+machine, and the exit status is 1 if any benchmark is slower than that by more than --threshold.
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import pickle
+import platform
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import timeit
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from types import SimpleNamespace
+from typing import Callable, Dict, Iterator, List, Optional
+
+ROOT = Path(__file__).parent.parent.parent.parent
+for path in (ROOT, ROOT / "env" / "src"):
+    if str(path) not in sys.path:
+        sys.path.insert(0, str(path))
+
+BASELINE_FILE = ROOT / ".benchmarks" / "baselines.json"
+DEFAULT_THRESHOLD = 0.2
+
+BENCHMARKS: Dict[str, Callable[[], Iterator[Callable[[], None]]]] = {}
+
+
+def benchmark(func):
+    """Register a benchmark: a generator that sets up, yields the callable to time, then tears down"""
+    BENCHMARKS[func.__name__.removeprefix("bench_")] = contextmanager(func)
+    return func
+
+
+@benchmark
+def bench_rcon_round_trip():
+    from rcon.factorio_rcon import RCONClient
+    from rcon.stand_in_server import StandInServer
+
+    with StandInServer() as server:
+        client = RCONClient(server.address, server.port, "factorio")
+        yield lambda: client.send_command("/c rcon.print(game.tick)")
+        client.close()
+
+
+@benchmark
+def bench_rcon_large_response():
+    from rcon.factorio_rcon import RCONClient
+    from rcon.stand_in_server import StandInServer
+
+    with StandInServer(payload_size=1_000_000) as server:
+        client = RCONClient(server.address, server.port, "factorio")
+        command = "/silent-command a, b = pcall(global.actions.get_entities, 1); rcon.print(dump({a=a, b=b}))"
+        yield lambda: client.send_command(command)
+        client.close()
+
+
+@benchmark
+def bench_lua2python():
+    from rcon.stand_in_server import synthetic_payload
+    from utils.rcon import _lua2python
+
+    response = synthetic_payload(100_000)
+    yield lambda: _lua2python("get_entities", response)
+
+
+@benchmark
+def bench_namespace_eval():
+    from namespace import FactorioNamespace
+
+    namespace = FactorioNamespace(SimpleNamespace(tcp_port=0))
+    namespace.score = lambda: (0, None)
+    program = "total = 0\nfor i in range(200):\n    total += i\n    if i % 50 == 0:\n        print(total)"
+    yield lambda: namespace.eval_with_timeout(program)
+
+
+def _game_state():
+    from models.game_state import GameState
+
+    entities = [{"name": "stone-furnace", "position": {"x": i + 0.5, "y": 2.5}, "direction": 0,
+                 "inventories": {"furnace_source": {"iron-ore": i % 50}}} for i in range(500)]
+    return GameState(entities=entities, inventory={"iron-plate": 50, "coal": 10}, research=None,
+                     namespace=pickle.dumps({"furnaces": list(range(100))}))
+
+
+@benchmark
+def bench_game_state_json():
+    from models.game_state import GameState
+
+    state = _game_state()
+    yield lambda: GameState.parse_raw(state.to_raw())
+
+
+@benchmark
+def bench_game_state_binary():
+    from models.game_state import GameState
+
+    state = _game_state()
+    yield lambda: GameState.from_binary(state.to_binary()).entities
+
+
+@benchmark
+def bench_entity_grouping():
+    from entities import Dimensions, Direction, Position, TileDimensions, TransportBelt
+    from game_types import Prototype
+    from tools.agent.connect_entities.groupable_entities import agglomerate_groupable_entities
+
+    belts = [TransportBelt(name="transport-belt", position=Position(x=i + 0.5, y=0.5), direction=Direction.EAST,
+                           energy=0, health=100, dimensions=Dimensions(width=1, height=1),
+                           tile_dimensions=TileDimensions(tile_width=1, tile_height=1),
+                           prototype=Prototype.TransportBelt, input_position=Position(x=i - 0.5, y=0.5),
+                           output_position=Position(x=i + 1.5, y=0.5), is_source=i == 0, is_terminus=i == 499)
+             for i in range(500)]
+    # Grouping marks the belts, so each run gets fresh copies
+    yield lambda: agglomerate_groupable_entities([belt.model_copy() for belt in belts])
+
+
+@benchmark
+def bench_db_resume_state():
+    from eval.open.db_client import SQLliteDBClient
+    from models.conversation import Conversation
+    from models.message import Message
+    from models.program import Program
+
+    temp_dir = tempfile.mkdtemp()
+    database_file = os.path.join(temp_dir, "programs.db")
+    with sqlite3.connect(database_file) as conn:
+        conn.executescript((ROOT / "extension" / "create_table.sql").read_text())
+    db_client = SQLliteDBClient(database_file=database_file)
+
+    state = _game_state()
+    programs = [Program(code=f"print({i})", value=float(i), state=state, version=1, meta={"process_id": i % 4},
+                        conversation=Conversation(messages=[Message(role="assistant", content=f"print({i})")]))
+                for i in range(200)]
+    asyncio.run(db_client.create_programs(programs))
+
+    yield lambda: asyncio.run(db_client.get_resume_state(resume_version=1, process_id=1))
+    shutil.rmtree(temp_dir)
+
+
+@dataclass
+class Result:
+    name: str
+    seconds: float  # Median seconds per call
+    spread: float  # Relative standard deviation of the repeats
+
+
+def measure(func: Callable[[], None], repeat: int = 5) -> Result:
+    timer = timeit.Timer(func)
+    # Enough calls per repeat to take at least 0.2s, as timeit's autorange does
+    number, _ = timer.autorange()
+    timings = [seconds / number for seconds in timer.repeat(repeat=repeat, number=number)]
+    median = statistics.median(timings)
+    spread = statistics.stdev(timings) / median if len(timings) > 1 and median else 0.0
+    return Result(name="", seconds=median, spread=spread)
+
+
+def run(names: List[str], repeat: int = 5) -> List[Result]:
+    results = []
+    for name in names:
+        with BENCHMARKS[name]() as func:
+            result = measure(func, repeat)
+        result.name = name
+        results.append(result)
+    return results
+
+
+def machine_fingerprint() -> str:
+    """Identifies the machine and interpreter, which timings are only comparable within"""
+    machine = [platform.node(), platform.system(), platform.machine(), platform.processor(), str(os.cpu_count()),
+               platform.python_implementation(), platform.python_version()]
+    return hashlib.sha256("|".join(machine).encode()).hexdigest()[:12]
+
+
+def git_commit() -> str:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, capture_output=True, text=True,
+                                check=True).stdout.strip()
+        dirty = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=ROOT,
+                               capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+    return f"{commit}-dirty" if dirty else commit
+
+
+def load_baselines(path: Path = BASELINE_FILE) -> dict:
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text())
+
+
+def save_results(results: List[Result], fingerprint: str, commit: str, path: Path = BASELINE_FILE):
+    baselines = load_baselines(path)
+    entry = baselines.setdefault(fingerprint, {}).setdefault(commit, {"saved_at": 0, "results": {}})
+    entry["saved_at"] = time.time()
+    entry["results"].update({result.name: result.seconds for result in results})
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(baselines, indent=2, sort_keys=True))
+
+
+def find_baseline(baselines: dict, fingerprint: str, commit: str) -> Optional[tuple]:
+    """The (commit, results) most recently saved on this machine, other than for `commit`"""
+    entries = [(entry["saved_at"], saved_commit, entry["results"])
+               for saved_commit, entry in baselines.get(fingerprint, {}).items() if saved_commit != commit]
+    if not entries:
+        return None
+    _, saved_commit, results = max(entries)
+    return saved_commit, results
+
+
+def regressions(results: List[Result], baseline: Dict[str, float], threshold: float) -> List[str]:
+    """The benchmarks that are slower than their baseline by more than `threshold` (e.g 0.2 for 20%)"""
+    return [result.name for result in results
+            if result.name in baseline and result.seconds > baseline[result.name] * (1 + threshold)]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("-k", dest="keyword", default="", help="Only run benchmarks whose names contain this")
+    parser.add_argument("--save", action="store_true", help="Record the results as this commit's baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD,
+                        help="Relative slowdown to flag as a regression (default %(default)s)")
+    parser.add_argument("--repeat", type=int, default=5, help="Timed repeats of each benchmark")
+    parser.add_argument("--baselines", type=Path, default=BASELINE_FILE)
+    args = parser.parse_args(argv)
+
+    fingerprint, commit = machine_fingerprint(), git_commit()
+    baseline = find_baseline(load_baselines(args.baselines), fingerprint, commit)
+    baseline_commit, baseline_results = baseline if baseline else (None, {})
+
+    names = [name for name in BENCHMARKS if args.keyword in name]
+    results = run(names, args.repeat)
+    regressed = regressions(results, baseline_results, args.threshold)
+
+    print(f"Machine {fingerprint}, commit {commit}" + (f", compared to {baseline_commit}" if baseline else ""))
+    print("-" * 80)
+    print(f"{'Benchmark':<24} {'Time/call':>12} {'Spread':>8} {'Baseline':>12} {'Change':>8}")
+    print("-" * 80)
+    for result in results:
+        line = f"{result.name:<24} {result.seconds * 1e6:>10.1f}us {result.spread:>7.1%}"
+        if result.name in baseline_results:
+            before = baseline_results[result.name]
+            line += f" {before * 1e6:>10.1f}us {result.seconds / before - 1:>+7.1%}"
+            if result.name in regressed:
+                line += "  REGRESSED"
+        print(line)
+
+    if args.save:
+        save_results(results, fingerprint, commit, args.baselines)
+        print(f"Saved to {args.baselines}")
+    return 1 if regressed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,145 @@
+import json
+import random
+import tempfile
+import unittest
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+from unittest.mock import MagicMock, patch
+
+from data.blueprints_to_policies import batch_generator
+from data.blueprints_to_policies.batch_generator import (BlueprintResult, blueprint_hash, generate, probe_endpoint,
+                                                         process_blueprint, reachable_endpoints)
+from data.blueprints_to_policies.trajectory_generator import (BlueprintEntity, find_placement_references,
+                                                              get_entity_priority)
+from rcon.stand_in_server import StandInServer
+
+
+def find_placement_references_by_scan(entities):
+    """The references found by comparing each entity with every one placed before it"""
+    placements = []
+    placed_entities = {}
+    for entity in sorted(entities, key=lambda e: (get_entity_priority(e.name).value, e.entity_number)):
+        current_pos = (entity.position["x"], entity.position["y"])
+        closest_reference, min_distance, relative_pos = None, float('inf'), None
+        for placed_pos, placed_num in placed_entities.items():
+            dx, dy = current_pos[0] - placed_pos[0], current_pos[1] - placed_pos[1]
+            distance = abs(dx) + abs(dy)
+            if distance < min_distance and (dx == 0 or dy == 0):
+                min_distance, closest_reference, relative_pos = distance, placed_num, (dx, dy)
+        placements.append((entity.entity_number, closest_reference, relative_pos))
+        placed_entities[current_pos] = entity.entity_number
+    return placements
+
+
+def blueprint(*names):
+    return json.dumps({"entities": [{"entity_number": i + 1, "name": name, "position": {"x": i + 0.5, "y": 0.5}}
+                                    for i, name in enumerate(names)]})
+
+
+class TestPlacementReferences(unittest.TestCase):
+    def test_matches_scanning_every_placed_entity(self):
+        rng = random.Random(0)
+        names = ["burner-mining-drill", "stone-furnace", "burner-inserter", "small-electric-pole", "wooden-chest"]
+        for _ in range(50):
+            entities = [BlueprintEntity(entity_number=number, name=rng.choice(names),
+                                        position={"x": rng.randint(0, 8) + 0.5, "y": rng.randint(0, 8) * 1.0})
+                        for number in range(1, 40)]
+            placements = [(p.entity.entity_number, p.reference_entity, p.relative_position)
+                          for p in find_placement_references(entities)]
+            self.assertEqual(placements, find_placement_references_by_scan(entities))
+
+
+class TestBatchGenerator(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.TemporaryDirectory()
+        self.blueprints_dir = Path(self.temp_dir.name) / "blueprints"
+        self.output_dir = Path(self.temp_dir.name) / "output"
+        (self.blueprints_dir / "mining").mkdir(parents=True)
+        (self.blueprints_dir / "mining" / "drill.json").write_text(blueprint("burner-mining-drill"))
+        (self.blueprints_dir / "furnace.json").write_text(blueprint("stone-furnace"))
+        self.replayed = []
+
+    def tearDown(self):
+        self.temp_dir.cleanup()
+
+    def replay(self, name, blueprint_json, method):
+        self.replayed.append(name)
+        return BlueprintResult(name=name, blueprint_hash=blueprint_hash(blueprint_json, method), verified=True,
+                               program=f"# {name}")
+
+    def generate(self, **kwargs):
+        # Threads stand in for the worker processes, which would each connect to a server
+        with patch.object(batch_generator, "ProcessPoolExecutor",
+                          lambda max_workers, **_: ThreadPoolExecutor(max_workers)), \
+                patch.object(batch_generator, "_process_in_worker", self.replay), \
+                patch.object(batch_generator, "probe_endpoint", lambda address, tcp_port: None):
+            return generate(self.blueprints_dir, self.output_dir, [("localhost", 27000)], **kwargs)
+
+    def test_hash_ignores_formatting(self):
+        blueprint_json = blueprint("stone-furnace")
+        reformatted = json.dumps(json.loads(blueprint_json), indent=4)
+
+        self.assertEqual(blueprint_hash(blueprint_json, "trajectory"), blueprint_hash(reformatted, "trajectory"))
+        self.assertNotEqual(blueprint_hash(blueprint_json, "trajectory"), blueprint_hash(blueprint_json, "analyzer"))
+
+    def test_only_new_blueprints_are_replayed(self):
+        self.generate()
+        self.assertEqual(sorted(self.replayed), ["furnace", "mining/drill"])
+        self.assertEqual((self.output_dir / "mining" / "drill.py").read_text(), "# mining/drill")
+
+        (self.blueprints_dir / "assembler.json").write_text(blueprint("assembling-machine-1"))
+        (self.output_dir / "furnace.py").unlink()
+        self.replayed = []
+        results = self.generate()
+
+        self.assertEqual(self.replayed, ["assembler"])
+        self.assertEqual(len(results), 3)
+        # Deleted programs are written again from the cache
+        self.assertEqual((self.output_dir / "furnace.py").read_text(), "# furnace")
+
+    def test_refresh_replays_everything(self):
+        self.generate()
+        self.replayed = []
+        self.generate(refresh=True)
+
+        self.assertEqual(len(self.replayed), 2)
+
+    def test_program_runs_from_a_fresh_game(self):
+        instance = MagicMock()
+        instance.eval_with_error.return_value = (0, None, "ok")
+
+        def convert(blueprint_json, instance):
+            # Measuring entities places them in the game
+            instance.place_entity("stone-furnace")
+            return "place_entity(Prototype.StoneFurnace)", lambda entities: None
+
+        with patch.dict(batch_generator.METHODS, {"trajectory": convert}):
+            result = process_blueprint(instance, "furnace", blueprint("stone-furnace"), "trajectory")
+
+        self.assertTrue(result.verified)
+        calls = [name for name, _, _ in instance.mock_calls]
+        self.assertEqual(calls[calls.index("place_entity"):calls.index("eval_with_error")],
+                         ["place_entity", "reset", "set_inventory", "move_to"])
+
+
+class TestEndpoints(unittest.TestCase):
+    def test_servers_that_dont_answer_are_left_out(self):
+        def probe(address, tcp_port):
+            if tcp_port == 27001:
+                raise ConnectionError("Could not connect")
+
+        with patch.object(batch_generator, "probe_endpoint", probe):
+            endpoints = reachable_endpoints([("localhost", port) for port in (27002, 27001, 27000)])
+
+        self.assertEqual(endpoints, [("localhost", 27002), ("localhost", 27000)])
+
+    def test_probe(self):
+        with StandInServer() as server:
+            probe_endpoint(server.address, server.port)
+            port = server.port
+        with self.assertRaises(Exception):
+            probe_endpoint("localhost", port, timeout=1)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,84 @@
+import unittest
+from unittest.mock import AsyncMock, Mock, patch
+
+from eval.evaluation_cache import EvaluationCache, evaluation_key, normalize_code
+from eval.evaluator import Evaluator
+from models.conversation import Conversation
+from models.game_state import GameState
+from models.program import Program
+
+
+def make_state(coal=5, timestamp=0.0):
+    return GameState(entities=[{"name": "iron-chest"}], inventory={"coal": coal}, research=None, timestamp=timestamp)
+
+
+class TestEvaluationKey(unittest.TestCase):
+    def test_formatting_is_ignored(self):
+        self.assertEqual(normalize_code("x=1\nprint( x )"), normalize_code("x = 1  # one\nprint(x)"))
+
+    def test_line_numbers_are_kept(self):
+        # The response refers to line numbers, so moving a statement to another line is a different program
+        self.assertNotEqual(normalize_code("x = 1\nprint(x)"), normalize_code("x = 1\n\nprint(x)"))
+
+    def test_state_hash_ignores_timestamp(self):
+        self.assertEqual(evaluation_key(make_state(timestamp=1).content_hash(), "print(1)"),
+                         evaluation_key(make_state(timestamp=2).content_hash(), "print(1)"))
+        self.assertNotEqual(evaluation_key(make_state(coal=5).content_hash(), "print(1)"),
+                            evaluation_key(make_state(coal=6).content_hash(), "print(1)"))
+
+
+class TestEvaluatorCache(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.instance = Mock(tcp_port=27000)
+        self.evaluator = Evaluator.__new__(Evaluator)
+        self.evaluator.instances = [self.instance, Mock(tcp_port=27001)]
+        self.evaluator.logger = None
+        self.evaluator.cache = EvaluationCache()
+        self.evaluator.pool = None
+
+    def create_program(self, code):
+        return Program(code=code, conversation=Conversation(messages=[]), meta={})
+
+    async def evaluate(self, state, *codes):
+        async def evaluate_single(tcp_port, program, instance):
+            program.code += "\nprint(inspect_inventory())"
+            return 3.0, make_state(coal=1), "1: ('ok',)", [], {"static": {}, "dynamic": {}}, 60
+
+        with patch.object(Evaluator, "_evaluate_single", AsyncMock(side_effect=evaluate_single)) as evaluate:
+            programs = await self.evaluator.evaluate_batch([self.create_program(code) for code in codes], state)
+        return programs, evaluate.await_count
+
+    async def test_duplicates_are_evaluated_once(self):
+        programs, evaluations = await self.evaluate(make_state(), "x=1", "x = 1")
+        self.assertEqual(evaluations, 1)
+        self.assertEqual([p.value for p in programs], [3.0, 3.0])
+        self.assertEqual(programs[1].code, "x = 1\nprint(inspect_inventory())")
+
+        programs, evaluations = await self.evaluate(make_state(timestamp=5), "x = 1 # again")
+        self.assertEqual(evaluations, 0)
+        self.assertEqual(programs[0].response, "1: ('ok',)")
+        self.assertEqual(programs[0].state.inventory, {"coal": 1})
+        self.assertEqual(self.evaluator.cache.stats()["hits"], 1)
+        self.assertEqual(self.evaluator.cache.summary(), "hits: 1, misses: 1, hit rate: 50.0%, entries: 1")
+
+    async def test_state_is_hashed_once_per_batch(self):
+        with patch.object(GameState, "content_hash", autospec=True, return_value="state") as content_hash:
+            await self.evaluate(make_state(), "x = 1", "x = 2", "x = 3")
+        self.assertEqual(content_hash.call_count, 1)
+
+    async def test_other_states_are_evaluated(self):
+        await self.evaluate(make_state(coal=5), "x = 1")
+        _, evaluations = await self.evaluate(make_state(coal=6), "x = 1")
+        self.assertEqual(evaluations, 1)
+        self.assertEqual(self.evaluator.cache.misses, 2)
+
+    def test_eviction(self):
+        cache = EvaluationCache(max_entries=1)
+        cache.put("a", Mock())
+        cache.put("b", Mock())
+        self.assertIsNone(cache.get("a"))
+        self.assertEqual(list(cache.entries), ["b"])
+
+
+if __name__ == '__main__':
+    unittest.main()
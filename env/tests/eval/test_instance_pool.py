@@ -0,0 +1,185 @@
+import asyncio
+import socket
+import time
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from eval.evaluator import Evaluator
+from eval.open.instance_pool import InstancePool, create_instances
+
+probe_client = InstancePool._probe_client
+
+
+class FakeRCON:
+    def __init__(self, alive=True, memory_kb=100.0):
+        self.alive = alive
+        self.memory_kb = memory_kb
+        self.connects = 0
+        self.timeout = None
+        self.rcon_socket = None
+
+    def send_command(self, command, max_retries=3):
+        if not self.alive:
+            raise ConnectionError("Socket closed")
+        return str(self.memory_kb)
+
+    def connect(self):
+        self.connects += 1
+        self.alive = True
+
+    def close(self):
+        pass
+
+
+def make_instance(port, alive=True):
+    return SimpleNamespace(tcp_port=port, address="localhost", rcon_client=FakeRCON(alive), fast=True,
+                           initial_inventory={}, initialise=lambda fast, **inventory: None,
+                           reset=lambda state: None)
+
+
+class TestInstancePool(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        # Heartbeats connect a client of their own, which here is the instance's fake
+        patcher = patch.object(InstancePool, "_probe_client", lambda pool, instance: instance.rcon_client)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def asyncTearDown(self):
+        await self.pool.close()
+
+    async def test_lease_round_trip(self):
+        instances = [make_instance(27000), make_instance(27001)]
+        self.pool = InstancePool(instances)
+
+        async with self.pool.lease() as first:
+            async with self.pool.lease() as second:
+                self.assertEqual({first.tcp_port, second.tcp_port}, {27000, 27001})
+                self.assertEqual(self.pool.stats()["leased"], 2)
+        self.assertEqual(self.pool.stats()["leased"], 0)
+        self.assertEqual(self.pool.metrics.leases, 2)
+
+    async def test_failed_instance_is_quarantined_and_recovered(self):
+        instance = make_instance(27000)
+        self.pool = InstancePool([instance], recovery_interval=0)
+
+        with self.assertRaises(RuntimeError):
+            async with self.pool.lease():
+                instance.rcon_client.alive = False
+                raise RuntimeError("Evaluation failed")
+
+        # The lease reconnects the socket in the background, after which the instance is leased again
+        leased = await asyncio.wait_for(self.pool.acquire(), timeout=1)
+        self.assertIs(leased, instance)
+        self.assertEqual(instance.rcon_client.connects, 1)
+        self.assertEqual((self.pool.metrics.quarantines, self.pool.metrics.reconnections), (1, 1))
+
+    async def test_healthy_instance_is_not_quarantined_by_errors(self):
+        instance = make_instance(27000)
+        self.pool = InstancePool([instance])
+        with self.assertRaises(ValueError):
+            async with self.pool.lease():
+                raise ValueError("The program failed, not the instance")
+        self.assertEqual(self.pool.stats()["quarantined"], 0)
+
+    async def test_memory_limit(self):
+        self.pool = InstancePool([make_instance(27000)], max_lua_memory_kb=50)
+        self.assertFalse(await self.pool.check(self.pool.instances[0]))
+
+    async def test_evaluator_moves_off_a_dead_instance(self):
+        dead, alive = make_instance(27000), make_instance(27001)
+        self.pool = InstancePool([dead, alive], recovery_interval=60)
+        evaluator = Evaluator.__new__(Evaluator)
+        evaluator.pool = self.pool
+        evaluator.logger = None
+
+        async def evaluate_single(tcp_port, program, instance):
+            if instance is dead:
+                dead.rcon_client.alive = False
+                raise ConnectionError("Socket closed")
+            return "result"
+
+        with patch.object(Evaluator, "_evaluate_single", side_effect=evaluate_single):
+            instance, result = await evaluator._evaluate_leased(SimpleNamespace(code="print(1)", id=1), None)
+
+        self.assertEqual((instance, result), (alive, "result"))
+        self.assertEqual(self.pool.stats()["quarantined"], 1)
+
+    async def test_evaluator_follows_replacements(self):
+        instances = [make_instance(27000), make_instance(27001), make_instance(27002)]
+        self.pool = InstancePool(instances)
+        evaluator = Evaluator.__new__(Evaluator)
+        evaluator.pool = self.pool
+        evaluator.logger = None
+        evaluator.instances = list(instances)
+
+        replacement = make_instance(27001)
+        self.pool._swap(self.pool.members[id(instances[1])], replacement)
+
+        self.assertEqual(evaluator.instances, [instances[0], replacement, instances[2]])
+
+    async def test_evaluator_leases_and_closes_the_pool(self):
+        instances = [make_instance(27000), make_instance(27001)]
+        self.pool = InstancePool(instances)
+        evaluator = Evaluator.__new__(Evaluator)
+        evaluator.pool = self.pool
+        evaluator.logger = None
+
+        async with evaluator.lease_instance() as instance:
+            self.assertIn(instance, instances)
+            self.assertEqual(self.pool.stats()["leased"], 1)
+        self.assertEqual(self.pool.stats()["leased"], 0)
+
+        with patch.object(InstancePool, "close", autospec=True) as close:
+            await evaluator.close()
+        close.assert_called_once_with(self.pool)
+
+    async def test_hung_server_does_not_hold_up_heartbeats(self):
+        server = socket.socket()
+        server.bind(("localhost", 0))
+        server.listen()  # Accepts connections, but never answers
+        instance = make_instance(server.getsockname()[1])
+        self.pool = InstancePool([instance], heartbeat_timeout=0.2)
+        try:
+            with patch.object(InstancePool, "_probe_client", probe_client):
+                start = time.time()
+                self.assertFalse(await self.pool.check(instance))
+                # The heartbeat's thread is free again once its socket times out
+                await asyncio.sleep(0.3)
+                self.assertEqual(self.pool._executor._work_queue.qsize(), 0)
+                self.assertLess(time.time() - start, 2)
+        finally:
+            server.close()
+
+    async def test_recovery_steps_time_out(self):
+        instance = make_instance(27000)
+        self.pool = InstancePool([instance], recovery_timeout=5)
+        timeouts = []
+        instance.rcon_client.connect = lambda: timeouts.append(instance.rcon_client.timeout)
+
+        self.pool._reconnect(instance)
+
+        self.assertEqual(timeouts, [5])
+        self.assertIsNone(instance.rcon_client.timeout)
+
+
+class TestCreateInstances(unittest.TestCase):
+    def test_failures_are_left_out(self):
+        def factory(address, tcp_port):
+            if tcp_port == 27001:
+                raise ConnectionError("Could not connect")
+            return make_instance(tcp_port)
+
+        instances = create_instances([("localhost", port) for port in (27002, 27001, 27000)], factory)
+        self.assertEqual([instance.tcp_port for instance in instances], [27002, 27000])
+
+    def test_no_instances(self):
+        def factory(address, tcp_port):
+            raise ConnectionError("Could not connect")
+
+        with self.assertRaises(RuntimeError):
+            create_instances([("localhost", 27000)], factory)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,49 @@
+import unittest
+
+from models.achievements import ProductionFlows, get_new_crafted
+from utils.achievements import AchievementTracker
+from utils.profits import get_new_production_flows
+
+
+def craft(count, inputs, outputs):
+    return {"crafted_count": count, "inputs": inputs, "outputs": outputs}
+
+
+FURNACE = craft(1, {"stone": 5}, {"stone-furnace": 1})
+GEARS = craft(2, {"iron-plate": 4}, {"iron-gear-wheel": 2})
+
+
+class TestProductionFlows(unittest.TestCase):
+    def test_new_crafted_is_a_multiset_difference(self):
+        pre = [FURNACE, GEARS, FURNACE]
+        post = [FURNACE, GEARS, FURNACE, FURNACE, GEARS]
+        self.assertEqual(get_new_crafted(pre, post), [FURNACE, GEARS])
+
+    def test_signature_ignores_key_order(self):
+        reordered = {"outputs": {"stone-furnace": 1}, "inputs": {"stone": 5}, "crafted_count": 1}
+        self.assertEqual(get_new_crafted([FURNACE], [reordered]), [])
+
+    def test_new_production_flows_leaves_pre_untouched(self):
+        pre = {"input": {}, "output": {"stone": 5}, "harvested": {"stone": 5}, "crafted": [FURNACE]}
+        post = {"input": {"stone": 5}, "output": {"stone": 10, "stone-furnace": 2},
+                "harvested": {"stone": 10}, "crafted": [FURNACE, FURNACE]}
+
+        new_flows = get_new_production_flows(pre, post)
+
+        self.assertEqual(new_flows["crafted"], [FURNACE])
+        self.assertEqual(new_flows["output"], {"stone": 5, "stone-furnace": 2})
+        self.assertEqual(pre["crafted"], [FURNACE])
+
+    def test_achievements_from_crafts(self):
+        pre = ProductionFlows(input={}, output={}, crafted=[GEARS] * 1000, harvested={})
+        post = ProductionFlows(input={"iron-plate": 4}, output={"iron-gear-wheel": 2},
+                               crafted=[GEARS] * 1001, harvested={})
+
+        achievements = AchievementTracker.calculate_achievements(pre, post)
+
+        self.assertEqual(achievements, {"static": {"iron-gear-wheel": 2}, "dynamic": {}})
+        self.assertIsNone(post.static_items)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,199 @@
+import asyncio
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from unittest.mock import MagicMock, Mock, patch
+
+import psycopg2
+
+from eval.open import db_client as db_client_module
+from eval.open.db_client import PostgresDBClient, SQLliteDBClient
+from models.conversation import Conversation
+from models.game_state import GameState
+from models.message import Message
+from models.program import Program
+
+SCHEMA_FILE = Path(__file__).parent.parent.parent.parent / "extension" / "create_table.sql"
+
+
+class TestProgramWriteQueue(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.database_file = os.path.join(self.temp_dir, "programs.db")
+        with sqlite3.connect(self.database_file) as conn:
+            conn.executescript(SCHEMA_FILE.read_text())
+        self.db_client = SQLliteDBClient(database_file=self.database_file)
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def create_program(self, i: int) -> Program:
+        conversation = Conversation(messages=[Message(role="assistant", content=f"print({i})")])
+        return Program(code=f"print({i})", conversation=conversation, value=float(i), meta={"i": i})
+
+    async def test_concurrent_creates_share_a_batch(self):
+        programs = [self.create_program(i) for i in range(10)]
+
+        with patch.object(SQLliteDBClient, "_insert_programs",
+                          autospec=True, side_effect=SQLliteDBClient._insert_programs) as insert:
+            saved = await asyncio.gather(*[self.db_client.create_program(p) for p in programs])
+
+        self.assertEqual(insert.call_count, 1)
+        self.assertEqual(len({p.id for p in saved}), 10)
+        self.assertTrue(all(p.created_at is not None for p in saved))
+
+        await self.db_client.cleanup()
+        with sqlite3.connect(self.database_file) as conn:
+            rows = conn.execute("SELECT id, value FROM programs ORDER BY id").fetchall()
+        self.assertEqual(rows, [(p.id, p.value) for p in saved])
+
+    async def test_cleanup_flushes_pending_programs(self):
+        queue = self.db_client._get_write_queue()
+        futures = [await queue.submit(self.create_program(i)) for i in range(3)]
+
+        await self.db_client.cleanup()
+
+        self.assertTrue(all(future.done() for future in futures))
+        with sqlite3.connect(self.database_file) as conn:
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM programs").fetchone()[0], 3)
+
+    async def test_bad_program_only_fails_itself(self):
+        insert_programs = SQLliteDBClient._insert_programs
+
+        def insert(client, programs):
+            if any(program.meta.get("i") == 2 for program in programs):
+                raise sqlite3.IntegrityError("bad program")
+            return insert_programs(client, programs)
+
+        with patch.object(SQLliteDBClient, "_insert_programs", autospec=True, side_effect=insert):
+            results = await asyncio.gather(*[self.db_client.create_program(self.create_program(i)) for i in range(4)],
+                                           return_exceptions=True)
+
+        self.assertIsInstance(results[2], sqlite3.IntegrityError)
+        self.assertTrue(all(results[i].id is not None for i in (0, 1, 3)))
+        with sqlite3.connect(self.database_file) as conn:
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM programs").fetchone()[0], 3)
+
+    def test_programs_queued_on_a_stopped_loop_are_written(self):
+        async def submit():
+            queue = self.db_client._get_write_queue()
+            for i in range(3):
+                await queue.submit(self.create_program(i))
+
+        async def create_and_cleanup():
+            await self.db_client.create_program(self.create_program(3))
+            await self.db_client.cleanup()
+
+        # The first loop stops before its writer runs
+        asyncio.run(submit())
+        asyncio.run(create_and_cleanup())
+
+        with sqlite3.connect(self.database_file) as conn:
+            self.assertEqual(conn.execute("SELECT COUNT(*) FROM programs").fetchone()[0], 4)
+
+    async def test_binary_state_round_trip(self):
+        db_client = SQLliteDBClient(database_file=self.database_file, binary_state=True)
+        program = self.create_program(1)
+        program.state = GameState(entities=[{"name": "iron-chest"}], inventory={"coal": 5}, research=None)
+
+        saved = await db_client.create_program(program)
+        await db_client.cleanup()
+
+        with sqlite3.connect(self.database_file) as conn:
+            conn.row_factory = sqlite3.Row
+            row = dict(conn.execute("SELECT * FROM programs WHERE id = ?", (saved.id,)).fetchone())
+        self.assertIsNone(row["state_json"])
+        # As in SQLliteDBClient.get_resume_state, JSON columns are decoded before building the program
+        for column in ("conversation_json", "meta", "achievements_json"):
+            row[column] = json.loads(row[column])
+        self.assertEqual(Program.from_row(row).state.inventory, {"coal": 5})
+
+    async def test_json_client_resumes_from_binary_state(self):
+        writer = SQLliteDBClient(database_file=self.database_file, binary_state=True)
+        program = self.create_program(1)
+        program.meta = {"process_id": 0}
+        program.state = GameState(entities=[], inventory={"coal": 5}, research=None)
+        await writer.create_program(program)
+        await writer.cleanup()
+
+        state, _, program_id, _ = await self.db_client.get_resume_state(1, 0)
+
+        self.assertEqual(program_id, program.id)
+        self.assertEqual(state.inventory, {"coal": 5})
+
+    async def test_database_without_state_blob(self):
+        with sqlite3.connect(self.database_file) as conn:
+            conn.execute("ALTER TABLE programs DROP COLUMN state_blob")
+        program = self.create_program(1)
+        program.meta = {"process_id": 0}
+        program.state = GameState(entities=[], inventory={"coal": 5}, research=None)
+        await self.db_client.create_program(program)
+        await self.db_client.cleanup()
+
+        state, _, program_id, _ = await self.db_client.get_resume_state(1, 0)
+
+        self.assertFalse(self.db_client.has_state_blob)
+        self.assertEqual((program_id, state.inventory), (program.id, {"coal": 5}))
+
+    async def test_inserts_maintain_version_count(self):
+        cur = Mock()
+        cur.fetchone.return_value = (5,)
+        self.assertEqual(self.db_client.get_program_count(cur, 1), 5)
+
+        await self.db_client.create_programs([self.create_program(i) for i in range(3)])
+
+        self.assertEqual(self.db_client.get_program_count(cur, 1), 8)
+        # The database is only counted once within the TTL
+        self.assertEqual(cur.execute.call_count, 1)
+
+    async def test_version_count_is_refreshed(self):
+        cur = Mock()
+        cur.fetchone.return_value = (5,)
+        self.db_client.get_program_count(cur, 1)
+
+        # Other processes inserted programs meanwhile
+        cur.fetchone.return_value = (20,)
+        self.db_client.program_count_ttl = 0
+        self.assertEqual(self.db_client.get_program_count(cur, 1), 20)
+        self.assertEqual(cur.execute.call_count, 2)
+
+
+class TestPostgresProgramWriteQueue(unittest.IsolatedAsyncioTestCase):
+    def setUp(self):
+        self.db_client = PostgresDBClient(host="localhost", dbname="test")
+        self.inserts = []
+
+        @contextmanager
+        def get_connection():
+            yield MagicMock()
+
+        self.db_client.get_connection = get_connection
+
+    def execute_values(self, cur, query, rows, page_size, fetch):
+        self.inserts.append(len(rows))
+        if any(row[0] == "print(2)" for row in rows):
+            raise psycopg2.IntegrityError("bad program")
+        return [(len(self.inserts) * 100 + i, datetime.now()) for i in range(len(rows))]
+
+    async def test_bad_program_only_fails_itself(self):
+        programs = [Program(code=f"print({i})", conversation=Conversation(messages=[]), value=float(i))
+                    for i in range(4)]
+        with patch.object(db_client_module, "execute_values", self.execute_values):
+            results = await asyncio.gather(*[self.db_client.create_program(p) for p in programs],
+                                           return_exceptions=True)
+            await self.db_client.cleanup()
+
+        self.assertIsInstance(results[2], psycopg2.IntegrityError)
+        self.assertTrue(all(results[i].id is not None for i in (0, 1, 3)))
+        # The batch, then each of its programs once - the bad row isn't retried
+        self.assertEqual(self.inserts, [4, 1, 1, 1, 1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,163 @@
+import importlib.util
+import json
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from pathlib import Path
+
+import numpy as np
+
+from eval.open.db_client import SQLliteDBClient
+from eval.open.plots.run_export import LINEAGE_COLUMNS, RunExporter, bootstrap_mean, build_columns
+from eval.open.plots.tree_loader import ProgramTreeLoader
+
+SCHEMA_FILE = Path(__file__).parent.parent.parent.parent / "extension" / "create_table.sql"
+
+
+class NumpyRunExporter(RunExporter):
+    """Stores parts in numpy's own format, so that exports can be tested without pyarrow"""
+
+    def _write_part(self, path, columns):
+        with open(path, "wb") as f:
+            np.savez(f, **columns)
+
+    def _read_part(self, path, columns=None):
+        with np.load(path) as part:
+            return {name: part[name] for name in (columns if columns is not None else part.files)}
+
+    def _part_columns(self, path):
+        with np.load(path) as part:
+            return list(part.files)
+
+
+class TestRunExport(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.database_file = os.path.join(self.temp_dir, "programs.db")
+        with sqlite3.connect(self.database_file) as conn:
+            conn.executescript(SCHEMA_FILE.read_text())
+        self.db_client = SQLliteDBClient(database_file=self.database_file)
+        self.loader = ProgramTreeLoader(self.db_client, cache_dir=None, columns=("response", "holdout_value", "meta"))
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def insert(self, *programs):
+        """Insert (id, parent_id, achievements) programs into version 1"""
+        with sqlite3.connect(self.database_file) as conn:
+            conn.executemany(
+                "INSERT INTO programs (id, parent_id, version, raw_reward, ticks, code, response, conversation_json, "
+                "achievements_json, meta) VALUES (?, ?, 1, ?, 60, 'pass', ?, '{}', ?, ?)",
+                [(id, parent_id, float(id), "Error: no" if id == 3 else "ok", json.dumps(achievements),
+                  json.dumps({"process_id": id % 2, "model": "gpt-4o", "tool_latency": {"score": {"calls": 1}}}))
+                 for id, parent_id, achievements in programs])
+
+    def programs(self):
+        self.insert((1, None, {"static": {"iron-ore": 5}, "dynamic": {}}),
+                    (2, 1, {"static": {}, "dynamic": {"iron-plate": 2}}),
+                    (3, 2, {"static": {"iron-ore": 1}, "dynamic": {}}),
+                    (4, None, {}),
+                    (5, 99, {"static": {"coal": 3}, "dynamic": {}}))
+
+    def test_columns(self):
+        self.programs()
+        columns = build_columns(self.loader.fetch(1))
+
+        self.assertEqual(columns["depth"].tolist(), [0, 1, 2, 0, 0])
+        self.assertEqual(columns["root_id"].tolist(), [1, 1, 1, 4, 5])
+        self.assertEqual(columns["cumulative_reward"].tolist(), [1, 3, 6, 4, 5])
+        self.assertEqual(columns["cumulative_ticks"].tolist(), [60, 120, 180, 60, 60])
+        self.assertEqual(columns["has_error"].tolist(), [False, False, True, False, False])
+        self.assertEqual(columns["static_iron-ore"].tolist(), [5, 0, 1, 0, 0])
+        self.assertEqual(columns["produced_iron-ore"].tolist(), [5, 5, 6, 0, 0])
+        self.assertEqual(columns["produced_iron-plate"].tolist(), [0, 2, 2, 0, 0])
+        self.assertEqual(columns["meta_tool_latency.score.calls"].tolist(), [1] * 5)
+        self.assertNotIn("meta_model", columns)
+
+    def test_incremental_columns_continue_lineages(self):
+        self.programs()
+        rows = self.loader.fetch(1)
+        full = build_columns(rows)
+
+        first = build_columns(rows[:2])
+        previous = {name: values for name, values in first.items()
+                    if name in ("id", "depth", "root_id", "cumulative_reward", "cumulative_ticks")
+                    or name.startswith("produced_")}
+        rest = build_columns(rows[2:], previous)
+
+        for name in ("depth", "root_id", "cumulative_reward", "produced_iron-ore", "produced_iron-plate"):
+            self.assertEqual(np.concatenate([first[name], rest[name]]).tolist(), full[name].tolist(), name)
+        self.assertNotIn("produced_coal", first)
+
+    def test_bootstrap_mean(self):
+        stats = bootstrap_mean(np.array([1.0, 2.0, 3.0, 4.0]), rng=np.random.default_rng(0))
+
+        self.assertEqual(stats["mean"], 2.5)
+        self.assertLessEqual(stats["ci_lower"], 2.5)
+        self.assertGreaterEqual(stats["ci_upper"], 2.5)
+        self.assertEqual(bootstrap_mean(np.array([]))["mean"], 0)
+
+    def test_incremental_columns_continue_from_higher_ids(self):
+        self.programs()
+        rows = self.loader.fetch(1)
+        previous = build_columns([rows[0], rows[2]])
+        # Program 2 committed after program 3 was exported
+        late = build_columns([rows[1]], {name: values for name, values in previous.items()
+                                         if name in LINEAGE_COLUMNS or name.startswith("produced_")})
+
+        self.assertEqual((late["depth"].tolist(), late["root_id"].tolist()), ([1], [1]))
+        self.assertEqual(late["produced_iron-plate"].tolist(), [2])
+
+    def test_export_is_incremental(self):
+        self.check_export_is_incremental(NumpyRunExporter)
+
+    @unittest.skipUnless(importlib.util.find_spec("pyarrow"), "pyarrow (the analysis extra) is not installed")
+    def test_parquet_export_is_incremental(self):
+        self.check_export_is_incremental(RunExporter)
+
+    def test_programs_committed_late_are_exported(self):
+        self.insert((1, None, {"static": {"iron-ore": 5}, "dynamic": {}}), (3, None, {}))
+        exporter = NumpyRunExporter(self.db_client, out_dir=os.path.join(self.temp_dir, "exports"))
+        exporter.export(1)
+        self.insert((2, 1, {"static": {"coal": 1}, "dynamic": {}}))
+
+        path = exporter.export(1)
+        columns = exporter.read_columns(1)
+
+        self.assertEqual(path.name, "part-2-2.parquet")
+        self.assertEqual(columns["id"].tolist(), [1, 2, 3])
+        self.assertEqual(columns["produced_iron-ore"].tolist(), [5, 5, 0])
+        self.assertEqual(columns["produced_coal"].tolist(), [0, 1, 0])
+
+    def test_parts_are_compacted(self):
+        exporter = NumpyRunExporter(self.db_client, out_dir=os.path.join(self.temp_dir, "exports"), max_parts=2)
+        for id in range(1, 4):
+            self.insert((id, id - 1 or None, {"static": {f"item-{id}": 1}, "dynamic": {}}))
+            exporter.export(1)
+
+        self.assertEqual([path.name for path in exporter._parts(1)], ["part-1-3.parquet"])
+        columns = exporter.read_columns(1)
+        self.assertEqual(columns["id"].tolist(), [1, 2, 3])
+        self.assertEqual(columns["depth"].tolist(), [0, 1, 2])
+        self.assertEqual(columns["static_item-2"].tolist(), [0, 1, 0])
+
+    def check_export_is_incremental(self, exporter_class):
+        self.insert((1, None, {"static": {"iron-ore": 5}, "dynamic": {}}), (2, 1, {}))
+        exporter = exporter_class(self.db_client, out_dir=os.path.join(self.temp_dir, "exports"))
+        exporter.export(1)
+        self.insert((3, 2, {"static": {"coal": 1}, "dynamic": {}}))
+
+        path = exporter.export(1)
+        columns = exporter.read_columns(1)
+
+        self.assertEqual(path.name, "part-3-3.parquet")
+        self.assertIsNone(exporter.export(1))
+        self.assertEqual(columns["id"].tolist(), [1, 2, 3])
+        self.assertEqual(columns["produced_iron-ore"].tolist(), [5, 5, 5])
+        self.assertEqual(columns["produced_coal"].tolist(), [0, 0, 1])
+
+
+if __name__ == '__main__':
+    unittest.main()
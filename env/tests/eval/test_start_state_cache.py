@@ -0,0 +1,77 @@
+import asyncio
+import unittest
+from types import SimpleNamespace
+from unittest.mock import patch
+
+from eval.open.mcts.start_state_cache import StartStateCache, reset_instances
+
+
+class FakeInstance:
+    def __init__(self, accrued=5.0):
+        self.resets = []
+        self.fast_forwarded = 0
+        self.accrued = accrued
+        self.namespace = SimpleNamespace(score=lambda: (self.fast_forwarded and self.accrued, 0))
+
+    def reset(self, state):
+        self.resets.append(state)
+        self.fast_forwarded = 0
+
+    def fast_forward(self, ticks):
+        self.fast_forwarded += ticks
+
+    def inspect_inventory(self):
+        return {"iron-plate": 10}
+
+
+class TestStartStateCache(unittest.IsolatedAsyncioTestCase):
+    async def test_observations_are_cached_per_parent(self):
+        cache = StartStateCache()
+        instance = FakeInstance()
+        with patch("eval.open.mcts.start_state_cache.get_mining_setup", return_value="No entities"), \
+                patch("eval.open.mcts.start_state_cache.GameState.from_instance",
+                      return_value=SimpleNamespace(entities=[])):
+            first, first_reset = await cache.observe(1, instance, "state")
+            second, second_reset = await cache.observe(1, instance, "state")
+
+        self.assertIs(first, second)
+        self.assertEqual((first_reset, second_reset), (True, False))
+        self.assertEqual(instance.resets, ["state"])
+        self.assertEqual(first.inventory, {"iron-plate": 10})
+
+    async def test_concurrent_candidates_share_one_holdout_measurement(self):
+        cache = StartStateCache()
+        instance = FakeInstance(accrued=5.0)
+
+        values = await asyncio.gather(*(cache.holdout_value(1, instance, "state", 3) for _ in range(4)))
+
+        self.assertEqual(values, [5.0] * 4)
+        self.assertEqual(instance.resets, ["state"])
+        self.assertEqual(instance.fast_forwarded, 180)
+
+    async def test_failed_holdout_is_measured_again(self):
+        cache = StartStateCache()
+        instance = FakeInstance()
+        instance.reset = lambda state: (_ for _ in ()).throw(ConnectionError("Server gone"))
+
+        with self.assertRaises(ConnectionError):
+            await cache.holdout_value(1, instance, "state", 3)
+        self.assertNotIn(1, cache.holdout_values)
+
+    async def test_least_recently_used_are_evicted(self):
+        cache = StartStateCache(max_entries=2)
+        instance = FakeInstance()
+        for key in (1, 2, 1, 3):
+            await cache.holdout_value(key, instance, f"state {key}", 1)
+
+        self.assertEqual(list(cache.holdout_values), [1, 3])
+
+    async def test_reset_instances(self):
+        instances = [FakeInstance() for _ in range(3)]
+        await reset_instances(instances, "state")
+
+        self.assertEqual([instance.resets for instance in instances], [["state"]] * 3)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,106 @@
+import os
+import shutil
+import sqlite3
+import tempfile
+import unittest
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import List, Optional
+from unittest.mock import patch
+
+from eval.open.db_client import SQLliteDBClient
+from eval.open.plots.tree_loader import ProgramTreeLoader
+
+SCHEMA_FILE = Path(__file__).parent.parent.parent.parent / "extension" / "create_table.sql"
+
+
+@dataclass
+class Node:
+    id: int
+    parent_id: Optional[int]
+    children: List['Node'] = field(default_factory=list)
+
+
+class TestProgramTreeLoader(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        self.database_file = os.path.join(self.temp_dir, "programs.db")
+        with sqlite3.connect(self.database_file) as conn:
+            conn.executescript(SCHEMA_FILE.read_text())
+        self.db_client = SQLliteDBClient(database_file=self.database_file)
+        self.cache_dir = os.path.join(self.temp_dir, "cache")
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+
+    def insert(self, *programs):
+        """Insert (id, parent_id) programs into version 1"""
+        with sqlite3.connect(self.database_file) as conn:
+            conn.executemany(
+                "INSERT INTO programs (id, parent_id, version, value, ticks, code, response, conversation_json, "
+                "achievements_json) VALUES (?, ?, 1, ?, 60, 'pass', 'ok', '{}', ?)",
+                [(id, parent_id, float(id), '{"static": {"iron-plate": 1}, "dynamic": {}}')
+                 for id, parent_id in programs])
+
+    def build(self, loader):
+        return loader.load(1).build(lambda row: Node(row.id, row.parent_id))
+
+    def test_builds_trees(self):
+        self.insert((1, None), (2, 1), (3, 1), (4, 2), (5, None))
+        loader = ProgramTreeLoader(self.db_client, cache_dir=self.cache_dir, columns=("response",))
+
+        tree = loader.load(1)
+        roots = tree.build(lambda row: Node(row.id, row.parent_id))
+
+        self.assertEqual([root.id for root in roots], [1, 5])
+        self.assertEqual([child.id for child in roots[0].children], [2, 3])
+        self.assertEqual(roots[0].children[0].children[0].id, 4)
+        self.assertEqual(tree.rows[1].static_achievements, {"iron-plate": 1})
+        self.assertEqual(tree.rows[1].extra, {"response": "ok"})
+
+    def test_only_new_programs_are_fetched(self):
+        self.insert((1, None), (2, 1))
+        loader = ProgramTreeLoader(self.db_client, cache_dir=self.cache_dir, late_window=0)
+        self.build(loader)
+        self.insert((3, 2), (4, 1))
+
+        with patch.object(ProgramTreeLoader, "fetch", autospec=True, side_effect=ProgramTreeLoader.fetch) as fetch:
+            roots = self.build(loader)
+
+        self.assertEqual(fetch.call_args.args[1:], (1, 2))
+        self.assertEqual([child.id for child in roots[0].children], [2, 4])
+        self.assertEqual(roots[0].children[0].children[0].id, 3)
+
+    def test_cache_is_reused_across_loaders(self):
+        self.insert((1, None), (2, 1))
+        self.build(ProgramTreeLoader(self.db_client, cache_dir=self.cache_dir))
+        self.insert((3, 1))
+
+        loader = ProgramTreeLoader(self.db_client, cache_dir=self.cache_dir, late_window=0)
+        with patch.object(ProgramTreeLoader, "fetch", autospec=True, side_effect=ProgramTreeLoader.fetch) as fetch:
+            tree = loader.load(1)
+
+        self.assertEqual(fetch.call_args.args[1:], (1, 2))
+        self.assertEqual(sorted(tree.rows), [1, 2, 3])
+
+    def test_programs_committed_late_are_loaded(self):
+        self.insert((1, None), (2, 1), (4, 1))
+        loader = ProgramTreeLoader(self.db_client, cache_dir=self.cache_dir, late_window=2)
+        self.build(loader)
+        # Program 3's id was allocated before program 4's, but it committed after the load
+        self.insert((3, 1))
+
+        roots = self.build(ProgramTreeLoader(self.db_client, cache_dir=self.cache_dir, late_window=2))
+
+        self.assertEqual([child.id for child in roots[0].children], [2, 3, 4])
+
+    def test_orphans(self):
+        self.insert((1, None), (2, 99))
+        tree = ProgramTreeLoader(self.db_client, cache_dir=None).load(1)
+
+        self.assertEqual(tree.root_ids(), [1, 2])
+        self.assertEqual(tree.root_ids(orphans_as_roots=False), [1])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,72 @@
+import json
+import subprocess
+import unittest
+from unittest.mock import patch
+
+from cluster.local import cluster_ips
+from cluster.local.cluster_ips import ContainerEndpoint, get_local_container_endpoints, get_local_container_ips
+
+
+def inspect_output(i: int) -> dict:
+    return {
+        "Name": f"/factorio_{i}",
+        "NetworkSettings": {"Ports": {
+            "34197/udp": [{"HostIp": "0.0.0.0", "HostPort": str(34197 + i)}],
+            "27015/tcp": [{"HostIp": "0.0.0.0", "HostPort": str(27000 + i)}],
+        }},
+    }
+
+
+def docker(containers: int):
+    def run(cmd, **kwargs):
+        if cmd[1] == "ps":
+            stdout = "\n".join(f"id{i}" for i in reversed(range(containers)))
+        else:
+            stdout = json.dumps([inspect_output(int(container_id[2:])) for container_id in cmd[2:]])
+        return subprocess.CompletedProcess(cmd, 0, stdout=stdout, stderr="")
+    return run
+
+
+@patch.object(cluster_ips, "DOCKER_SOCKET", "/nonexistent/docker.sock")
+class TestClusterIps(unittest.TestCase):
+    def setUp(self):
+        cluster_ips._cache = None
+
+    def test_inspects_every_container_at_once(self):
+        with patch("subprocess.run", side_effect=docker(3)) as run:
+            endpoints = get_local_container_endpoints()
+
+        self.assertEqual(run.call_count, 2)
+        self.assertEqual(endpoints[0], ContainerEndpoint("factorio_0", "127.0.0.1", 34197, 27000))
+        self.assertEqual([endpoint.tcp_port for endpoint in endpoints], [27000, 27001, 27002])
+
+    def test_endpoints_are_cached(self):
+        with patch("subprocess.run", side_effect=docker(2)) as run:
+            get_local_container_endpoints()
+            ips, udp_ports, tcp_ports = get_local_container_ips()
+            self.assertEqual(run.call_count, 2)
+
+            get_local_container_endpoints(refresh=True)
+            self.assertEqual(run.call_count, 4)
+
+        self.assertEqual(ips, ["127.0.0.1", "127.0.0.1"])
+        self.assertEqual(udp_ports, [34197, 34198])
+        self.assertEqual(tcp_ports, [27000, 27001])
+
+    def test_no_containers(self):
+        with patch("subprocess.run", side_effect=docker(0)):
+            self.assertEqual(get_local_container_ips(), ([], [], []))
+
+    def test_falls_back_to_compose_file(self):
+        with patch("subprocess.run", side_effect=subprocess.TimeoutExpired("docker", 5)), \
+                patch.object(cluster_ips, "_endpoints_from_compose", wraps=cluster_ips._endpoints_from_compose) as compose:
+            endpoints = get_local_container_endpoints()
+
+        compose.assert_called_once()
+        self.assertTrue(endpoints)
+        self.assertEqual(endpoints[0].tcp_port, 27000)
+        self.assertEqual(endpoints[0].udp_port, 34197)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,69 @@
+from unittest.mock import patch
+
+from entities import BeltGroup
+from tools.admin.get_entity_changes.client import GetEntityChanges
+from tools.agent.get_entities.client import GetEntities
+
+
+def serialized_chest(unit_number, x, items=None):
+    return {"name": "wooden-chest", "id": unit_number, "position": {"x": x, "y": 0.5}, "direction": 0,
+            "health": 100, "energy": 0, "dimensions": {"width": 1, "height": 1},
+            "tile_dimensions": {"tile_width": 1, "tile_height": 1}, "inventory": items or {}}
+
+
+def serialized_belt(unit_number, x):
+    return {"name": "transport-belt", "id": unit_number, "position": {"x": x, "y": 0.5}, "direction": 2,
+            "health": 100, "energy": 0, "dimensions": {"width": 1, "height": 1},
+            "tile_dimensions": {"tile_width": 1, "tile_height": 1},
+            "input_position": {"x": x - 1, "y": 0.5}, "output_position": {"x": x + 1, "y": 0.5}}
+
+
+def make_feed():
+    # The feed only needs `execute` to talk to the server, which is patched in each test
+    feed = GetEntityChanges.__new__(GetEntityChanges)
+    feed.builder = GetEntities.__new__(GetEntities)
+    feed.cursor = 0
+    feed.mirror = {}
+    return feed
+
+
+def test_mirror_follows_changes():
+    feed = make_feed()
+    responses = [
+        {"cursor": 2, "reset": True, "changed": [serialized_chest(1, 0.5), serialized_chest(2, 1.5)], "removed": []},
+        {"cursor": 4, "reset": False, "changed": [serialized_chest(1, 0.5, {"coal": 5})], "removed": [2]},
+        {"cursor": 4, "reset": False, "changed": [], "removed": []},
+    ]
+    with patch.object(GetEntityChanges, "execute", side_effect=[(r, 0) for r in responses]) as execute:
+        assert feed.sync()
+        assert sorted(feed.mirror) == [1, 2]
+
+        changes = feed.sync()
+        assert execute.call_args.args[1:] == (2, False)
+        assert changes.removed == [2] and [e.id for e in changes.changed] == [1]
+        chest, = feed.entities()
+        assert chest.inventory.coal == 5
+
+        assert not feed.sync()
+        assert feed.cursor == 4
+
+
+def test_reset_drops_the_mirror():
+    feed = make_feed()
+    feed.cursor = 7
+    feed.mirror = {1: object(), 2: object()}
+    response = {"cursor": 1, "reset": True, "changed": [serialized_chest(3, 0.5)], "removed": []}
+    with patch.object(GetEntityChanges, "execute", return_value=(response, 0)):
+        feed.sync()
+    assert list(feed.mirror) == [3]
+
+
+def test_grouping_does_not_touch_the_mirror():
+    feed = make_feed()
+    response = {"cursor": 3, "reset": True, "changed": [serialized_belt(i, i + 0.5) for i in range(3)], "removed": []}
+    with patch.object(GetEntityChanges, "execute", return_value=(response, 0)):
+        feed.sync()
+
+    group, = feed.entities()
+    assert isinstance(group, BeltGroup) and len(group.belts) == 3
+    assert not any(belt.is_source or belt.is_terminus for belt in feed.mirror.values())
@@ -0,0 +1,51 @@
+import pytest
+
+from instance import FactorioInstance, FAST_FORWARD_SPEED
+
+
+class FakeRCON:
+    """Simulates ticks_to_run: each poll of the tick runs up to 7 more ticks"""
+
+    def __init__(self):
+        self.tick = 100
+        self.ticks_to_run = 0
+        self.commands = []
+
+    def send_command(self, command):
+        self.commands.append(command)
+        if "game.ticks_to_run = " in command and "rcon.print" in command:
+            self.ticks_to_run = int(command.split("game.ticks_to_run = ")[1].split(";")[0])
+            return str(self.tick)
+        if command == "/c rcon.print(game.tick)":
+            step = min(7, self.ticks_to_run)
+            self.tick += step
+            self.ticks_to_run -= step
+            return str(self.tick)
+        return ""
+
+
+def make_instance():
+    instance = FactorioInstance.__new__(FactorioInstance)
+    instance.rcon_client = FakeRCON()
+    instance._speed = 1
+    return instance
+
+
+def test_fast_forward_runs_exactly_the_requested_ticks():
+    instance = make_instance()
+    assert instance.fast_forward(600, poll_interval=0) == 700
+
+    commands = instance.rcon_client.commands
+    assert f"game.speed = {FAST_FORWARD_SPEED}" in commands[0] and "game.tick_paused = true" in commands[0]
+    # Afterwards the game runs at its usual speed again
+    assert commands[-1].endswith("game.speed = 1; game.tick_paused = false")
+
+
+def test_fast_forward_times_out_and_restores_speed():
+    instance = make_instance()
+    instance.rcon_client.send_command = lambda command, rcon=instance.rcon_client: (
+        rcon.commands.append(command) or "100")
+
+    with pytest.raises(TimeoutError):
+        instance.fast_forward(600, poll_interval=0, timeout=0)
+    assert instance.rcon_client.commands[-1].endswith("game.tick_paused = false")
@@ -0,0 +1,64 @@
+import pickle
+import zlib
+from unittest.mock import patch
+
+import pytest
+
+from models.game_state import GameState
+from models.research_state import ResearchState
+from models.technology_state import TechnologyState
+
+
+@pytest.fixture()
+def state():
+    entities = [{"name": "stone-furnace", "position": {"x": i + 0.5, "y": 2.5}, "direction": 0,
+                 "inventories": {"furnace_source": {"iron-ore": i % 50}}} for i in range(500)]
+    research = ResearchState(
+        technologies={"automation": TechnologyState(name="automation", researched=True, enabled=True, level=1,
+                                                    research_unit_count=10, research_unit_energy=600,
+                                                    prerequisites=[], ingredients=[{"automation-science-pack": 1}])},
+        current_research=None, research_progress=0, research_queue=[], progress={})
+    return GameState(entities=entities, inventory={"iron-plate": 50, "coal": 10}, research=research,
+                     namespace=pickle.dumps({"furnaces": [1, 2, 3]}))
+
+
+def test_round_trip(state):
+    restored = GameState.from_binary(state.to_binary())
+
+    assert restored.entities == state.entities
+    assert restored.inventory == state.inventory
+    assert restored.research == state.research
+    assert pickle.loads(restored.namespace) == {"furnaces": [1, 2, 3]}
+    assert restored.timestamp == state.timestamp
+
+
+def test_smaller_than_json(state):
+    assert len(state.to_binary()) < len(state.to_raw()) / 4
+
+
+def test_sections_are_decoded_lazily(state):
+    blob = state.to_binary()
+    with patch("models.game_state.zlib.decompress", wraps=zlib.decompress) as decompress:
+        restored = GameState.from_binary(blob)
+        assert decompress.call_count == 0
+
+        assert restored.inventory == {"iron-plate": 50, "coal": 10}
+        assert restored.inventory == {"iron-plate": 50, "coal": 10}
+        assert decompress.call_count == 1
+
+
+def test_missing_research_section():
+    state = GameState(entities=[], inventory={}, research=None)
+    restored = GameState.load(state.to_binary())
+    assert restored.research is None
+    assert restored.namespace == bytes()
+
+
+def test_load_accepts_every_stored_format(state):
+    for stored in (state.to_binary(), memoryview(state.to_binary()), state.to_raw()):
+        assert GameState.load(stored).inventory == state.inventory
+
+
+def test_rejects_other_data():
+    with pytest.raises(ValueError):
+        GameState.from_binary(b"\x00" * 32)
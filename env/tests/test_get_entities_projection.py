@@ -0,0 +1,63 @@
+from unittest.mock import patch
+
+from entities import Direction, EntityStatus, Position
+from game_types import Prototype
+from tools.agent.get_entities.client import GetEntities, prototype_by_name
+
+
+def make_tool():
+    # The tool only needs `execute` to talk to the server, which is patched below
+    return GetEntities.__new__(GetEntities)
+
+
+def test_prototype_by_name():
+    assert prototype_by_name("stone-furnace") == Prototype.StoneFurnace
+    assert prototype_by_name("transport_belt") == Prototype.TransportBelt
+    assert prototype_by_name("not-an-entity") is None
+
+
+def test_projected_entities_are_built_without_validation():
+    response = [{"name": "stone-furnace", "position": {"x": 1.0, "y": 2.0}, "direction": 0,
+                 "tile_dimensions": {"tile_width": 2, "tile_height": 2}, "status": "working"}]
+    tool = make_tool()
+    with patch.object(GetEntities, "execute", return_value=(response, 0)) as execute:
+        entities = tool({Prototype.StoneFurnace}, position=Position(x=0, y=0), radius=5, fields={"status"})
+
+    fields = execute.call_args.args[-1]
+    assert all(f'"{field}"' in fields for field in ("name", "position", "direction", "tile_dimensions", "status"))
+    assert execute.call_args.args[2] == '["stone-furnace"]'
+
+    furnace, = entities
+    assert furnace.prototype == Prototype.StoneFurnace
+    assert furnace.position == Position(x=1.0, y=2.0)
+    assert furnace.direction == Direction.UP
+    assert furnace.status == EntityStatus.WORKING
+    # Only the fetched fields are shown, rather than defaults for the rest (like empty inventories)
+    assert repr(furnace).strip() == \
+        "Furnace(name='stone-furnace', direction=Direction.UP, position=Position(x=1.0, y=2.0), " \
+        "status=EntityStatus.WORKING)"
+
+
+def test_projected_belts_use_the_slim_repr():
+    response = [{"name": "transport-belt", "position": {"x": 0.5, "y": 0.5}, "direction": 2,
+                 "tile_dimensions": {"tile_width": 1, "tile_height": 1}}]
+    with patch.object(GetEntities, "execute", return_value=(response, 0)):
+        belt, = make_tool()(Prototype.TransportBelt, fields="direction")
+    # TransportBelt's own repr would need its input and output positions, which weren't fetched
+    assert repr(belt).strip() == "TransportBelt(name='transport-belt', direction=Direction.RIGHT, " \
+                                 "position=Position(x=0.5, y=0.5))"
+
+
+def test_full_entities_are_requested_without_projection():
+    tool = make_tool()
+    with patch.object(GetEntities, "execute", return_value=([], 0)) as execute:
+        assert tool() == []
+    assert execute.call_args.args[-1] is None
+
+
+def test_single_field_name_is_not_split_into_characters():
+    tool = make_tool()
+    with patch.object(GetEntities, "execute", return_value=([], 0)) as execute:
+        tool(fields="status")
+    assert sorted(execute.call_args.args[-1].strip("[]").split(",")) == \
+        sorted(f'"{field}"' for field in ("name", "position", "direction", "tile_dimensions", "status"))
@@ -0,0 +1,81 @@
+from entities import TransportBelt, UndergroundBelt, Position, Dimensions, TileDimensions, Direction, BeltGroup
+from game_types import Prototype
+from tools.agent.connect_entities.groupable_entities import agglomerate_groupable_entities
+
+OFFSETS = {Direction.EAST: (1, 0), Direction.WEST: (-1, 0), Direction.SOUTH: (0, 1), Direction.NORTH: (0, -1)}
+
+
+def make_belt(x, y, direction, is_source=False, is_terminus=False, underground=None):
+    dx, dy = OFFSETS[direction]
+    kwargs = dict(name='transport-belt',
+                  position=Position(x=x, y=y),
+                  direction=direction,
+                  energy=0,
+                  health=100,
+                  dimensions=Dimensions(width=1, height=1),
+                  tile_dimensions=TileDimensions(tile_width=1, tile_height=1),
+                  prototype=Prototype.TransportBelt,
+                  input_position=Position(x=x - dx, y=y - dy),
+                  output_position=Position(x=x + dx, y=y + dy),
+                  is_source=is_source,
+                  is_terminus=is_terminus)
+    if underground:
+        is_input, id, connected_to = underground
+        kwargs.update(prototype=Prototype.UndergroundBelt, is_input=is_input, id=id, connected_to=connected_to)
+        return UndergroundBelt(**kwargs)
+    return TransportBelt(**kwargs)
+
+
+def make_line(x, y, length, direction):
+    dx, dy = OFFSETS[direction]
+    return [make_belt(x + dx * i, y + dy * i, direction, is_source=i == 0, is_terminus=i == length - 1)
+            for i in range(length)]
+
+
+def test_long_belt_is_one_group():
+    # Long enough to have exceeded the recursion limit when belts were walked recursively
+    groups = agglomerate_groupable_entities(make_line(0.5, 0.5, 3000, Direction.EAST))
+    assert len(groups) == 1
+    assert len(groups[0].belts) == 3000
+    assert [b.position.x for b in groups[0].inputs] == [0.5]
+    assert [b.position.x for b in groups[0].outputs] == [2999.5]
+
+
+def test_side_loading_belts_are_merged():
+    for feeder_first in (False, True):
+        main = make_line(0.5, 0.5, 6, Direction.EAST)
+        feeder = make_line(3.5, -2.5, 3, Direction.SOUTH)
+        feeder[-1].is_terminus = False
+
+        groups = agglomerate_groupable_entities(feeder + main if feeder_first else main + feeder)
+        assert len(groups) == 1
+        assert len(groups[0].belts) == 9
+
+
+def test_parallel_lines_stay_separate():
+    belts = [belt for lane in range(20) for belt in make_line(0.5, 2 * lane + 0.5, 10, Direction.EAST)]
+    groups = agglomerate_groupable_entities(belts)
+    assert len(groups) == 20
+    assert all(isinstance(group, BeltGroup) and len(group.belts) == 10 for group in groups)
+
+
+def test_underground_pair_joins_group():
+    belts = [make_belt(0.5, 0.5, Direction.EAST, is_source=True),
+             make_belt(1.5, 0.5, Direction.EAST, underground=(True, 1, 2)),
+             make_belt(4.5, 0.5, Direction.EAST, underground=(False, 2, 1)),
+             make_belt(5.5, 0.5, Direction.EAST, is_terminus=True)]
+    groups = agglomerate_groupable_entities(belts)
+    assert len(groups) == 1
+    # The entrance and exit are consolidated into a single underground belt
+    assert len(groups[0].belts) == 3
+
+
+def test_groups_only_merge_into_earlier_groups():
+    # The belt at (0.5, 0.5) feeds the later group below it, which is left as its own group
+    belts = [make_belt(0.5, 1.5, Direction.EAST),
+             make_belt(1.5, 0.5, Direction.EAST, is_terminus=True),
+             make_belt(0.5, 2.5, Direction.SOUTH, is_terminus=True),
+             make_belt(0.5, 0.5, Direction.SOUTH, is_terminus=True)]
+    groups = agglomerate_groupable_entities(belts)
+    assert sorted(sorted((b.position.x, b.position.y) for b in group.belts) for group in groups) == \
+        [[(0.5, 0.5), (1.5, 0.5)], [(0.5, 1.5), (0.5, 2.5)]]
@@ -0,0 +1,33 @@
+from tests.benchmarks.microbenchmarks import (BENCHMARKS, Result, find_baseline, load_baselines, measure,
+                                              regressions, run, save_results)
+
+
+def test_regressions_past_threshold():
+    results = [Result("fast", 1.0, 0), Result("slow", 1.3, 0), Result("new", 5.0, 0)]
+    baseline = {"fast": 1.1, "slow": 1.0}
+
+    assert regressions(results, baseline, threshold=0.2) == ["slow"]
+    assert regressions(results, baseline, threshold=0.5) == []
+
+
+def test_baseline_is_latest_other_commit(tmp_path):
+    path = tmp_path / "baselines.json"
+    save_results([Result("lua2python", 2.0, 0)], "machine", "aaaaaaa", path)
+    save_results([Result("lua2python", 1.0, 0)], "machine", "bbbbbbb", path)
+    save_results([Result("lua2python", 9.0, 0)], "other-machine", "ccccccc", path)
+    baselines = load_baselines(path)
+
+    assert find_baseline(baselines, "machine", "ccccccc") == ("bbbbbbb", {"lua2python": 1.0})
+    assert find_baseline(baselines, "machine", "bbbbbbb") == ("aaaaaaa", {"lua2python": 2.0})
+    assert find_baseline(baselines, "new-machine", "ccccccc") is None
+
+
+def test_measure():
+    result = measure(lambda: sum(range(100)), repeat=3)
+    assert 0 < result.seconds < 0.01
+
+
+def test_benchmarks_run():
+    results = run(["lua2python", "namespace_eval"], repeat=1)
+    assert [result.name for result in results] == ["lua2python", "namespace_eval"]
+    assert set(BENCHMARKS) >= {"rcon_round_trip", "game_state_binary", "entity_grouping", "db_resume_state"}
@@ -0,0 +1,77 @@
+from types import SimpleNamespace
+from unittest.mock import patch
+
+import pytest
+
+import namespace as namespace_module
+from namespace import FactorioNamespace
+
+
+@pytest.fixture()
+def namespace():
+    """A namespace that can evaluate programs without a running Factorio server"""
+    namespace = FactorioNamespace(SimpleNamespace(tcp_port=0))
+    namespace.score = lambda: (0, None)
+    return namespace
+
+
+def test_loop_compiles_each_node_once(namespace):
+    program = "total = 0\nfor i in range(50):\n    print(i * 2)\nprint(total)"
+    with patch.object(namespace_module, 'compile', wraps=compile, create=True) as compile_spy:
+        _, _, result = namespace.eval_with_timeout(program)
+
+    assert result.splitlines()[1] == "3: (2,)"
+    assert result.splitlines()[-1] == "4: (0,)"
+    # One compile per distinct node, not one per loop iteration
+    assert compile_spy.call_count < 10
+
+
+def test_variables_and_functions_persist(namespace):
+    namespace.eval_with_timeout("fizz = 'mart'\ndef shout(x):\n    return x.upper()")
+    _, _, result = namespace.eval_with_timeout("print(shout(fizz))")
+    assert result == "1: ('MART',)"
+
+
+def test_function_sees_later_variables(namespace):
+    program = "def get_y():\n    return y\ny = 3\nprint(get_y())\ny = 4\nprint(get_y())"
+    _, _, result = namespace.eval_with_timeout(program)
+    assert result.splitlines() == ["4: (3,)", "6: (4,)"]
+
+
+def test_uncached_mode_matches(namespace):
+    program = "values = [i for i in range(3)]\nfor v in values:\n    if v > 0:\n        print(v)"
+    _, _, cached = namespace.eval_with_timeout(program)
+    namespace.cache_compiled_code = False
+    _, _, uncached = namespace.eval_with_timeout(program)
+    assert cached == uncached == "4: (1,)\n4: (2,)"
+
+
+def test_augmented_assignments_persist_in_both_modes():
+    program = "x = 1\ndef f():\n    return x\nx += 1\ny: int = 5\ny -= 2\nprint(x, y, f())"
+    results = []
+    for cache_compiled_code in (True, False):
+        namespace = FactorioNamespace(SimpleNamespace(tcp_port=0))
+        namespace.score = lambda: (0, None)
+        namespace.cache_compiled_code = cache_compiled_code
+        _, _, result = namespace.eval_with_timeout(program)
+        _, _, next_result = namespace.eval_with_timeout("print(x)")
+        results.append((result, next_result))
+
+    assert results[0] == results[1]
+    assert results[0][0].startswith("7: (2, 3,")
+    assert results[0][1] == "1: (2,)"
+
+
+def test_persistent_vars_only_contain_agent_variables(namespace):
+    assert 'print' in namespace.static_vars and 'Prototype' in namespace.static_vars
+    namespace.eval_with_timeout("fizz = 'mart'")
+    assert list(namespace.persistent_vars.keys()) == ['fizz']
+
+
+def test_failed_statement_is_rolled_back(namespace):
+    program = "a = Position(x=1, y=2)\nfor i in range(3):\n    b = i\n    c = 1 / (i - 1)"
+    _, _, result = namespace.eval_with_timeout(program)
+
+    assert 'ZeroDivisionError' in result
+    assert 'a' in namespace.persistent_vars
+    assert 'b' not in namespace.persistent_vars
@@ -0,0 +1,82 @@
+import time
+
+import pytest
+
+from rcon.factorio_rcon import InvalidPassword, RCONClient
+from rcon.stand_in_server import ResponseRecorder, StandInServer, command_key
+
+
+@pytest.fixture()
+def server():
+    with StandInServer(responses={"inspect_inventory": ['{ ["a"] = true, ["b"] = { ["coal"] = 5 } }',
+                                                        '{ ["a"] = true, ["b"] = { ["coal"] = 4 } }']}) as server:
+        yield server
+
+
+def invoke(tool):
+    return f"/silent-command a, b = pcall(global.actions.{tool}, 1); rcon.print(dump({{a=a, b=b}}))"
+
+
+def test_command_keys():
+    assert command_key(invoke("inspect_inventory")) == "inspect_inventory"
+    assert command_key("/c rcon.print(game.tick)") == "rcon.print(game.tick)"
+    # Loading a tool defines it rather than invoking it
+    assert command_key("/c global.actions.score = function() end") == "global.actions.score = function() end"
+
+
+def test_replays_recorded_responses_in_order(server):
+    client = RCONClient(server.address, server.port, "factorio")
+
+    responses = [client.send_command(invoke("inspect_inventory")) for _ in range(3)]
+
+    assert responses[0].endswith("= 5 } }")
+    assert responses[1].endswith("= 4 } }")
+    assert responses[2] == responses[0]
+    assert server.commands["inspect_inventory"] == 3
+    client.close()
+
+
+def test_synthetic_and_built_in_responses():
+    with StandInServer(payload_size=10_000) as server:
+        client = RCONClient(server.address, server.port, "factorio")
+        responses = client.send_commands({
+            "tool": invoke("get_entities"),
+            "player": "/c rcon.print(game.players[1].position)",
+            "silent": "/c game.speed = 10",
+        })
+        client.close()
+
+    assert len(responses["tool"]) >= 10_000
+    assert responses["player"] == "{x = 0, y = 0}"
+    assert responses["silent"] is None
+
+
+def test_rejects_wrong_password(server):
+    with pytest.raises(InvalidPassword):
+        RCONClient(server.address, server.port, "wrong")
+
+
+def test_latency():
+    with StandInServer(latency=0.05) as server:
+        client = RCONClient(server.address, server.port, "factorio")
+        start = time.time()
+        client.send_commands({i: "/c game.speed = 1" for i in range(3)})
+        client.close()
+
+    assert time.time() - start >= 0.15
+
+
+def test_recorded_responses_replay(server, tmp_path):
+    client = RCONClient(server.address, server.port, "factorio")
+    recorder = ResponseRecorder(client)
+    client.send_command(invoke("inspect_inventory"))
+    client.send_command("/c game.speed = 10")
+    recorder.detach()
+    recorder.save(tmp_path / "recording.json")
+    client.close()
+
+    assert list(recorder.responses) == ["inspect_inventory"]
+    with StandInServer(recording=tmp_path / "recording.json") as replay:
+        client = RCONClient(replay.address, replay.port, "factorio")
+        assert client.send_command(invoke("inspect_inventory")).endswith("= 5 } }")
+        client.close()
@@ -0,0 +1,82 @@
+import socket
+import threading
+
+import pytest
+
+from rcon.factorio_rcon import PACKET_PARSER, RCONClient
+from rcon.factorio_rcon.factorio_rcon import InvalidResponse
+
+
+def build(packet_id, body, packet_type=0):
+    return PACKET_PARSER.build([dict(id=packet_id, type=packet_type, body=body)])
+
+
+@pytest.fixture()
+def connection():
+    """A client wired to one end of a socket pair, with the other end standing in for the server"""
+    client_socket, server_socket = socket.socketpair()
+    client = RCONClient("localhost", 0, "", connect_on_init=False)
+    client.rcon_socket = client_socket
+    yield client, server_socket
+    client.close()
+    server_socket.close()
+
+
+def send_in_fragments(server_socket, data, sizes):
+    """Send data split at awkward boundaries (e.g. between the zero bytes of a packet id)"""
+    def run():
+        offset = 0
+        for size in sizes:
+            server_socket.sendall(data[offset:offset + size])
+            offset += size
+        server_socket.sendall(data[offset:])
+    thread = threading.Thread(target=run)
+    thread.start()
+    return thread
+
+
+def test_large_response_is_reassembled(connection):
+    client, server_socket = connection
+    body = "{" + ",".join(f'["entity_{i}"] = {i}' for i in range(200_000)) + "}"
+    # The first fragment ends part way through the id, on two zero bytes
+    thread = send_in_fragments(server_socket, build(1, body), [6, 1, 4093, 65536])
+
+    responses = client.receive_packets()
+    thread.join()
+
+    assert [(r.id, r.body) for r in responses] == [(1, body)]
+
+
+def test_back_to_back_packets(connection):
+    client, server_socket = connection
+    server_socket.sendall(build(1, "first") + build(2, "") + build(3, "third"))
+
+    received = []
+    while len(received) < 3:
+        received.extend(client.receive_packets())
+
+    assert [(r.id, r.body) for r in received] == [(1, "first"), (2, ""), (3, "third")]
+
+
+def test_send_commands_maps_responses(connection):
+    client, server_socket = connection
+    server_socket.sendall(build(1, "a\n") + build(2, ""))
+
+    assert client.send_commands({"x": "/c rcon.print('a')", "y": "/c"}) == {"x": "a", "y": None}
+
+
+def test_invalid_length_prefix(connection):
+    client, server_socket = connection
+    server_socket.sendall(b"\x02\x00\x00\x00\x00\x00")
+
+    with pytest.raises(InvalidResponse):
+        client.receive_packets()
+
+
+def test_oversized_length_prefix(connection):
+    client, server_socket = connection
+    # A corrupt prefix claiming ~2GiB is rejected rather than allocated
+    server_socket.sendall(b"\xff\xff\xff\x7f\x00\x00\x00\x00")
+
+    with pytest.raises(InvalidResponse):
+        client.receive_packets()
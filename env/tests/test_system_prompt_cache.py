@@ -0,0 +1,51 @@
+import os
+import shutil
+import tempfile
+import unittest
+from pathlib import Path
+from unittest.mock import patch
+
+from utils.controller_loader import system_prompt_generator
+from utils.controller_loader.system_prompt_generator import SystemPromptGenerator
+
+SRC_DIR = Path(__file__).parent.parent / "src"
+
+
+class TestSystemPromptCache(unittest.TestCase):
+    def setUp(self):
+        self.temp_dir = tempfile.mkdtemp()
+        system_prompt_generator._PROMPT_MEMO.clear()
+
+    def tearDown(self):
+        shutil.rmtree(self.temp_dir)
+        system_prompt_generator._PROMPT_MEMO.clear()
+
+    def test_source_hash_deterministic(self):
+        generator = SystemPromptGenerator(str(SRC_DIR), cache_dir=self.temp_dir)
+        self.assertEqual(generator.source_hash(), generator.source_hash())
+
+    def test_prompt_is_memoised_and_cached_on_disk(self):
+        generator = SystemPromptGenerator(str(SRC_DIR), cache_dir=self.temp_dir)
+        prompt = generator.generate()
+        self.assertIn("```methods", prompt)
+        self.assertEqual(len(os.listdir(self.temp_dir)), 1)
+
+        # A second call in the same process never regenerates
+        with patch.object(SystemPromptGenerator, "_generate") as regenerate:
+            self.assertEqual(generator.generate(), prompt)
+            regenerate.assert_not_called()
+
+        # A fresh process (empty memo) is served from disk
+        system_prompt_generator._PROMPT_MEMO.clear()
+        with patch.object(SystemPromptGenerator, "_generate") as regenerate:
+            self.assertEqual(SystemPromptGenerator(str(SRC_DIR), cache_dir=self.temp_dir).generate(), prompt)
+            regenerate.assert_not_called()
+
+    def test_cache_disabled(self):
+        generator = SystemPromptGenerator(str(SRC_DIR), cache_dir="")
+        self.assertIn("```types", generator.generate())
+        self.assertEqual(os.listdir(self.temp_dir), [])
+
+
+if __name__ == '__main__':
+    unittest.main()
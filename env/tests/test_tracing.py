@@ -0,0 +1,88 @@
+import atexit
+import json
+import time
+
+import pytest
+
+from instance import FactorioInstance
+from rcon.stand_in_server import StandInServer
+from utils.tracing import LatencyHistogram, Tracer, span
+
+
+@pytest.fixture(scope="module")
+def instance():
+    with StandInServer(latency=0.002) as server:
+        instance = FactorioInstance(address=server.address, tcp_port=server.port, fast=True, cache_scripts=False,
+                                    trace_events=1000)
+        yield instance
+        atexit.unregister(instance.cleanup)
+        instance.rcon_client.close()
+
+
+def test_tool_calls_are_split_into_phases(instance):
+    instance.tracer.reset()
+    instance.namespace.inspect_inventory()
+    checkpoint = instance.tracer.checkpoint()
+    for _ in range(3):
+        instance.namespace.inspect_inventory()
+
+    latency = instance.tracer.latency()["inspect_inventory"]
+    assert latency["total"]["count"] == 4
+    assert set(latency) == {"total", "serialize", "rcon_send", "server", "parse", "client"}
+    # The stand-in takes 2ms to execute each command
+    assert latency["server"]["p50_ms"] >= 2
+
+    summary = instance.tracer.summary(since=checkpoint)
+    assert summary["inspect_inventory"]["calls"] == 3
+    phases = sum(value for key, value in summary["inspect_inventory"].items() if key not in ("calls", "total_ms"))
+    assert phases == pytest.approx(summary["inspect_inventory"]["total_ms"], abs=0.1)
+    json.dumps(summary)
+
+
+def test_chrome_trace_export(instance, tmp_path):
+    instance.namespace.inspect_inventory()
+    instance.tracer.export(tmp_path / "trace.json")
+
+    events = json.loads((tmp_path / "trace.json").read_text())["traceEvents"]
+    tool_events = [event for event in events if event.get("cat") == "tool"]
+    assert tool_events and all(event["ph"] == "X" and event["pid"] == instance.tcp_port for event in tool_events)
+
+
+def test_nested_tools_are_not_counted_twice():
+    tracer = Tracer()
+    with tracer.trace("outer"):
+        with tracer.trace("inner"):
+            with span("server"):
+                time.sleep(0.01)
+
+    summary = tracer.summary()
+    assert summary["inner"]["server_ms"] >= 10
+    assert "server_ms" not in summary["outer"]
+    assert summary["outer"]["client_ms"] < 5
+
+
+def test_spans_are_only_kept_if_asked_for():
+    tracer = Tracer()
+    with tracer.trace("tool"):
+        with span("server"):
+            pass
+
+    assert not tracer.events
+    assert tracer.latency()["tool"]["server"]["count"] == 1
+
+
+def test_spans_outside_tool_calls_are_ignored():
+    tracer = Tracer()
+    with span("server"):
+        pass
+    assert not tracer.events
+
+
+def test_histogram_quantiles():
+    histogram = LatencyHistogram()
+    for milliseconds in [1] * 90 + [100] * 10:
+        histogram.add(milliseconds / 1000)
+
+    assert histogram.quantile(0.5) <= 0.002
+    assert 0.05 < histogram.quantile(0.95) <= 0.1
+    assert histogram.to_dict()["max_ms"] == 100
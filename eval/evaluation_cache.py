@@ -0,0 +1,88 @@
+import ast
+import copy
+import hashlib
+from collections import OrderedDict
+from dataclasses import dataclass, replace
+from typing import Dict, List, Optional, Union
+
+from entities import Entity, EntityGroup
+from models.game_state import GameState
+
+
+def normalize_code(code: str) -> str:
+    """
+    Canonical form of a program, so that programs differing only in formatting share a key.
+
+    The AST drops comments and formatting, but the statements' line numbers are kept, because the
+    game's response refers to them (e.g `4: ('Inventory',)`), as are the number of lines, which the
+    evaluator's hints refer to.
+    """
+    try:
+        tree = ast.parse(code)
+    except SyntaxError:
+        return "\n".join(line.rstrip() for line in code.strip().splitlines())
+    line_numbers = [node.lineno for node in ast.walk(tree) if isinstance(node, ast.stmt)]
+    line_count = len(code.split("\n"))
+    return f"{ast.dump(tree)}\n{line_numbers}\n{line_count}"
+
+
+def evaluation_key(state_hash: str, code: str) -> str:
+    """The key of a program evaluated from a state, given the state's content_hash (hashed once per batch)"""
+    digest = hashlib.sha256()
+    digest.update(state_hash.encode())
+    digest.update(normalize_code(code).encode())
+    return digest.hexdigest()
+
+
+@dataclass
+class CachedEvaluation:
+    """What evaluating a program from a state produced"""
+    raw_reward: float
+    state: GameState
+    response: str
+    entities: List[Union[Entity, EntityGroup]]
+    achievements: Dict[str, Dict[str, int]]
+    ticks: int
+    code_suffix: str = ""  # Hints the evaluator appended to the program
+
+
+class EvaluationCache:
+    """
+    Memoizes evaluations by the state they started from and the (normalized) program, so that
+    duplicate candidates are not run again. The oldest entries are evicted past `max_entries`.
+    """
+
+    def __init__(self, max_entries: int = 10000):
+        self.max_entries = max_entries
+        self.entries: OrderedDict[str, CachedEvaluation] = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[CachedEvaluation]:
+        evaluation = self.entries.get(key)
+        if evaluation is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self.entries.move_to_end(key)
+        # Callers keep and mutate achievements, so each gets its own
+        return replace(evaluation, achievements=copy.deepcopy(evaluation.achievements))
+
+    def put(self, key: str, evaluation: CachedEvaluation):
+        if self.max_entries <= 0:
+            return
+        self.entries[key] = evaluation
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+
+    @property
+    def hit_rate(self) -> float:
+        lookups = self.hits + self.misses
+        return self.hits / lookups if lookups else 0.0
+
+    def stats(self) -> Dict[str, float]:
+        return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hit_rate, "entries": len(self.entries)}
+
+    def summary(self) -> str:
+        return f"hits: {self.hits}, misses: {self.misses}, hit rate: {self.hit_rate:.1%}, entries: {len(self.entries)}"
@@ -1,14 +1,18 @@
 import asyncio
 import copy
 import pickle
-from typing import List, Tuple, Union, Dict
+from contextlib import asynccontextmanager
+from timeit import default_timer as timer
+from typing import List, Tuple, Union, Dict, Optional
 
+from eval.evaluation_cache import CachedEvaluation, EvaluationCache, evaluation_key
 from eval.open.db_client import DBClient
+from eval.open.instance_pool import InstancePool
 from models.game_state import GameState
 from eval.open.mcts.logger import FactorioLogger
 from models.program import Program
 from entities import Entity, EntityGroup
-from instance import FactorioInstance
+from instance import FactorioInstance, TICKS_PER_SECOND
 from utils.profits import get_achievements
 
 
@@ -18,12 +22,16 @@ class Evaluator:
                  instances: List[FactorioInstance],
                  value_accrual_time=10,
                  error_penalty=10,
-                 logger=None):
+                 logger=None,
+                 cache: Optional[EvaluationCache] = None,
+                 pool: Optional[InstancePool] = None):
         self.db = db_client
+        self.pool = pool  # If given, programs are evaluated on instances leased from it rather than on `instances`
         self.instances = instances  # Main instances
         #self.holdout = instances[-1]  # Holdout instance
         self.value_accrual_time = value_accrual_time  # Time to accrue value before evaluating
         self.error_penalty = error_penalty  # Penalty for errors during evaluation
+        self.cache = cache if cache is not None else EvaluationCache()  # Pass one cache to several evaluators to share it
 
 
         # Initialize logger if not provided
@@ -46,6 +54,32 @@ class Evaluator:
             # Find the group ID for the holdout instance
             #self.holdout_group_id = self.port_to_group[self.holdout.tcp_port]
 
+    @property
+    def instances(self) -> List[FactorioInstance]:
+        """The instances, including any the pool has replaced since"""
+        return self.pool.instances if getattr(self, "pool", None) else self._instances
+
+    @instances.setter
+    def instances(self, instances: List[FactorioInstance]):
+        self._instances = instances
+
+    @asynccontextmanager
+    async def lease_instance(self):
+        """
+        An instance to use outside of `evaluate_batch` (e.g to observe a state). With a pool, it is leased, so that
+        nothing else (e.g a heartbeat) drives the instance meanwhile.
+        """
+        if self.pool:
+            async with self.pool.lease() as instance:
+                yield instance
+        else:
+            yield self.instances[0]
+
+    async def close(self):
+        """Stop the pool's heartbeats and recovery, if there is a pool"""
+        if self.pool:
+            await self.pool.close()
+
     def set_status(self, status):
         for instance in self.instances:
             self.logger.update_instance(instance.tcp_port, status=status)
@@ -68,49 +102,88 @@ class Evaluator:
 
     async def evaluate_batch(self, programs: List[Program], start_state: GameState) -> List[Program]:
         try:
+            # Programs already evaluated from this state are not run again, nor are duplicates within the batch
+            state_hash = start_state.content_hash()
+            keys = [evaluation_key(state_hash, program.code) for program in programs]
+            evaluations = {}
+            pending = []
+            pending_keys = set()
+            for program, key in zip(programs, keys):
+                if key in evaluations or key in pending_keys:
+                    continue
+                cached = self.cache.get(key)
+                if cached is not None:
+                    evaluations[key] = cached
+                else:
+                    pending.append((program, key))
+                    pending_keys.add(key)
+
             # Evaluate programs in parallel
             eval_futures = []
-            for i, (prog, inst) in enumerate(zip(programs, self.instances)):
-                inst.reset(start_state)
-                if self.logger:
-                    self.logger.update_instance(inst.tcp_port, program_id=prog.id, status="resetting")
-                eval_futures.append(self._evaluate_single(inst.tcp_port, prog, inst))
+            original_code = []
+            if self.pool:
+                # Every program is evaluated, on whichever instances are healthy
+                evaluated = pending
+                for prog, key in evaluated:
+                    original_code.append(prog.code)
+                    eval_futures.append(self._evaluate_leased(prog, start_state))
+            else:
+                evaluated = pending[:len(self.instances)]
+                for (prog, key), inst in zip(evaluated, self.instances):
+                    inst.reset(start_state)
+                    if self.logger:
+                        self.logger.update_instance(inst.tcp_port, program_id=prog.id, status="resetting")
+                    original_code.append(prog.code)
+                    eval_futures.append(self._evaluate_on(inst, prog))
 
             # Wait for all evaluations and holdout
             eval_results = await asyncio.gather(*eval_futures)
             #holdout_value = await holdout_future
 
-
-            # Update program results
-            for i, (program, (raw_reward, state, response, entities, achievements, ticks)) in enumerate(zip(programs, eval_results)):
-                relative_reward = raw_reward# - holdout_value
+            for (program, key), code, (inst, (raw_reward, state, response, entities, achievements, ticks)) \
+                    in zip(evaluated, original_code, eval_results):
+                evaluation = CachedEvaluation(raw_reward=raw_reward, state=state, response=response,
+                                              entities=entities, achievements=achievements, ticks=ticks,
+                                              code_suffix=program.code[len(code):])
+                self.cache.put(key, evaluation)
+                evaluations[key] = evaluation
 
                 if self.logger:
                     self.logger.update_instance(
-                        self.instances[i].tcp_port,
+                        inst.tcp_port,
                         status="completed",
                         raw_reward=raw_reward,
                         holdout_value=raw_reward,
-                        relative_reward=relative_reward,
+                        relative_reward=raw_reward,
                         total_programs=self.logger.groups[
-                                           self.port_to_group[self.instances[i].tcp_port]
-                                       ].instances[self.instances[i].tcp_port].total_programs + 1
+                                           self.port_to_group[inst.tcp_port]
+                                       ].instances[inst.tcp_port].total_programs + 1
                     )
 
+            # Update program results
+            for program, key in zip(programs, keys):
+                if key not in evaluations:
+                    continue
+                evaluation = evaluations[key]
+                if not program.code.endswith(evaluation.code_suffix):
+                    program.code += evaluation.code_suffix
+                raw_reward = evaluation.raw_reward
+                relative_reward = raw_reward# - holdout_value
+
                 program.value = relative_reward
-                program.state = state
+                program.state = evaluation.state
                 program.raw_reward = raw_reward
-                program.ticks = ticks
+                program.ticks = evaluation.ticks
                 #program.holdout_value = holdout_value
                 conversation = copy.deepcopy(program.conversation)
 
-                conversation.add_result(program.code, response, score=raw_reward, advantage=relative_reward,
+                conversation.add_result(program.code, evaluation.response, score=raw_reward, advantage=relative_reward,
                                         objectives=program.meta[
                                             'objectives'] if 'objectives' in program.meta else [])  #
                 #conversation.add_result(assistant_message_str, response, score=raw_reward, advantage=relative_reward, objectives=program.meta['objectives'] if 'objectives' in program.meta else [])
                 program.conversation = conversation
-                program.response = response
-                program.achievements = achievements
+                program.response = evaluation.response
+                program.achievements = evaluation.achievements
 
             return programs
 
@@ -137,6 +210,28 @@ class Evaluator:
 
         return result, achievements, post_production_flows
     
+    async def _evaluate_on(self, instance: FactorioInstance, program: Program):
+        return instance, await self._evaluate_single(instance.tcp_port, program, instance)
+
+    async def _evaluate_leased(self, program: Program, start_state: GameState):
+        """Evaluate a program on an instance leased from the pool, trying another if the instance was at fault"""
+        code = program.code
+        for attempt in range(2):
+            instance = await self.pool.acquire()
+            healthy = True
+            try:
+                instance.reset(start_state)
+                if self.logger:
+                    self.logger.update_instance(instance.tcp_port, program_id=program.id, status="resetting")
+                return instance, await self._evaluate_single(instance.tcp_port, program, instance)
+            except Exception:
+                healthy = await self.pool.check(instance)
+                if healthy or attempt:
+                    raise
+                program.code = code
+            finally:
+                self.pool.release(instance, healthy)
+
     async def _evaluate_single(self, instance_id: int, program: Program, instance: FactorioInstance) \
             -> Tuple[float, GameState, str, List[Union[Entity, EntityGroup]], Dict[str, Dict[str, int]], int]:
         try:
@@ -146,9 +241,13 @@ class Evaluator:
             tcp_port = instance_id
 
         try:
+            trace_checkpoint = instance.tracer.checkpoint()
             # Get initial state information
             self.logger.update_instance(tcp_port, status="starting value")
-            start_entities = instance.namespace.get_entities()
+            # The entities are mirrored from a feed of what changed, rather than re-observed in full every step
+            entity_feed = instance.controllers["get_entity_changes"]
+            entity_feed.sync()
+            start_entity_count = len(entity_feed.mirror)
             start_inventory = instance.namespace.inspect_inventory()
             start_production_flows = instance.namespace._get_production_stats()
             initial_value, start_time = instance.namespace.score()
@@ -165,9 +264,12 @@ class Evaluator:
             vars = pickle.loads(state.namespace)
 
             self.logger.update_instance(tcp_port, status=f"accruing value ({self.value_accrual_time}s)")
-            await asyncio.sleep(self.value_accrual_time)
+            # Accrue value over a fixed number of ticks, rather than wall-clock time
+            await asyncio.to_thread(instance.fast_forward, self.value_accrual_time * TICKS_PER_SECOND)
 
-            entities = instance.namespace.get_entities()
+            # Swept, as the entities shown to the agent need their inventories and status after the accrual
+            entity_changes = entity_feed.sync(sweep=True)
+            entities = entity_feed.entities()
             final_inventory = instance.namespace.inspect_inventory()
 
             # Check to see if the inventories are different
@@ -183,7 +285,7 @@ class Evaluator:
             # Check to see if the entities are different
             # If so, we put a hint in the code and result
             get_entities_code = 'print(f"Entities on the map: {get_entities()}")'
-            if (start_entities != entities and 'error' not in result.lower()
+            if (entity_changes and 'error' not in result.lower()
                     and get_entities_code not in program.code
                     and 'get_entities()' not in program.code):
                 program.code += f'\n{get_entities_code}\n'
@@ -212,7 +314,7 @@ class Evaluator:
                 current_reward=final_reward,
                 raw_reward=final_reward,
                 final_entities=len(entities),
-                start_entities=len(start_entities),
+                start_entities=start_entity_count,
                 total_programs=instance_metrics.total_programs + 1,
                 start_inventory_count=sum([v for k, v in start_inventory.__dict__.items() if v > 0]),
                 final_inventory_count=sum([v for k, v in final_inventory.__dict__.items() if v > 0])
@@ -228,7 +330,10 @@ class Evaluator:
                     error_count=instance_metrics.error_count + 1
                 )
 
-            return final_reward, state, result, entities, achievements, ticks, flows
+            # Where the evaluation's time went, by tool and phase (e.g the game executing Lua, or parsing its response)
+            program.meta["tool_latency"] = instance.tracer.summary(since=trace_checkpoint)
+
+            return final_reward, state, result, entities, achievements, ticks
 
         except Exception as e:
             print(f"Error in _evaluate_single:")
@@ -253,4 +358,5 @@ class Evaluator:
 
     def __del__(self):
         """Clean up logger on deletion"""
-        self.logger.stop()
\ No newline at end of file
+        if self.logger:
+            self.logger.stop()
\ No newline at end of file
@@ -1,6 +1,5 @@
 import asyncio
 import copy
-import json
 import logging
 import time
 from enum import Enum
@@ -12,7 +11,9 @@ from dotenv import load_dotenv
 from rich.console import Console
 
 from eval.open.db_client import DBClient
+from eval.evaluation_cache import EvaluationCache
 from eval.evaluator import Evaluator
+from eval.open.instance_pool import InstancePool
 from eval.open.mcts.grouped_logger import GroupedFactorioLogger
 from eval.open.mcts.mcts import MCTS
 from eval.open.mcts.instance_group import InstanceGroup
@@ -370,6 +371,8 @@ class ParallelBeamSearch:
         """Create groups for parallel beam search, optionally using resume states"""
         instances_per_group = floor(len(instances) / self.config.beam_width)
         groups = []
+        # Groups often evaluate the same program from the same state, so they share evaluations
+        self.evaluation_cache = EvaluationCache()
 
         for group_id in range(self.config.beam_width):
             # Slice instances for this group
@@ -384,6 +387,8 @@ class ParallelBeamSearch:
                 value_accrual_time=3,
                 logger=self.logger,
                 error_penalty=self.config.beam_kwargs.get("error_penalty", 0),
+                cache=self.evaluation_cache,
+                pool=InstancePool(group_instances),
             )
 
             # Create beam search instance
@@ -437,8 +442,9 @@ class ParallelBeamSearch:
         try:
             if iteration == 0 and not self.resume_version:
                 state = self.config.initial_state
-                group.evaluator.instances[0].reset(state)
-                entities = group.evaluator.instances[0].namespace.get_entities()
+                async with group.evaluator.lease_instance() as instance:
+                    instance.reset(state)
+                    entities = instance.namespace.get_entities()
                 conversation = Conversation(
                     messages=[
                         Message(role="system", content=self.config.system_prompt),
@@ -481,18 +487,16 @@ class ParallelBeamSearch:
             return []
 
     async def _update_beam_groups(self, best_programs):
-        """Update beam groups with proper connection handling"""
-        update_tasks = []
+        """Update beam groups, persisting the selected programs in a single bulk insert"""
         try:
-            with self.db_client.get_connection() as conn:
-                for group, program in zip(self.beam_groups, best_programs):
-                    if program:
-                        update_tasks.append(
-                            self._update_single_group(conn, group, program)
-                        )
+            selected_programs = []
+            for group, program in zip(self.beam_groups, best_programs):
+                if program:
+                    self._update_single_group(group, program)
+                    selected_programs.append(program)
 
-                if update_tasks:
-                    await asyncio.gather(*update_tasks)
+            if selected_programs:
+                await self.db_client.create_programs(selected_programs)
 
             self.current_depth += 1
             self.logger.update_progress()
@@ -500,84 +504,15 @@ class ParallelBeamSearch:
             logger.error(f"Error updating beam groups: {e}")
             raise
 
-    async def _create_program(self, cur, program: Program) -> Optional[int]:
-        """Create a new program entry in the database using the provided cursor.
-
-        Args:
-            cur: Database cursor from the connection
-            program: Program object to store
-        Returns:
-            int: The ID of the created program
-        """
-        query = """
-            INSERT INTO programs (
-                code, value, visits, parent_id, state_json, conversation_json,
-                completion_token_usage, prompt_token_usage, token_usage, response,
-                holdout_value, raw_reward, version, version_description, model, meta,
-                achievements_json, instance, depth, advantage, ticks
-            )
-            VALUES (
-                %s, %s, %s, %s, %s, %s, %s, %s, %s, %s,
-                %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s
-            )
-            RETURNING id, created_at;
-        """
-
-        try:
-            # Prepare values with proper null handling
-            cur.execute(
-                query,
-                (
-                    program.code,
-                    program.value,
-                    0,  # visits starts at 0
-                    program.parent_id,
-                    program.state.to_raw() if program.state else None,
-                    json.dumps(program.conversation.dict()),
-                    getattr(program, "completion_token_usage", None),
-                    getattr(program, "prompt_token_usage", None),
-                    getattr(program, "token_usage", None),
-                    getattr(program, "response", None),
-                    getattr(program, "holdout_value", None),
-                    getattr(program, "raw_reward", None),
-                    self.version,
-                    self.version_description,
-                    getattr(program, "model", None),
-                    json.dumps(getattr(program, "meta", {})),
-                    json.dumps(getattr(program, "achievements", [])),
-                    getattr(program, "instance", None),
-                    program.depth // 2,  # Maintain the depth division from original
-                    getattr(program, "advantage", None),
-                    getattr(program, "ticks", None),
-                ),
-            )
-
-            # Get the inserted program's ID and created_at timestamp
-            id, created_at = cur.fetchone()
-
-            # Update the program object
-            program.id = id
-            program.created_at = created_at
-
-            return id
-
-        except Exception as e:
-            logger.error(f"Error creating program in database: {e}")
-            # Let the error propagate up to be handled by the connection context
-            raise
-
-    async def _update_single_group(self, conn, group, program):
-        """Update a single beam group using provided connection"""
+    def _update_single_group(self, group, program):
+        """Point a beam group at its newly selected program"""
         try:
             group.current_program = program
             group.current_state = program.state
             group.current_conversation = copy.deepcopy(program.conversation)
             program.depth = self.current_depth * 2
-
-            # Use the provided connection
-            with conn.cursor() as cur:
-                # Your program creation SQL here
-                await self._create_program(cur, program)
+            program.version = self.version
+            program.version_description = self.version_description
 
         except Exception as e:
             logger.error(f"Error updating group {group.group_id}: {e}")
@@ -657,6 +592,7 @@ class ParallelBeamSearch:
                 logger.info(
                     f"Iteration {iteration} completed in {iteration_time:.2f} seconds"
                 )
+                logger.info(f"Evaluation cache: {self.evaluation_cache.summary()}")
 
                 if self.current_depth > n_iterations:
                     return
@@ -696,10 +632,12 @@ class ParallelBeamSearch:
     async def cleanup(self):
         """Clean up resources"""
         try:
+            logger.info(f"Evaluation cache: {self.evaluation_cache.summary()}")
             self.logger.stop()
             for group in self.beam_groups:
                 if hasattr(group.evaluator, "logger"):
                     group.evaluator.logger.stop()
+                await group.evaluator.close()
             if hasattr(self.db_client, "cleanup"):
                 await self.db_client.cleanup()
         except Exception as e:
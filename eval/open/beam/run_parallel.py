@@ -13,6 +13,7 @@ from eval.open.beam.beam_search import ParallelBeamSearch, ParallelBeamConfig
 from cluster.local.cluster_ips import get_local_container_ips
 from eval.open.beam.run import OBSERVATION_SPACE, MANUAL, SYSTEM_PROMPT
 from eval.open.db_client import DBClient
+from eval.open.instance_pool import create_instances
 from instance import FactorioInstance
 from agents.utils.formatters.recursive_report_formatter import RecursiveReportFormatter
 from models.game_state import GameState
@@ -30,37 +31,21 @@ def create_factorio_instances(start_index: int, count: int) -> List[FactorioInst
     udp_ports = udp_ports[start_index:start_index + count]
     tcp_ports = tcp_ports[start_index:start_index + count]
 
-    instances = []
-    errors = []
+    def init_instance(ip: str, tcp_port: int) -> FactorioInstance:
+        instance = FactorioInstance(
+            address=ip,
+            tcp_port=tcp_port,
+            bounding_box=200,
+            fast=True,
+            cache_scripts=False,
+            inventory={},
+            all_technologies_researched=False
+        )
+        instance.speed(10)
+        return instance
 
-    # Create instances sequentially to avoid race conditions
-    for ip, udp_port, tcp_port in zip(ips, udp_ports, tcp_ports):
-        try:
-            instance = FactorioInstance(
-                address=ip,
-                tcp_port=tcp_port,
-                bounding_box=200,
-                fast=True,
-                cache_scripts=False,
-                inventory={},
-                all_technologies_researched=False
-            )
-            instance.speed(10)
-            instances.append(instance)
-        except Exception as e:
-            errors.append(f"Failed to create instance at {ip}:{tcp_port} - {str(e)}")
-
-    if errors:
-        # Clean up any successfully created instances
-        # for instance in instances:
-        #     try:
-        #         instance.close()
-        #     except:
-        #         pass
-        raise RuntimeError(f"Failed to create all instances: {'; '.join(errors)}")
-
-    if not instances:
-        raise RuntimeError(f"No instances were created successfully")
+    # Create instances sequentially to avoid race conditions. Containers that fail to start are left out.
+    instances = create_instances(list(zip(ips, tcp_ports)), init_instance, max_workers=1)
 
     return instances
 
@@ -1,17 +1,19 @@
+import asyncio
 import json
 import logging
 import math
 import random
 import statistics
 import threading
-from typing import Optional, Dict, Any, List
-from contextlib import contextmanager
+import time
+from typing import Optional, Dict, Any, List, Tuple
+from contextlib import contextmanager, suppress
 from abc import ABC
 import psycopg2
 import tenacity
-from psycopg2.extras import DictCursor
+from psycopg2.extras import DictCursor, execute_values
 from psycopg2.pool import ThreadedConnectionPool
-from tenacity import wait_exponential, retry_if_exception_type, wait_random_exponential
+from tenacity import wait_exponential, retry_if_exception_type, wait_random_exponential, stop_after_attempt
 from models.program import Program
 from models.conversation import Conversation
 from models.game_state import GameState
@@ -21,16 +23,219 @@ import sqlite3
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+PROGRAM_COLUMNS = (
+    "code, value, visits, parent_id, state_json, conversation_json, "
+    "completion_token_usage, prompt_token_usage, token_usage, response, "
+    "holdout_value, raw_reward, version, version_description, model, meta, "
+    "achievements_json, instance, depth, advantage, ticks"
+)
+
+# Everything needed to score and sample programs, without the large state / conversation / response payloads
+PROGRAM_METADATA_COLUMNS = (
+    "id, value, visits, parent_id, completion_token_usage, prompt_token_usage, token_usage, "
+    "holdout_value, raw_reward, version, version_description, model, meta, "
+    "achievements_json, instance, depth, advantage, ticks, created_at"
+)
+
+# Columns written when states are stored as binary snapshots (see GameState.to_binary)
+BINARY_STATE_PROGRAM_COLUMNS = f"{PROGRAM_COLUMNS}, state_blob"
+
+# Every column read by Program.from_row, in databases with and without the state_blob column (see
+# extension/add_state_blob.sql)
+PROGRAM_SELECT_COLUMNS = f"id, created_at, {BINARY_STATE_PROGRAM_COLUMNS}"
+JSON_PROGRAM_SELECT_COLUMNS = f"id, created_at, {PROGRAM_COLUMNS}"
+
+# Programs that have a stored state, in either column - whichever format this client writes, others may have written
+# the other. Databases without the state_blob column only have states in state_json.
+HAS_STATE = "(state_json IS NOT NULL OR state_blob IS NOT NULL)"
+HAS_JSON_STATE = "state_json IS NOT NULL"
+
+
+def has_state_blob(cur) -> bool:
+    """Whether the Postgres programs table has the state_blob column, using an open cursor"""
+    cur.execute("SELECT EXISTS(SELECT 1 FROM information_schema.columns "
+                "WHERE table_name = 'programs' AND column_name = 'state_blob')")
+    return bool(cur.fetchone()[0])
+
+
+def program_to_row(program: Program, binary_state: bool = False) -> tuple:
+    """Serialize a program into the column order of PROGRAM_COLUMNS (or BINARY_STATE_PROGRAM_COLUMNS)"""
+    row = (
+        program.code,
+        program.value,
+        0,  # visits starts at 0
+        program.parent_id,
+        program.state.to_raw() if program.state and not binary_state else None,
+        json.dumps(program.conversation.dict()),
+        program.completion_token_usage,
+        program.prompt_token_usage,
+        program.token_usage,
+        program.response,
+        program.holdout_value,
+        program.raw_reward,
+        program.version,
+        program.version_description,
+        program.model,
+        json.dumps(program.meta),
+        json.dumps(program.achievements),
+        program.instance,
+        program.depth // 2,
+        program.advantage,
+        program.ticks,
+    )
+    if binary_state:
+        row += (program.state.to_binary() if program.state else None,)
+    return row
+
+
+def fetch_program(cur, program_id: int, columns: str = PROGRAM_SELECT_COLUMNS) -> Optional[Program]:
+    """
+    Fetch and decode the full program with the given id, using an open cursor. Pass the client's
+    `program_select_columns` for databases that may not have the state_blob column.
+    """
+    cur.execute(f"SELECT {columns} FROM programs WHERE id = %s", (int(program_id),))
+    row = cur.fetchone()
+    if not row:
+        return None
+    return Program.from_row(dict(zip([desc[0] for desc in cur.description], row)))
+
+
+class ProgramWriteQueue:
+    """
+    Write-behind queue that batches programs submitted from concurrent tasks into bulk inserts.
+
+    Programs submitted while a batch is being written are coalesced into the next one, so N concurrent
+    `create_program` calls cost a single round trip. Serialization and the (blocking) database call run in
+    the default executor, off the event loop. The queue is bounded, so submitters wait when the database
+    falls behind.
+    """
+
+    def __init__(self,
+                 db_client: "DBClient",
+                 max_batch_size: int = 64,
+                 max_queue_size: int = 256,
+                 linger: float = 0.01):
+        """
+        @param db_client: Client used to write each batch (via `create_programs`)
+        @param max_batch_size: Maximum number of programs written in one round trip
+        @param max_queue_size: Maximum number of pending programs before `submit` blocks
+        @param linger: Seconds to wait for more programs to arrive before writing a partial batch
+        """
+        self.db_client = db_client
+        self.max_batch_size = max_batch_size
+        self.linger = linger
+        self.loop = asyncio.get_running_loop()
+        self._queue: asyncio.Queue = asyncio.Queue(maxsize=max_queue_size)
+        self._worker = self.loop.create_task(self._run())
+
+    async def submit(self, program: Program) -> asyncio.Future:
+        """Queue a program for insertion, returning a future that resolves to the persisted program"""
+        future = self.loop.create_future()
+        await self._queue.put((program, future))
+        return future
+
+    async def _next_batch(self) -> list:
+        batch = [await self._queue.get()]
+        deadline = self.loop.time() + self.linger
+        try:
+            while len(batch) < self.max_batch_size:
+                if not self._queue.empty():
+                    batch.append(self._queue.get_nowait())
+                    continue
+                remaining = deadline - self.loop.time()
+                if remaining <= 0:
+                    break
+                try:
+                    batch.append(await asyncio.wait_for(self._queue.get(), timeout=remaining))
+                except asyncio.TimeoutError:
+                    break
+        except asyncio.CancelledError:
+            # Put back what was taken, so that it can still be written (see take_over)
+            for item in batch:
+                self._queue.put_nowait(item)
+                self._queue.task_done()
+            raise
+        return batch
+
+    async def _write(self, batch: list):
+        try:
+            await self.db_client.create_programs([program for program, _ in batch])
+        except Exception as e:
+            if len(batch) == 1:
+                logger.error(f"Error writing program: {e}")
+                if not batch[0][1].done():
+                    batch[0][1].set_exception(e)
+                return
+            # The batch was rolled back - write its programs one at a time, so only the bad ones fail
+            logger.warning(f"Error writing batch of {len(batch)} programs, retrying them one at a time: {e}")
+            for item in batch:
+                await self._write([item])
+        else:
+            for program, future in batch:
+                if not future.done():
+                    future.set_result(program)
+
+    async def _run(self):
+        while True:
+            batch = await self._next_batch()
+            try:
+                await self._write(batch)
+            finally:
+                for _ in batch:
+                    self._queue.task_done()
+
+    def take_over(self, previous: "ProgramWriteQueue"):
+        """
+        Take over from the queue of an event loop that has stopped (e.g at the end of `asyncio.run`), whose writer
+        can't run anymore. The programs still queued there are written by this queue instead, and its futures are
+        cancelled, as nothing on that loop can await them. A queue whose loop is still running (in another thread) is
+        closed on its own loop instead.
+        """
+        if previous.loop.is_running():
+            asyncio.run_coroutine_threadsafe(previous.close(), previous.loop)
+            return
+        with suppress(RuntimeError):  # The loop is closed
+            previous._worker.cancel()
+        while not previous._queue.empty():
+            program, future = previous._queue.get_nowait()
+            self._queue.put_nowait((program, self.loop.create_future()))
+            with suppress(RuntimeError):
+                future.cancel()
+
+    async def flush(self):
+        """Wait until every submitted program has been written"""
+        await self._queue.join()
+
+    async def close(self):
+        """Flush outstanding programs and stop the background writer"""
+        await self.flush()
+        self._worker.cancel()
+        try:
+            await self._worker
+        except asyncio.CancelledError:
+            pass
+
 
 class DBClient(ABC):
+    # Seconds before a version's program count is refreshed from the database
+    program_count_ttl: float = 60
+
     def __init__(
         self,
         max_conversation_length: int = 20,
         min_connections: int = 5,
         max_connections: int = 20,
+        binary_state: bool = False,
         **db_config,
     ):
+        """
+        @param binary_state: Store program states as compressed binary snapshots in the `state_blob` column, rather
+        than as JSON in `state_json`, which needs the column (BYTEA in Postgres, BLOB in SQLite) - see
+        extension/add_state_blob.sql for older databases. Programs are read from either column, whichever this is,
+        if the database has it.
+        """
         self.max_conversation_length = max_conversation_length
+        self.binary_state = binary_state
         # Don't store connection as instance variable
         # Instead create connection pool
         # self.pool = []
@@ -40,16 +245,48 @@ class DBClient(ABC):
         self.max_connections = max_connections
         self._lock = threading.Lock()
         self.db_config = db_config
+        self._write_queue: Optional[ProgramWriteQueue] = None
+        # Number of programs per version and when the database was last counted, maintained on insert in between
+        self._version_counts: Dict[int, Tuple[int, float]] = {}
+        self._count_lock = threading.Lock()
+        self._has_state_blob: Optional[bool] = None
 
     async def initialize(self):
         """Initialize the connection pool"""
         pass
 
+    @property
+    def program_columns(self) -> str:
+        """Columns written for each inserted program"""
+        return BINARY_STATE_PROGRAM_COLUMNS if self.binary_state else PROGRAM_COLUMNS
+
     @contextmanager
     def get_connection(self):
         """Regular context manager for database connections"""
         pass
 
+    def _has_state_blob_column(self) -> bool:
+        with self.get_connection() as conn:
+            with conn.cursor() as cur:
+                return has_state_blob(cur)
+
+    @property
+    def has_state_blob(self) -> bool:
+        """Whether the database has the state_blob column, which is only checked once"""
+        if self._has_state_blob is None:
+            self._has_state_blob = self._has_state_blob_column()
+        return self._has_state_blob
+
+    @property
+    def program_select_columns(self) -> str:
+        """Every column read by Program.from_row that the database has"""
+        return PROGRAM_SELECT_COLUMNS if self.has_state_blob else JSON_PROGRAM_SELECT_COLUMNS
+
+    @property
+    def has_state(self) -> str:
+        """A condition on programs that have a stored state, in whichever columns the database has"""
+        return HAS_STATE if self.has_state_blob else HAS_JSON_STATE
+
     # @contextmanager
     # def get_connection2(self):
     #     """Context manager to handle database connections"""
@@ -91,27 +328,27 @@ class DBClient(ABC):
         try:
             with self.get_connection() as conn:
                 with conn.cursor(cursor_factory=DictCursor) as cur:
-                    # Use a CTE to get diverse set of programs
+                    # Use a CTE over the slim columns to get a diverse set of program ids
                     cur.execute(
-                        """
+                        f"""
                         WITH ProgramsByDepth AS (
-                            SELECT DISTINCT ON (depth) *
+                            SELECT DISTINCT ON (depth) id, value
                             FROM programs
                             WHERE version = %s
-                            AND state_json IS NOT NULL
+                            AND {self.has_state}
                             AND value IS NOT NULL
                             ORDER BY depth, value DESC
                         )
                         SELECT * FROM (
-                            SELECT * FROM ProgramsByDepth
+                            SELECT id, value FROM ProgramsByDepth
                             ORDER BY value DESC
                             LIMIT %s
                         ) as depth_diverse
                         UNION DISTINCT
                         SELECT * FROM (
-                            SELECT * FROM programs
+                            SELECT id, value FROM programs
                             WHERE version = %s
-                            AND state_json IS NOT NULL
+                            AND {self.has_state}
                             AND value IS NOT NULL
                             ORDER BY value DESC
                             LIMIT %s
@@ -127,7 +364,16 @@ class DBClient(ABC):
                         logger.warning(f"No programs found for version {version}")
                         return []
 
-                    programs = [Program.from_row(dict(row)) for row in results]
+                    # Only fetch and decode the payloads of the selected heads
+                    ids = [row["id"] for row in results]
+                    cur.execute(
+                        f"SELECT {self.program_select_columns} FROM programs WHERE id = ANY(%s)",
+                        (ids,),
+                    )
+                    rows_by_id = {row["id"]: dict(row) for row in cur.fetchall()}
+                    programs = [
+                        Program.from_row(rows_by_id[id]) for id in ids if id in rows_by_id
+                    ]
                     depths = [p.depth for p in programs]
                     logger.info(
                         f"Found {len(programs)} beam heads for version {version} - {depths}"
@@ -137,6 +383,31 @@ class DBClient(ABC):
             logger.error(f"Error fetching beam heads: {e}", exc_info=True)
             return []
 
+    def get_program_count(self, cur, version: int) -> int:
+        """
+        Get the number of programs in a version, using an open cursor.
+        The database is counted at most every `program_count_ttl` seconds, so that programs inserted by other
+        processes are picked up; in between, the count is maintained as programs are inserted through this client.
+        """
+        with self._count_lock:
+            if version in self._version_counts:
+                count, counted_at = self._version_counts[version]
+                if time.time() - counted_at < self.program_count_ttl:
+                    return count
+
+        cur.execute("SELECT COUNT(*) FROM programs WHERE version = %s", (version,))
+        count = cur.fetchone()[0]
+        with self._count_lock:
+            self._version_counts[version] = (count, time.time())
+        return count
+
+    def _count_inserted(self, programs: List[Program]):
+        with self._count_lock:
+            for program in programs:
+                if program.version in self._version_counts:
+                    count, counted_at = self._version_counts[program.version]
+                    self._version_counts[program.version] = (count + 1, counted_at)
+
     async def version_exists(self, version: int) -> bool:
         """Check if a version exists in the database"""
         try:
@@ -175,63 +446,68 @@ class DBClient(ABC):
             print(f"Error fetching version metadata: {e}")
             return {}
 
+    def _get_write_queue(self) -> ProgramWriteQueue:
+        """Get the write queue for the running event loop, creating it if necessary"""
+        if self._write_queue is None or self._write_queue.loop is not asyncio.get_running_loop():
+            previous, self._write_queue = self._write_queue, ProgramWriteQueue(self)
+            if previous is not None:
+                self._write_queue.take_over(previous)
+        return self._write_queue
+
+    async def create_program(self, program: Program) -> Program:
+        """Create a new program. Concurrent calls are batched into a single insert by the write queue."""
+        future = await self._get_write_queue().submit(program)
+        return await future
+
+    async def create_programs(self, programs: List[Program]) -> List[Program]:
+        """Insert programs in a single round trip, off the event loop, setting their ids and creation times"""
+        if not programs:
+            return []
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, self._insert_programs, programs)
+
+    # Only connection problems are retried - a bad row (e.g an IntegrityError) fails the same way every time, and is
+    # raised for the write queue to isolate
     @tenacity.retry(
-        retry=retry_if_exception_type(
-            (psycopg2.OperationalError, psycopg2.InterfaceError, psycopg2.DatabaseError)
-        ),
+        retry=retry_if_exception_type((psycopg2.OperationalError, psycopg2.InterfaceError)),
         wait=wait_random_exponential(multiplier=1, min=4, max=10),
+        stop=stop_after_attempt(3),
+        reraise=True,
     )
-    async def create_program(self, program: Program) -> Program:
-        """Create a new program, now with connection management"""
-        try:
-            with self.get_connection() as conn:
+    def _insert_programs(self, programs: List[Program]) -> List[Program]:
+        rows = [program_to_row(program, self.binary_state) for program in programs]
+        with self.get_connection() as conn:
+            try:
                 with conn.cursor() as cur:
-                    cur.execute(
-                        """
-                        INSERT INTO programs (code, value, visits, parent_id, state_json, conversation_json, 
-                                           completion_token_usage, prompt_token_usage, token_usage, response, 
-                                           holdout_value, raw_reward, version, version_description, model, meta, 
-                                           achievements_json, instance, depth, advantage, ticks)
-                        VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s, %s)
-                        RETURNING id, created_at
-                    """,
-                        (
-                            program.code,
-                            program.value,
-                            0,
-                            program.parent_id,
-                            program.state.to_raw() if program.state else None,
-                            json.dumps(program.conversation.dict()),
-                            program.completion_token_usage,
-                            program.prompt_token_usage,
-                            program.token_usage,
-                            program.response,
-                            program.holdout_value,
-                            program.raw_reward,
-                            program.version,
-                            program.version_description,
-                            program.model,
-                            json.dumps(program.meta),
-                            json.dumps(program.achievements),
-                            program.instance,
-                            program.depth // 2,
-                            program.advantage,
-                            program.ticks,
-                        ),
+                    results = execute_values(
+                        cur,
+                        f"INSERT INTO programs ({self.program_columns}) VALUES %s RETURNING id, created_at",
+                        rows,
+                        page_size=len(rows),
+                        fetch=True,
                     )
+                conn.commit()
+            except Exception as e:
+                conn.rollback()
+                print(f"Error creating programs: {e}")
+                raise e
 
-                    id, created_at = cur.fetchone()
-                    conn.commit()
-                    program.id = id
-                    program.created_at = created_at
-                    return program
-        except Exception as e:
-            conn.rollback()
-            print(f"Error creating program: {e}")
-            raise e
+        for program, (id, created_at) in zip(programs, results):
+            program.id = id
+            program.created_at = created_at
+        self._count_inserted(programs)
+        return programs
 
     async def cleanup(self):
         """Clean up database resources"""
+        if self._write_queue is not None:
+            try:
+                await self._write_queue.close()
+            except Exception as e:
+                logger.error(f"Error flushing program write queue: {e}")
+            finally:
+                self._write_queue = None
+
         if self._pool is not None:
             with self._lock:
                 if self._pool is not None:
@@ -329,17 +605,12 @@ class DBClient(ABC):
             adaptive_period: Number of steps for a full sine wave cycle when using
                             adaptive compression.
         """
-        max_assistant_length = (self.max_conversation_length * 2) + 1
-
         try:
             with self.get_connection() as conn:
                 with conn.cursor(cursor_factory=DictCursor) as cur:
                     # First get the current step count for adaptive compression
                     if compression_strength is None:
-                        cur.execute(
-                            f"SELECT COUNT(*) as step_count FROM programs WHERE version = {version}"
-                        )
-                        step_count = cur.fetchone()["step_count"]
+                        step_count = self.get_program_count(cur, version)
                         # Calculate adaptive compression using sine wave
                         # sin goes from -1 to 1, so we transform to 0 to 1
                         compression_strength = (
@@ -349,19 +620,18 @@ class DBClient(ABC):
                     cur.execute(
                         """
                         WITH recent AS (
-                            SELECT id, value, conversation_json
+                            SELECT id, advantage
                             FROM programs
                             WHERE version = %s 
                             AND advantage IS NOT NULL
-                            -- AND jsonb_array_length(conversation_json->'messages') < %s
                             ORDER BY created_at DESC
                             LIMIT 300
                         )
                         SELECT id, advantage 
                         FROM recent
                         """,
-                        (version),
-                    )  # , max_assistant_length))
+                        (version,),
+                    )
 
                     results = cur.fetchall()
                     if not results:
@@ -411,16 +681,8 @@ class DBClient(ABC):
                             k=1,
                         )[0]
 
-                    # Fetch the selected program
-                    cur.execute(
-                        """
-                        SELECT * FROM programs WHERE id = %s
-                        """,
-                        (sampled_id,),
-                    )
-
-                    row = cur.fetchone()
-                    return Program.from_row(dict(row)) if row else None
+                    # Fetch the payload of the selected program only
+                    return fetch_program(cur, sampled_id, self.program_select_columns)
         except Exception as e:
             print(f"Error sampling parent: {e}")
             raise e
@@ -460,10 +722,10 @@ class DBClient(ABC):
         """Get the state to resume from"""
         try:
             # Get most recent successful program to resume from
-            query = """
+            query = f"""
             SELECT * FROM programs 
             WHERE version = %s
-            AND state_json IS NOT NULL
+            AND {self.has_state}
             AND value IS NOT NULL
             -- AND meta->>'process_id' = %s::text
             ORDER BY created_at DESC
@@ -496,10 +758,11 @@ class PostgresDBClient(DBClient):
         max_conversation_length: int = 20,
         min_connections: int = 5,
         max_connections: int = 20,
+        binary_state: bool = False,
         **db_config,
     ):
         super().__init__(
-            max_conversation_length, min_connections, max_connections, **db_config
+            max_conversation_length, min_connections, max_connections, binary_state, **db_config
         )
 
     async def initialize(self):
@@ -546,10 +809,11 @@ class SQLliteDBClient(DBClient):
         max_conversation_length: int = 20,
         min_connections: int = 5,
         max_connections: int = 20,
+        binary_state: bool = False,
         **db_config,
     ):
         super().__init__(
-            max_conversation_length, min_connections, max_connections, **db_config
+            max_conversation_length, min_connections, max_connections, binary_state, **db_config
         )
         self.database_file = self.db_config.get("database_file")
 
@@ -573,6 +837,10 @@ class SQLliteDBClient(DBClient):
             if conn:
                 conn.close()
 
+    def _has_state_blob_column(self) -> bool:
+        with self.get_connection() as conn:
+            return any(column[1] == "state_blob" for column in conn.execute("PRAGMA table_info(programs)"))
+
     @tenacity.retry(
         retry=retry_if_exception_type(
             (psycopg2.OperationalError, psycopg2.InterfaceError)
@@ -602,10 +870,10 @@ class SQLliteDBClient(DBClient):
         """Get the state to resume from"""
         try:
             # Get most recent successful program to resume from
-            query = """
+            query = f"""
             SELECT * FROM programs 
             WHERE version = ?
-            AND state_json IS NOT NULL
+            AND {self.has_state}
             AND value IS NOT NULL
             AND json_extract(meta, '$.process_id') = ?
             ORDER BY created_at DESC
@@ -631,9 +899,10 @@ class SQLliteDBClient(DBClient):
             resulting_program_dict["conversation_json"] = json.loads(
                 resulting_program_dict["conversation_json"]
             )
-            resulting_program_dict["state_json"] = json.loads(
-                resulting_program_dict["state_json"]
-            )
+            if resulting_program_dict["state_json"]:
+                resulting_program_dict["state_json"] = json.loads(
+                    resulting_program_dict["state_json"]
+                )
             # Choose a program to resume from
             program = Program.from_row(resulting_program_dict)
             return program.state, program.conversation, program.id, program.depth
@@ -642,64 +911,32 @@ class SQLliteDBClient(DBClient):
             print(f"Error getting resume state: {e}")
             return None, None, None, None
 
-    @tenacity.retry(
-        retry=retry_if_exception_type(
-            (psycopg2.OperationalError, psycopg2.InterfaceError, psycopg2.DatabaseError)
-        ),
-        wait=wait_random_exponential(multiplier=1, min=4, max=10),
-    )
-    async def create_program(self, program: Program) -> Program:
-        """Create a new program, now with connection management"""
-        try:
-            with self.get_connection() as conn:
+    def _insert_programs(self, programs: List[Program]) -> List[Program]:
+        rows = [program_to_row(program, self.binary_state) for program in programs]
+        with self.get_connection() as conn:
+            try:
                 cur = conn.cursor()
+                for program, row in zip(programs, rows):
+                    cur.execute(
+                        f"INSERT INTO programs ({self.program_columns}) "
+                        f"VALUES ({', '.join('?' * len(row))})",
+                        row,
+                    )
+                    # Get the last inserted row ID
+                    program.id = cur.lastrowid
 
-                # Insert the program data
-                cur.execute(
-                    """
-                    INSERT INTO programs (code, value, visits, parent_id, state_json, conversation_json, 
-                                          completion_token_usage, prompt_token_usage, token_usage, response, 
-                                          holdout_value, raw_reward, version, version_description, model, meta, 
-                                          achievements_json, instance, depth, advantage, ticks)
-                    VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-                """,
-                    (
-                        program.code,
-                        program.value,
-                        0,  # Assuming visits is initially set to 0
-                        program.parent_id,
-                        program.state.to_raw() if program.state else None,
-                        json.dumps(program.conversation.dict()),
-                        program.completion_token_usage,
-                        program.prompt_token_usage,
-                        program.token_usage,
-                        program.response,
-                        program.holdout_value,
-                        program.raw_reward,
-                        program.version,
-                        program.version_description,
-                        program.model,
-                        json.dumps(program.meta),
-                        json.dumps(program.achievements),
-                        program.instance,
-                        program.depth // 2,
-                        program.advantage,
-                        program.ticks,
-                    ),
-                )
-
-                # Get the last inserted row ID
-                program.id = cur.lastrowid
-
-                # Retrieve the created_at timestamp
+                # Retrieve the created_at timestamps
+                ids = [program.id for program in programs]
                 cur.execute(
-                    "SELECT created_at FROM programs WHERE id = ?", (program.id,)
+                    f"SELECT id, created_at FROM programs WHERE id IN ({', '.join('?' * len(ids))})", ids
                 )
-                program.created_at = cur.fetchone()[0]
+                created_at = dict(cur.fetchall())
+                for program in programs:
+                    program.created_at = created_at.get(program.id)
                 conn.commit()
-                # Return the updated program object
-                return program
-        except Exception as e:
-            conn.rollback()
-            print(f"Error creating program: {e}")
-            raise e
+                self._count_inserted(programs)
+                return programs
+            except Exception as e:
+                conn.rollback()
+                print(f"Error creating programs: {e}")
+                raise e
@@ -8,7 +8,7 @@ from models.achievements import ProductionFlows
 from models.game_state import GameState
 from models.program import Program
 from entities import Entity, EntityGroup
-from instance import FactorioInstance
+from instance import FactorioInstance, TICKS_PER_SECOND
 from utils.profits import get_achievements
 
 
@@ -105,8 +105,8 @@ class SimpleFactorioEvaluator:
                 result += f'final: (\'Current inventory: {final_inventory}\',)\n'
                 result += f'final: (\'Entities on the map after the current step: {entities}\',)'
 
-            # Sleep for 3 seconds to get output flows
-            await asyncio.sleep(self.value_accrual_time)
+            # Run the game on to get output flows
+            await asyncio.to_thread(instance.fast_forward, self.value_accrual_time * TICKS_PER_SECOND)
             state = GameState.from_instance(instance)
 
             score, _ = instance.namespace.score()
@@ -0,0 +1,309 @@
+import asyncio
+import concurrent.futures
+import logging
+import time
+from contextlib import asynccontextmanager, contextmanager
+from dataclasses import dataclass, field
+from typing import Callable, Dict, List, Optional, Tuple
+
+from instance import FactorioInstance
+from rcon.factorio_rcon import RCONClient
+
+logger = logging.getLogger(__name__)
+
+HEARTBEAT_COMMAND = '/c rcon.print(collectgarbage("count"))'
+RCON_PASSWORD = "factorio"  # As FactorioInstance connects with
+
+
+@dataclass
+class PoolMetrics:
+    """Lease and health counters for an InstancePool"""
+    leases: int = 0
+    lease_wait_time: float = 0.0  # Total seconds spent waiting for an instance
+    heartbeats: int = 0
+    failed_heartbeats: int = 0
+    quarantines: int = 0
+    reconnections: int = 0
+    reinitialisations: int = 0
+    replacements: int = 0
+
+    @property
+    def mean_lease_wait(self) -> float:
+        return self.lease_wait_time / self.leases if self.leases else 0.0
+
+
+@dataclass
+class PooledInstance:
+    instance: FactorioInstance
+    leased: bool = False
+    quarantined: bool = False
+    failures: int = 0
+    last_heartbeat: float = field(default_factory=time.time)
+
+
+class InstancePool:
+    """
+    Leases Factorio instances to evaluators, so that a dead or hung container only takes itself out of rotation.
+
+    Idle instances are probed with a cheap RCON heartbeat. Instances that fail it (or that an evaluator reports as
+    unhealthy) are quarantined: the pool reconnects their RCON socket, then reinitialises their Lua state, then
+    (if a `factory` is given) replaces them, in the background. Meanwhile leases are served by the healthy ones.
+    """
+
+    def __init__(self,
+                 instances: List[FactorioInstance],
+                 factory: Optional[Callable[[str, int], FactorioInstance]] = None,
+                 heartbeat_interval: float = 30,
+                 heartbeat_timeout: float = 10,
+                 max_lua_memory_kb: Optional[float] = None,
+                 recovery_interval: float = 30,
+                 recovery_timeout: float = 60):
+        """
+        :param instances: The instances to lease out
+        :param factory: Builds a replacement for an instance that can't be recovered, from its address and port
+        :param heartbeat_interval: Seconds between heartbeats of each idle instance
+        :param heartbeat_timeout: Seconds to wait for a heartbeat before the instance is deemed hung
+        :param max_lua_memory_kb: Reinitialise instances whose Lua state grows beyond this
+        :param recovery_interval: Seconds between attempts to recover a quarantined instance
+        :param recovery_timeout: Seconds that each RCON call of a recovery step can block for
+        """
+        self.members: Dict[int, PooledInstance] = {id(instance): PooledInstance(instance) for instance in instances}
+        self.factory = factory
+        self.heartbeat_interval = heartbeat_interval
+        self.heartbeat_timeout = heartbeat_timeout
+        self.max_lua_memory_kb = max_lua_memory_kb
+        self.recovery_interval = recovery_interval
+        self.recovery_timeout = recovery_timeout
+        self.metrics = PoolMetrics()
+
+        # Heartbeats and recovery block on sockets, so they run on threads rather than the event loop - on separate
+        # executors, so that instances being recovered can't hold up the heartbeats of healthy ones
+        self._executor = concurrent.futures.ThreadPoolExecutor(max_workers=max(len(instances), 1),
+                                                               thread_name_prefix="instance-pool")
+        self._recovery_executor = concurrent.futures.ThreadPoolExecutor(max_workers=max(len(instances), 1),
+                                                                        thread_name_prefix="instance-pool-recovery")
+        self._available: Optional[asyncio.Queue] = None
+        self._tasks: List[asyncio.Task] = []
+
+    @property
+    def instances(self) -> List[FactorioInstance]:
+        return [member.instance for member in self.members.values()]
+
+    @property
+    def healthy_count(self) -> int:
+        return sum(not member.quarantined for member in self.members.values())
+
+    def stats(self) -> Dict[str, float]:
+        return {
+            "size": len(self.members),
+            "healthy": self.healthy_count,
+            "leased": sum(member.leased for member in self.members.values()),
+            "quarantined": sum(member.quarantined for member in self.members.values()),
+            **self.metrics.__dict__,
+            "mean_lease_wait": self.metrics.mean_lease_wait,
+        }
+
+    def _start(self):
+        # Started lazily, as the queue and tasks need the running event loop
+        if self._available is not None:
+            return
+        self._available = asyncio.Queue()
+        for member in self.members.values():
+            self._available.put_nowait(member)
+        self._tasks.append(asyncio.create_task(self._heartbeat_loop()))
+
+    async def acquire(self) -> FactorioInstance:
+        """Lease a healthy instance, waiting for one to become free"""
+        self._start()
+        start = time.time()
+        while True:
+            member = await self._available.get()
+            # Members can be quarantined (or replaced) while waiting in the queue
+            if member.quarantined or self.members.get(id(member.instance)) is not member:
+                continue
+            member.leased = True
+            self.metrics.leases += 1
+            self.metrics.lease_wait_time += time.time() - start
+            return member.instance
+
+    def release(self, instance: FactorioInstance, healthy: bool = True):
+        """Return a leased instance, quarantining it if the lessee found it unhealthy"""
+        member = self.members.get(id(instance))
+        if member is None:
+            return
+        member.leased = False
+        if healthy:
+            self._available.put_nowait(member)
+        else:
+            self._quarantine(member)
+
+    @asynccontextmanager
+    async def lease(self):
+        """Lease an instance for the duration of the block. If the block raises, the instance is health checked."""
+        instance = await self.acquire()
+        healthy = True
+        try:
+            yield instance
+        except Exception:
+            healthy = await self.check(instance)
+            raise
+        finally:
+            self.release(instance, healthy)
+
+    def _probe_client(self, instance: FactorioInstance) -> RCONClient:
+        # A client of the heartbeat's own, with a socket timeout: the instance's client has none (evaluations can
+        # take long), so a hung server would hold the heartbeat's thread forever
+        return RCONClient(instance.address, instance.tcp_port, RCON_PASSWORD, timeout=self.heartbeat_timeout)
+
+    def _heartbeat(self, instance: FactorioInstance) -> bool:
+        client = self._probe_client(instance)
+        try:
+            memory_kb = float(client.send_command(HEARTBEAT_COMMAND, max_retries=1))
+        finally:
+            client.close()
+        if self.max_lua_memory_kb is not None and memory_kb > self.max_lua_memory_kb:
+            logger.warning(f"Instance {instance.tcp_port} is using {memory_kb:.0f}KB of Lua memory")
+            return False
+        return True
+
+    async def check(self, instance: FactorioInstance) -> bool:
+        """Whether an instance answers a heartbeat in time"""
+        self.metrics.heartbeats += 1
+        loop = asyncio.get_running_loop()
+        try:
+            healthy = await asyncio.wait_for(loop.run_in_executor(self._executor, self._heartbeat, instance),
+                                             timeout=self.heartbeat_timeout)
+        except Exception:
+            healthy = False
+        if not healthy:
+            self.metrics.failed_heartbeats += 1
+        return healthy
+
+    async def _heartbeat_loop(self):
+        while True:
+            await asyncio.sleep(self.heartbeat_interval)
+            # Take idle members out of the queue while they are probed, so they aren't leased mid-heartbeat
+            idle = []
+            while not self._available.empty():
+                idle.append(self._available.get_nowait())
+            results = await asyncio.gather(*[self.check(member.instance) for member in idle])
+            for member, healthy in zip(idle, results):
+                member.last_heartbeat = time.time()
+                if healthy:
+                    self._available.put_nowait(member)
+                elif not member.quarantined:
+                    self._quarantine(member)
+
+    def _quarantine(self, member: PooledInstance):
+        logger.warning(f"Quarantining instance {member.instance.address}:{member.instance.tcp_port}")
+        member.quarantined = True
+        member.failures += 1
+        self.metrics.quarantines += 1
+        self._tasks.append(asyncio.create_task(self._recover(member)))
+
+    @contextmanager
+    def _bounded(self, instance: FactorioInstance):
+        """Time out the instance's RCON calls for the duration of a recovery step, rather than block on a hung server"""
+        client = instance.rcon_client
+        previous = client.timeout
+        client.timeout = self.recovery_timeout
+        if client.rcon_socket is not None:
+            client.rcon_socket.settimeout(self.recovery_timeout)
+        try:
+            yield
+        finally:
+            client.timeout = previous
+            if client.rcon_socket is not None:
+                client.rcon_socket.settimeout(previous)
+
+    def _reconnect(self, instance: FactorioInstance):
+        with self._bounded(instance):
+            instance.rcon_client.connect()
+        self.metrics.reconnections += 1
+
+    def _reinitialise(self, instance: FactorioInstance):
+        inventory = instance.initial_inventory
+        with self._bounded(instance):
+            instance.initialise(instance.fast, **(inventory if isinstance(inventory, dict) else inventory.__dict__))
+        self.metrics.reinitialisations += 1
+
+    def _build_replacement(self, member: PooledInstance) -> FactorioInstance:
+        old = member.instance
+        replacement = self.factory(old.address, old.tcp_port)
+        try:
+            old.cleanup()
+        except Exception:
+            pass
+        return replacement
+
+    def _swap(self, member: PooledInstance, instance: FactorioInstance) -> PooledInstance:
+        replacement = PooledInstance(instance, quarantined=True, failures=member.failures)
+        # In the same place, so that `instances` keeps its order
+        self.members = {
+            (id(instance) if value is member else key): (replacement if value is member else value)
+            for key, value in self.members.items()
+        }
+        self.metrics.replacements += 1
+        return replacement
+
+    async def _recover(self, member: PooledInstance):
+        """Escalate from reconnecting, to reinitialising, to replacing the instance, until it is healthy again"""
+        loop = asyncio.get_running_loop()
+        steps: List[Tuple[str, Callable]] = [
+            ("reconnect", lambda: self._reconnect(member.instance)),
+            ("reinitialise", lambda: self._reinitialise(member.instance)),
+        ]
+        if self.factory:
+            steps.append(("replace", lambda: self._build_replacement(member)))
+
+        while True:
+            for name, step in steps:
+                try:
+                    result = await loop.run_in_executor(self._recovery_executor, step)
+                except Exception as e:
+                    logger.warning(f"Could not {name} instance {member.instance.tcp_port}: {e}")
+                    continue
+                if isinstance(result, FactorioInstance):
+                    member = self._swap(member, result)
+                if await self.check(member.instance):
+                    logger.info(f"Recovered instance {member.instance.tcp_port} ({name})")
+                    member.quarantined = False
+                    self._available.put_nowait(member)
+                    return
+            await asyncio.sleep(self.recovery_interval)
+
+    async def close(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+        self._executor.shutdown(wait=False)
+        self._recovery_executor.shutdown(wait=False)
+
+
+def create_instances(endpoints: List[Tuple[str, int]],
+                     factory: Callable[[str, int], FactorioInstance],
+                     max_workers: Optional[int] = None) -> List[FactorioInstance]:
+    """
+    Connect to each (address, tcp port), `max_workers` at a time. Instances that fail to start are left out (with a
+    warning) rather than failing the whole run - it is only an error if none of them start.
+    """
+    instances, errors = [], []
+    with concurrent.futures.ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {executor.submit(factory, address, tcp_port): (address, tcp_port)
+                   for address, tcp_port in endpoints}
+        for future in concurrent.futures.as_completed(futures):
+            address, tcp_port = futures[future]
+            try:
+                instances.append(future.result())
+            except Exception as e:
+                errors.append(f"{address}:{tcp_port} - {e}")
+
+    for error in errors:
+        logger.warning(f"Failed to create instance at {error}")
+    if not instances:
+        raise RuntimeError(f"No instances were created successfully: {'; '.join(errors)}")
+
+    # Keep the order of the endpoints, which groups are sliced by
+    order = {endpoint: i for i, endpoint in enumerate(endpoints)}
+    return sorted(instances, key=lambda instance: order.get((instance.address, instance.tcp_port), len(order)))
@@ -15,6 +15,8 @@ from models.program import Program
 
 
 class ChunkedMCTS(MCTS):
+    # Programs are evaluated chunk by chunk on instances picked by index
+    supports_instance_pool = False
 
     def __init__(self, *args, logit_bias: Optional[float] = None, **kwargs):
         super().__init__(*args, **kwargs)
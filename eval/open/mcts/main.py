@@ -3,25 +3,23 @@ import asyncio
 from dotenv import load_dotenv
 from cluster.local.cluster_ips import get_local_container_ips
 from eval.open.db_client import DBClient
+from eval.open.instance_pool import create_instances
 from eval.open.mcts.mcts_factory import MCTSFactory
 from eval.open.plots.run_results import RunResults
 from instance import FactorioInstance
-import concurrent.futures
-from typing import List, Tuple
+from typing import List
 
 os.environ.update({"FORCE_COLOR": "1", "TERM": "xterm-256color"})
 load_dotenv()
 
 
 def create_factorio_instances() -> List[FactorioInstance]:
-    def init_instance(params: Tuple[str, int, int]) -> FactorioInstance:
-        ip, udp_port, tcp_port = params
+    def init_instance(ip: str, tcp_port: int) -> FactorioInstance:
         return FactorioInstance(address=ip, tcp_port=tcp_port, bounding_box=200,
                                 fast=True, cache_scripts=False, inventory={})
 
     ips, udp_ports, tcp_ports = get_local_container_ips()
-    with concurrent.futures.ThreadPoolExecutor() as executor:
-        return list(executor.map(init_instance, zip(ips, udp_ports, tcp_ports)))
+    return create_instances(list(zip(ips, tcp_ports)), init_instance)
 
 SYSTEM_PROMPT = \
 """
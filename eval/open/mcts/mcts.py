@@ -22,6 +22,10 @@ from eval.open.mcts.samplers.db_sampler import DBSampler
 
 
 class MCTS:
+    # Whether every use of the evaluator's instances goes through the evaluator (evaluate_batch or lease_instance),
+    # so that they can be leased from a pool
+    supports_instance_pool = True
+
     def __init__(self,
                  llm_factory: 'LLMFactory',
                  db_client: DBClient,
@@ -326,8 +330,9 @@ class MCTS:
                 conversation = parent.conversation
             else:
                 start_state = self.initial_state
-                self.evaluator.instances[0].reset(start_state)
-                entities = self.evaluator.instances[0].get_entities()
+                async with self.evaluator.lease_instance() as instance:
+                    instance.reset(start_state)
+                    entities = instance.get_entities()
                 conversation = Conversation(messages=[
                     Message(role="system", content=self.system_prompt),
                     # Message(role="user", content=PLANNING_ADDITION_PROMPT),
@@ -6,7 +6,9 @@ from typing import List, Dict, Any
 from rich.console import Console
 
 from eval.open.db_client import DBClient
+from eval.evaluation_cache import EvaluationCache
 from eval.evaluator import Evaluator
+from eval.open.instance_pool import InstancePool
 from eval.open.mcts.grouped_logger import GroupedFactorioLogger
 from eval.open.mcts.instance_group import InstanceGroup
 from eval.open.mcts.parallel_mcts_config import ParallelMCTSConfig
@@ -79,6 +81,7 @@ class ParallelMCTS:
         """Create instance groups for parallel execution"""
         instances_per_group = floor(len(instances) / self.config.n_parallel)
         groups = []
+        self.evaluation_cache = EvaluationCache()
 
         for group_id in range(self.config.n_parallel):
             # Slice instances for this group
@@ -96,7 +99,10 @@ class ParallelMCTS:
                 instances=group_instances,
                 value_accrual_time=3,
                 logger=self.logger,
-                error_penalty=self.config.mcts_kwargs['error_penalty']
+                error_penalty=self.config.mcts_kwargs['error_penalty'],
+                cache=self.evaluation_cache,
+                # Only searches that use the instances through the evaluator can have them leased and health checked
+                pool=InstancePool(group_instances) if self.config.mcts_class.supports_instance_pool else None,
             )
 
             # Create MCTS instance
@@ -140,6 +146,8 @@ class ParallelMCTS:
             raise
         finally:
             self.cleanup()
+            for group in self.instance_groups:
+                await group.evaluator.close()
 
     async def _run_group_search(self,
                                 group: InstanceGroup,
@@ -164,6 +172,7 @@ class ParallelMCTS:
 
     def cleanup(self):
         """Clean up resources"""
+        logger.info(f"Evaluation cache: {self.evaluation_cache.summary()}")
         self.logger.stop()
         for group in self.instance_groups:
             if hasattr(group.evaluator, 'logger'):
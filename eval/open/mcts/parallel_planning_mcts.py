@@ -13,11 +13,13 @@ from models.message import Message
 from models.generation_parameters import GenerationParameters
 from agents.utils.formatters.conversation_formatter_abc import ConversationFormatter, StructurePreservingFormatter
 from eval.open.db_client import DBClient
+from eval.evaluation_cache import EvaluationCache
 from eval.evaluator import Evaluator
 from eval.open.mcts.grouped_logger import GroupedFactorioLogger
 from eval.open.mcts.parallel_mcts_config import ParallelMCTSConfig
 from eval.open.mcts.planning_mcts import get_mining_setup
 from eval.open.mcts.planning_models import PlanOutput, TaskOutput, Step, LanguageOutput, InitialPlanOutput
+from eval.open.mcts.start_state_cache import StartStateCache, StartStateObservation, reset_instances
 from models.game_state import GameState
 from models.program import Program
 from instance import FactorioInstance
@@ -94,6 +96,9 @@ class ParallelPlanningMCTS:
         self.step_judge_system_prompt, self.step_judge_user_prompt = self.read_in_prompts(config.mcts_kwargs['step_judge_prompt_path'])
         self.example_plan_system_prompt, self.example_plan_user_prompt = self.read_in_prompts(config.mcts_kwargs['example_plan_prompt_path'])
 
+        # Start states are observed, and their holdout values measured, once for every group
+        self.start_state_cache = StartStateCache()
+
         # Create instance groups
         self.instance_groups = self._create_instance_groups(instances)
         self.api_description = self.instance_groups[0].evaluator.instances[0].get_system_prompt()
@@ -115,6 +120,7 @@ class ParallelPlanningMCTS:
         """Create instance groups for parallel execution"""
         instances_per_group = floor(len(instances) / self.config.n_parallel)
         groups = []
+        self.evaluation_cache = EvaluationCache()
 
         for group_id in range(self.config.n_parallel):
             # Slice instances for this group
@@ -132,7 +138,8 @@ class ParallelPlanningMCTS:
                 instances=group_instances,
                 value_accrual_time=3,
                 logger=self.logger,
-                error_penalty=self.config.mcts_kwargs['error_penalty']
+                error_penalty=self.config.mcts_kwargs['error_penalty'],
+                cache=self.evaluation_cache,
             )
 
             # Create MCTS instance
@@ -203,19 +210,28 @@ class ParallelPlanningMCTS:
             for iteration in range(n_iterations):
 
                 parent = await self.sampler.sample_parent(version=self.version)
+                start_state = parent.state if parent else self.config.initial_state
+
+                group.evaluator.set_status(f"Observing start state")
+                first_instance = group.active_instances[0]
+                observation, first_reset = await self.start_state_cache.observe(parent.id if parent else None,
+                                                                                first_instance, start_state)
+
+                # The instances are reset while the tasks and plans are generated
+                to_reset = [instance for instance in group.active_instances
+                            if not (first_reset and instance is first_instance)]
+                resets = asyncio.create_task(reset_instances(to_reset, start_state))
+                try:
+                    group.evaluator.set_status(f"Generating tasks")
+                    tasks = await self._get_tasks(group, observation)
 
-                group.evaluator.set_status(f"Generating tasks")
-                tasks, start_state = await self._get_tasks(group, parent)
+                    group.evaluator.set_status(f"Generating plans")
+                    group.plans = await self.generate_plans(tasks)
+                finally:
+                    await resets
 
-                group.evaluator.set_status(f"Generating plans")
-                group.plans = await self.generate_plans(tasks)
                 saved_step_ids = []
                 for step_idx in range(self.max_steps_per_objective):
-                    if step_idx == 0:
-                        # reset the instances
-                        for instance_id, instance in enumerate(group.evaluator.instances):
-                            instance.reset(start_state)
-
                     plans = await self._process_group_step(group, step_idx, skip_failures, start_state, parent)
 
                     for plan in plans:
@@ -283,6 +299,7 @@ class ParallelPlanningMCTS:
 
     def cleanup(self):
         """Clean up resources"""
+        print(f"Evaluation cache: {self.evaluation_cache.summary()}")
         self.logger.stop()
         for group in self.instance_groups:
             if hasattr(group.evaluator, 'logger'):
@@ -313,8 +330,9 @@ class ParallelPlanningMCTS:
                              instance_id: int,
                              parent_id) -> Tuple[Step, float, List]:
         """Modified to work with instance groups"""
-        group.holdout_instance.reset(start_state)
-        #holdout_future = asyncio.create_task(group.evaluator._run_holdout())
+        # Every candidate starts from the parent's state, so they share one holdout measurement
+        holdout_future = asyncio.ensure_future(self.start_state_cache.holdout_value(
+            parent_id, group.holdout_instance, start_state, group.evaluator.value_accrual_time))
         entity_list = []
 
         try:
@@ -333,12 +351,13 @@ class ParallelPlanningMCTS:
 
         except Exception as e:
             print(f"Error during evaluation in group {group.group_id}, instance {instance_id}: {e}")
+            holdout_future.cancel()
             raise e
 
-        #holdout_value = await holdout_future
+        holdout_value = await holdout_future
         step.program.value = step.reward
         step.program.raw_reward = step.reward
-        step.program.holdout_value = step.reward
+        step.program.holdout_value = holdout_value
         step.program.state = step.end_state
         step.program.response = response
         step.program.parent_id = parent_id
@@ -535,17 +554,10 @@ class ParallelPlanningMCTS:
 
     async def _get_tasks(self,
                          group: PlanningGroup,
-                         parent: Program = None) -> Tuple[List[TaskOutput], GameState]:
+                         observation: StartStateObservation) -> List[TaskOutput]:
         """Modified to work with instance groups"""
-        start_state = parent.state if parent else self.config.initial_state
-
-        # Reset the first instance in this group
-        first_instance = group.active_instances[0]
-        first_instance.reset(start_state)
-
-        # Get mining setup for this instance
-        mining_setup = get_mining_setup(first_instance)
-        starting_inventory = first_instance.inspect_inventory()
+        mining_setup = observation.mining_setup
+        starting_inventory = observation.inventory
 
         conversation = Conversation(messages=[
             Message(role="system", content=self.config.system_prompt),
@@ -560,7 +572,7 @@ class ParallelPlanningMCTS:
         )
 
         inventory_dict = self.get_inventory_dict(starting_inventory)
-        game_state_str = GameState.from_instance(first_instance).entities
+        game_state_str = observation.entities
 
         tasks = await self._generate_natural_language_batch(
             conversation,
@@ -582,7 +594,7 @@ class ParallelPlanningMCTS:
                 task_string = task_string.split(".")[0]
             task_outputs.append(TaskOutput(task=task_string, language_output=task))
 
-        return task_outputs, start_state
+        return task_outputs
 
     async def generate_plans(self, task_outputs: List[TaskOutput]) -> List[InitialPlanOutput]:
         generation_params = GenerationParameters(
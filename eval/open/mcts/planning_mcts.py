@@ -22,6 +22,8 @@ def get_mining_setup(instance):
         return mining_setup
 
 class PlanningMCTS(MCTS):
+    # Plans are stepped on instances picked by index
+    supports_instance_pool = False
 
     def __init__(self, *args,
                  planning_model,
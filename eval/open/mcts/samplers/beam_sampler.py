@@ -6,7 +6,7 @@ import tenacity
 from psycopg2.extras import DictCursor
 from tenacity import retry_if_exception_type, wait_exponential
 
-from eval.open.db_client import DBClient
+from eval.open.db_client import DBClient, fetch_program
 from eval.open.mcts.samplers.db_sampler import DBSampler
 from models.program import Program
 
@@ -106,12 +106,7 @@ class BeamSampler(DBSampler):
                         return None
 
                     # Fetch the complete program
-                    cur.execute("""
-                        SELECT * FROM programs WHERE id = %s
-                    """, (result['id'],))
-
-                    row = cur.fetchone()
-                    return Program.from_row(dict(row)) if row else None
+                    return fetch_program(cur, result['id'], self.db_client.program_select_columns)
 
         except Exception as e:
             print(f"Error sampling parent: {e}")
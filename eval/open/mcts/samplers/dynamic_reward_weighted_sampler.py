@@ -8,7 +8,7 @@ import tenacity
 from psycopg2.extras import DictCursor
 from tenacity import retry_if_exception_type, wait_exponential
 
-from eval.open.db_client import DBClient
+from eval.open.db_client import DBClient, fetch_program
 from models.program import Program
 from eval.open.mcts.samplers.db_sampler import DBSampler
 
@@ -60,15 +60,14 @@ class DynamicRewardWeightedSampler(DBSampler):
                     with conn.cursor(cursor_factory=DictCursor) as cur:
                         # First get the current step count for adaptive compression
                         if self.compression_strength is None:
-                            cur.execute(f"SELECT COUNT(*) as step_count FROM programs WHERE version = {version}")
-                            step_count = cur.fetchone()['step_count']
+                            step_count = self.db_client.get_program_count(cur, version)
                             # Calculate adaptive compression using sine wave
                             # sin goes from -1 to 1, so we transform to 0 to 1
                             compression_strength = (math.sin(2 * math.pi * step_count / self.adaptive_period) + 1) / 2
                         else:
                             compression_strength = self.compression_strength
 
-                        cur.execute(f"""select max(depth) from programs where version = {version}""")
+                        cur.execute("select max(depth) from programs where version = %s", (version,))
                         max_depth = cur.fetchone()['max']
                         if not max_depth:
                             max_depth = 0
@@ -76,7 +75,7 @@ class DynamicRewardWeightedSampler(DBSampler):
 
                         cur.execute("""
                                 WITH recent AS (
-                                    SELECT id, advantage, conversation_json
+                                    SELECT id, advantage
                                     FROM programs
                                     WHERE version = %s 
                                     AND advantage IS NOT NULL
@@ -132,16 +131,8 @@ class DynamicRewardWeightedSampler(DBSampler):
                                 k=1
                             )[0]
 
-                        # Fetch the selected program
-                        cur.execute("""
-                                SELECT * FROM programs WHERE id = %s
-                                """, (sampled_id,))
-
-                        row = cur.fetchone()
-                        if row:
-                            program = Program.from_row(dict(row))
-                            return program
-                        return None
+                        # Fetch the payload of the selected program only
+                        return fetch_program(cur, sampled_id, self.db_client.program_select_columns)
 
             except Exception as e:
                 print(f"Error sampling parent: {e}")
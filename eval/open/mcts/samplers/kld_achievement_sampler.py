@@ -8,7 +8,7 @@ import tenacity
 from psycopg2.extras import DictCursor
 from tenacity import retry_if_exception_type, wait_exponential
 
-from eval.open.db_client import DBClient
+from eval.open.db_client import DBClient, fetch_program
 from models.program import Program
 from eval.open.mcts.samplers.db_sampler import DBSampler
 
@@ -190,11 +190,8 @@ class KLDiversityAchievementSampler(DBSampler):
                         program_ids = [prog_id for prog_id, _ in diversity_scores]
                         program_id = np.random.choice(program_ids, p=softmax_probs)
 
-                    # Fetch the selected program
-                    cur.execute(f"SELECT * FROM programs WHERE id = {int(program_id)}")
-
-                    row = cur.fetchone()
-                    return Program.from_row(dict(row)) if row else None
+                    # Fetch the payload of the selected program only
+                    return fetch_program(cur, program_id, self.db_client.program_select_columns)
 
         except Exception as e:
             print(f"Error sampling parent: {e}")
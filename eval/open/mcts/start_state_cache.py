@@ -0,0 +1,88 @@
+import asyncio
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Hashable, List, Tuple
+
+from eval.open.mcts.planning_mcts import get_mining_setup
+from models.game_state import GameState
+from instance import FactorioInstance, TICKS_PER_SECOND
+
+
+@dataclass
+class StartStateObservation:
+    """What the planner is told about a start state before any step is taken"""
+    mining_setup: str
+    inventory: Any
+    entities: Any
+
+
+async def reset_instances(instances: List[FactorioInstance], start_state: GameState):
+    """Reset instances to a state concurrently, as each reset mostly waits on its own server"""
+    await asyncio.gather(*(asyncio.to_thread(instance.reset, start_state) for instance in instances))
+
+
+def measure_holdout(instance: FactorioInstance, start_state: GameState, value_accrual_time: float) -> float:
+    """The value a state accrues over `value_accrual_time` seconds of game time, without any program run"""
+    instance.reset(start_state)
+    initial_value, _ = instance.namespace.score()
+    instance.fast_forward(value_accrual_time * TICKS_PER_SECOND)
+    value, _ = instance.namespace.score()
+    return value - initial_value
+
+
+class StartStateCache:
+    """
+    Observations and holdout values of the states that planning iterations start from, keyed by the parent program
+    the state is from (or None for the initial state). Programs don't change once saved, so neither do these.
+
+    Concurrent requests for a holdout value share one measurement. The least recently used `max_entries` of each
+    are kept.
+    """
+
+    def __init__(self, max_entries: int = 64):
+        self.max_entries = max_entries
+        self.observations: OrderedDict[Hashable, StartStateObservation] = OrderedDict()
+        self.holdout_values: OrderedDict[Hashable, asyncio.Future] = OrderedDict()
+
+    def _put(self, cache: OrderedDict, key: Hashable, value):
+        cache[key] = value
+        cache.move_to_end(key)
+        while len(cache) > self.max_entries:
+            cache.popitem(last=False)
+
+    async def observe(self, key: Hashable, instance: FactorioInstance,
+                      start_state: GameState) -> Tuple[StartStateObservation, bool]:
+        """
+        The observation of a start state, and whether `instance` was reset to the state to make it (so that it needn't
+        be reset again). Only a miss resets the instance.
+        """
+        if key in self.observations:
+            self.observations.move_to_end(key)
+            return self.observations[key], False
+
+        await asyncio.to_thread(instance.reset, start_state)
+        observation = StartStateObservation(mining_setup=get_mining_setup(instance),
+                                            inventory=instance.inspect_inventory(),
+                                            entities=GameState.from_instance(instance).entities)
+        self._put(self.observations, key, observation)
+        return observation, True
+
+    async def holdout_value(self, key: Hashable, instance: FactorioInstance, start_state: GameState,
+                            value_accrual_time: float) -> float:
+        """The holdout value of a start state, measured on `instance` if it hasn't been already"""
+        measurement = self.holdout_values.get(key)
+        if measurement is None:
+            measurement = asyncio.ensure_future(
+                asyncio.to_thread(measure_holdout, instance, start_state, value_accrual_time))
+            self._put(self.holdout_values, key, measurement)
+        else:
+            self.holdout_values.move_to_end(key)
+
+        try:
+            # Shielded, so that one waiter being cancelled doesn't cancel the measurement for the others
+            return await asyncio.shield(measurement)
+        except Exception:
+            # Measure again next time, rather than caching the failure
+            if self.holdout_values.get(key) is measurement:
+                del self.holdout_values[key]
+            raise
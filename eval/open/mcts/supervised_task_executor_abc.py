@@ -12,6 +12,7 @@ from models.conversation import Conversation
 from models.generation_parameters import GenerationParameters
 from agents.utils.formatters.conversation_formatter_abc import DefaultFormatter
 from eval.open.db_client import DBClient
+from eval.evaluation_cache import EvaluationCache
 from eval.evaluator import Evaluator
 from eval.open.mcts.grouped_logger import GroupedFactorioLogger
 from eval.open.mcts.parallel_supervised_config import SupervisedExecutorConfig
@@ -87,6 +88,7 @@ class SupervisedTaskExecutorABC(ABC):
         """Create instance groups for parallel execution"""
         instances_per_group = floor(len(instances) / self.config.n_parallel)
         groups = []
+        self.evaluation_cache = EvaluationCache()
 
         for group_id in range(self.config.n_parallel):
             # Slice instances for this group
@@ -103,6 +105,7 @@ class SupervisedTaskExecutorABC(ABC):
                 instances=group_instances,
                 value_accrual_time=3,
                 logger=self.logger,
+                cache=self.evaluation_cache,
             )
 
             groups.append(PlanningGroupV2(
@@ -187,6 +190,7 @@ class SupervisedTaskExecutorABC(ABC):
 
     def cleanup(self):
         """Clean up resources"""
+        print(f"Evaluation cache: {self.evaluation_cache.summary()}")
         self.logger.stop()
         for group in self.instance_groups:
             if hasattr(group.evaluator, 'logger'):
@@ -0,0 +1,320 @@
+"""
+Exports the programs of runs into columnar files, so that analyses can scan columns rather than decode each
+program's JSON.
+
+Each version is written as Parquet parts under `<out_dir>/<version>/`, one per export, named by the range of program
+ids they hold. Exporting again only writes the programs added since, and compacts the parts once there are too many.
+Each program is a row of:
+    id, parent_id (-1 for none), depth, root_id  - the lineage, with programs whose parent isn't in the version as roots
+    value, raw_reward, ticks, holdout_value       - as stored
+    cumulative_reward, cumulative_ticks           - summed along the lineage, from the root to the program
+    has_error                                     - whether the program's response reports an error
+    static_<item>, dynamic_<item>                 - the program's achievements
+    produced_<item>                               - static and dynamic achievements, summed along the lineage
+    meta_<key>                                    - numeric meta values, with nested keys joined by '.'
+
+    python -m eval.open.plots.run_export 488 489 --out-dir run_exports
+
+pyarrow is needed to write and read the files, but not to build the columns.
+"""
+import argparse
+import math
+import os
+import re
+from pathlib import Path
+from typing import Dict, List, Optional, Sequence
+
+import numpy as np
+from dotenv import load_dotenv
+
+from eval.open.db_client import DBClient, PostgresDBClient
+from eval.open.plots.tree_loader import LATE_ID_WINDOW, ProgramRow, ProgramTreeLoader
+
+ERROR_TERMS = ("error", "exception", "failed")
+ACHIEVEMENT_PREFIXES = ("static_", "dynamic_", "produced_")
+# The columns that the programs of later exports are derived from
+LINEAGE_COLUMNS = ("id", "depth", "root_id", "cumulative_reward", "cumulative_ticks")
+PART_PATTERN = re.compile(r"part-(\d+)-(\d+)\.parquet")
+
+
+def _pyarrow():
+    try:
+        import pyarrow
+        import pyarrow.parquet
+    except ImportError as e:
+        raise ImportError("Exporting runs needs pyarrow, from the analysis extra: "
+                          "pip install 'factorio-learning-environment[analysis]'") from e
+    return pyarrow
+
+
+def _flatten(meta: dict, prefix: str = "meta_") -> Dict[str, float]:
+    flat = {}
+    for key, value in meta.items():
+        if isinstance(value, dict):
+            flat.update(_flatten(value, f"{prefix}{key}."))
+        elif isinstance(value, (int, float)):  # Including bools, as 0 or 1
+            flat[f"{prefix}{key}"] = float(value)
+    return flat
+
+
+def _optional(values: list, dtype=np.float64) -> np.ndarray:
+    return np.array([math.nan if value is None else value for value in values], dtype=dtype)
+
+
+def _achievements(rows: List[ProgramRow], attribute: str) -> Dict[str, np.ndarray]:
+    columns = {}
+    for index, row in enumerate(rows):
+        for item, quantity in getattr(row, attribute).items():
+            if item not in columns:
+                columns[item] = np.zeros(len(rows), dtype=np.float64)
+            columns[item][index] = quantity
+    return columns
+
+
+def build_columns(rows: List[ProgramRow], previous: Optional[Dict[str, np.ndarray]] = None) -> Dict[str, np.ndarray]:
+    """
+    The columns of `rows`, which must be in id order.
+
+    :param rows: The programs to build columns for
+    :param previous: The LINEAGE_COLUMNS and produced_<item> columns of the programs already exported from the version,
+        which the lineage of `rows` continues from. They can have higher ids than `rows`, if those committed late.
+    """
+    previous = previous or {}
+    previous_ids = previous.get("id", np.zeros(0, dtype=np.int64))
+    count, offset = len(rows), len(previous_ids)
+
+    ids = np.array([row.id for row in rows], dtype=np.int64)
+    parent_ids = np.array([-1 if row.parent_id is None else row.parent_id for row in rows], dtype=np.int64)
+    raw_rewards = _optional([row.raw_reward for row in rows])
+    ticks = np.array([row.ticks or 0 for row in rows], dtype=np.int64)
+    static = _achievements(rows, "static_achievements")
+    dynamic = _achievements(rows, "dynamic_achievements")
+
+    # Everything that accumulates along the lineage is one matrix, so that each generation is a single operation
+    items = sorted({column[len("produced_"):] for column in previous if column.startswith("produced_")}
+                   | set(static) | set(dynamic))
+    own = np.zeros((count, 2 + len(items)))
+    own[:, 0] = np.nan_to_num(raw_rewards)
+    own[:, 1] = ticks
+    for index, item in enumerate(items):
+        own[:, 2 + index] = static.get(item, 0) + dynamic.get(item, 0)
+
+    cumulative = np.zeros((offset + count, 2 + len(items)))
+    depth = np.zeros(offset + count, dtype=np.int64)
+    root_ids = np.zeros(offset + count, dtype=np.int64)
+    if offset:
+        cumulative[:offset, 0] = previous["cumulative_reward"]
+        cumulative[:offset, 1] = previous["cumulative_ticks"]
+        for index, item in enumerate(items):
+            if f"produced_{item}" in previous:
+                cumulative[:offset, 2 + index] = previous[f"produced_{item}"]
+        depth[:offset] = previous["depth"]
+        root_ids[:offset] = previous["root_id"]
+
+    # Parents are found by binary search over the ids in order
+    all_ids = np.concatenate([previous_ids, ids])
+    order = np.argsort(all_ids, kind="stable")
+    positions = np.minimum(np.searchsorted(all_ids[order], parent_ids), len(all_ids) - 1)
+    parents = order[positions] if count else np.zeros(0, np.int64)
+    has_parent = (all_ids[parents] == parent_ids) if count else np.zeros(0, dtype=bool)
+
+    # Roots (and orphans) first, then each generation once its parents are done
+    done = np.zeros(offset + count, dtype=bool)
+    done[:offset] = True
+    pending = np.arange(count)
+    while len(pending):
+        ready = pending[~has_parent[pending] | done[parents[pending]]]
+        if not len(ready):
+            # A parent with a higher id than its child - treat the rest as roots rather than loop forever
+            has_parent[pending] = False
+            continue
+        rooted = has_parent[ready]
+        targets, sources = offset + ready, parents[ready]
+        cumulative[targets] = own[ready] + np.where(rooted[:, None], cumulative[sources], 0)
+        depth[targets] = np.where(rooted, depth[sources] + 1, 0)
+        root_ids[targets] = np.where(rooted, root_ids[sources], ids[ready])
+        done[targets] = True
+        pending = pending[~done[offset + pending]]
+
+    columns = {
+        "id": ids,
+        "parent_id": parent_ids,
+        "depth": depth[offset:],
+        "root_id": root_ids[offset:],
+        "value": _optional([row.value for row in rows]),
+        "raw_reward": raw_rewards,
+        "ticks": ticks,
+        "cumulative_reward": cumulative[offset:, 0],
+        "cumulative_ticks": cumulative[offset:, 1].astype(np.int64),
+    }
+    if rows and "holdout_value" in rows[0].extra:
+        columns["holdout_value"] = _optional([row.extra["holdout_value"] for row in rows])
+    if rows and "response" in rows[0].extra:
+        columns["has_error"] = np.array([any(term in (row.extra["response"] or "").lower() for term in ERROR_TERMS)
+                                         for row in rows], dtype=bool)
+    columns.update({f"static_{item}": values for item, values in sorted(static.items())})
+    columns.update({f"dynamic_{item}": values for item, values in sorted(dynamic.items())})
+    columns.update({f"produced_{item}": cumulative[offset:, 2 + index] for index, item in enumerate(items)})
+
+    meta = [_flatten(row.extra.get("meta") or {}) for row in rows]
+    for key in sorted({key for values in meta for key in values}):
+        columns[key] = np.array([values.get(key, math.nan) for values in meta], dtype=np.float64)
+    return columns
+
+
+class RunExporter:
+    """Exports versions' programs to Parquet, incrementally (see the module docstring for the columns)"""
+
+    def __init__(self, db_client: DBClient, out_dir: str = "run_exports", max_parts: int = 16,
+                 late_window: int = LATE_ID_WINDOW):
+        """
+        :param db_client: The database to export programs from
+        :param out_dir: Where to write each version's parts
+        :param max_parts: How many parts a version can have before an export compacts them into one
+        :param late_window: How many ids below the highest exported to fetch again, for programs that committed late
+        """
+        self.out_dir = Path(out_dir)
+        self.max_parts = max_parts
+        # The tree loader's cache isn't needed, as the exported parts record what has been loaded
+        self.loader = ProgramTreeLoader(db_client, cache_dir=None, columns=("response", "holdout_value", "meta"),
+                                        late_window=late_window)
+
+    def _parts(self, version: int) -> List[Path]:
+        directory = self.out_dir / str(version)
+        if not directory.exists():
+            return []
+        parts = [path for path in directory.iterdir() if PART_PATTERN.fullmatch(path.name)]
+        return sorted(parts, key=lambda path: int(PART_PATTERN.fullmatch(path.name).group(1)))
+
+    def _write_part(self, path: Path, columns: Dict[str, np.ndarray]):
+        pa = _pyarrow()
+        pa.parquet.write_table(pa.table(columns), path)
+
+    def _read_part(self, path: Path, columns: Optional[Sequence[str]] = None) -> Dict[str, np.ndarray]:
+        table = _pyarrow().parquet.read_table(path, columns=columns)
+        return {name: table.column(name).to_numpy() for name in table.column_names}
+
+    def _part_columns(self, path: Path) -> List[str]:
+        return _pyarrow().parquet.read_schema(path).names
+
+    def high_water(self, version: int) -> int:
+        """The highest program id exported from a version"""
+        return max((int(PART_PATTERN.fullmatch(path.name).group(2)) for path in self._parts(version)), default=0)
+
+    def export(self, version: int, refresh: bool = False) -> Optional[Path]:
+        """
+        Export the programs of a version added since the last export, returning the part written (if any).
+        Programs are assumed not to change once written - pass `refresh=True` to export the version from scratch.
+        """
+        if refresh:
+            for path in self._parts(version):
+                path.unlink()
+
+        # Programs that committed after a previous export, but with lower ids than it reached, are exported late
+        high_water = self.high_water(version)
+        rows = self.loader.fetch(version, after_id=max(high_water - self.loader.late_window, 0))
+        previous = None
+        if high_water:
+            names = {name for path in self._parts(version) for name in self._part_columns(path)}
+            previous = self.read_columns(version, [name for name in sorted(names)
+                                                   if name in LINEAGE_COLUMNS or name.startswith("produced_")])
+            exported = set(previous["id"].tolist())
+            rows = [row for row in rows if row.id not in exported]
+        if not rows:
+            return None
+        columns = build_columns(rows, previous)
+
+        path = self.out_dir / str(version) / f"part-{rows[0].id}-{rows[-1].id}.parquet"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self._write_part(path, columns)
+        if len(self._parts(version)) > self.max_parts:
+            path = self.compact(version)
+        return path
+
+    def compact(self, version: int) -> Optional[Path]:
+        """Merge the parts of a version into one, returning it"""
+        parts = self._parts(version)
+        if len(parts) <= 1:
+            return parts[0] if parts else None
+        columns = self.read_columns(version)
+        path = parts[0].parent / f"part-{columns['id'][0]}-{columns['id'][-1]}.parquet"
+        # Written aside first, as the merged part can have the name of one of the parts it replaces
+        staging = path.with_name(path.name + ".tmp")
+        self._write_part(staging, columns)
+        os.replace(staging, path)
+        for part in parts:
+            if part != path:
+                part.unlink()
+        return path
+
+    def read_columns(self, version: int, columns: Optional[Sequence[str]] = None) -> Dict[str, np.ndarray]:
+        """The exported programs of a version as numpy arrays by column (optionally only some), in id order"""
+        parts = []
+        for path in self._parts(version):
+            # Parts only have the achievement and meta columns of their own programs
+            names = self._part_columns(path)
+            requested = [name for name in columns if name in names] if columns is not None else names
+            parts.append((self._read_part(path, list(dict.fromkeys(["id", *requested]))), requested))
+        if not parts:
+            return {}
+
+        merged = {}
+        for name in dict.fromkeys(name for _, requested in parts for name in requested):
+            dtype = next(part[name].dtype for part, _ in parts if name in part)
+            # Programs from parts without an achievement have none of it, and have no value for a meta key
+            fill = 0 if name.startswith(ACHIEVEMENT_PREFIXES) else math.nan
+            merged[name] = np.concatenate([
+                part[name] if name in part else np.full(len(part["id"]), fill,
+                                                        dtype=dtype if fill == 0 else np.float64)
+                for part, _ in parts
+            ])
+        # Programs exported late are in later parts than programs with higher ids
+        order = np.argsort(np.concatenate([part["id"] for part, _ in parts]), kind="stable")
+        return {name: values[order] for name, values in merged.items()}
+
+    def read(self, version: int, columns: Optional[Sequence[str]] = None):
+        """The exported programs of a version as one pyarrow Table, optionally of only some columns"""
+        return _pyarrow().table(self.read_columns(version, columns))
+
+
+def bootstrap_mean(values: np.ndarray, n_bootstrap: int = 1000, confidence: float = 0.95,
+                   rng: Optional[np.random.Generator] = None) -> Dict[str, float]:
+    """The mean of `values`, with a bootstrapped confidence interval, resampling all at once rather than in a loop"""
+    values = np.asarray(values, dtype=np.float64)
+    if not len(values):
+        return {'mean': 0, 'ci_lower': 0, 'ci_upper': 0, 'std': 0}
+    rng = rng or np.random.default_rng()
+    means = values[rng.integers(0, len(values), size=(n_bootstrap, len(values)))].mean(axis=1)
+    tail = (1 - confidence) / 2 * 100
+    return {
+        'mean': float(values.mean()),
+        'ci_lower': float(np.percentile(means, tail)),
+        'ci_upper': float(np.percentile(means, 100 - tail)),
+        'std': float(values.std()),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Export runs' programs to Parquet for analysis")
+    parser.add_argument("versions", type=int, nargs="+")
+    parser.add_argument("--out-dir", default="run_exports")
+    parser.add_argument("--refresh", action="store_true", help="Export the versions from scratch")
+    args = parser.parse_args()
+
+    load_dotenv()
+    db_client = PostgresDBClient(
+        max_conversation_length=40,
+        host=os.getenv("SKILLS_DB_HOST"),
+        port=os.getenv("SKILLS_DB_PORT"),
+        dbname=os.getenv("SKILLS_DB_NAME"),
+        user=os.getenv("SKILLS_DB_USER"),
+        password=os.getenv("SKILLS_DB_PASSWORD")
+    )
+    exporter = RunExporter(db_client, args.out_dir)
+    for version in args.versions:
+        path = exporter.export(version, refresh=args.refresh)
+        print(f"Version {version}: " + (f"wrote {path}" if path else "up to date"))
+
+
+if __name__ == "__main__":
+    main()
@@ -9,6 +9,7 @@ import matplotlib.pyplot as plt
 import numpy as np
 
 from eval.open.db_client import DBClient
+from eval.open.plots.tree_loader import ProgramRow, ProgramTreeLoader
 
 
 @dataclass
@@ -23,11 +24,14 @@ class Node:
     metrics: Dict
 
 class RunResults:
-    def __init__(self, version: int, db_client: DBClient, neptune_run=None):
+    def __init__(self, version: int, db_client: DBClient, neptune_run=None,
+                 tree_loader: Optional[ProgramTreeLoader] = None):
         self.version = version
         self.db_client = db_client
         self.neptune_run = neptune_run
         self.dir_path = Path(f"runs/{self.version}")
+        # The responses are needed for the success rate
+        self.tree_loader = tree_loader or ProgramTreeLoader(db_client, columns=("response",))
 
     def plot_reward_mean_std(self, root_nodes: List[Node], metric='raw_reward', cumulative=True):
         """
@@ -479,76 +483,37 @@ class RunResults:
         return value, current_set
 
     def _create_trees_from_db(self) -> Tuple[List[Node], Set[int]]:
-        # Get all nodes for this version
-        with self.db_client.get_connection() as conn:
-            with conn.cursor() as cur:
-                print(f"\nExecuting SQL query for version {self.version}")
-                cur.execute(f"""SELECT id, parent_id, code, response, achievements_json, value, raw_reward, ticks 
-                              FROM programs WHERE version = {self.version}""")
-                nodes = cur.fetchall()
-                print(f"Found {len(nodes)} total database rows")
-                if nodes:
-                    print(f"Sample row: {nodes[0]}")
-
-        # Create mapping of nodes
-        node_map: Dict[int, Node] = {}
-        root_nodes: List[Node] = []
-        processed_ids = set()
-
-        print("\nProcessing nodes:")
-        # Create Node objects
-        for node in nodes:
-            id, parent_id, source_code, response, achievements_json, value, raw_reward, ticks = node
-            processed_ids.add(id)
-            print(f"Processing node {id} with parent {parent_id}")
-
-            try:
-                achievements = json.loads(achievements_json) if achievements_json else {}
-            except:
-                achievements = achievements_json
-            # Parse achievements
-            static_achievements = achievements['static'] if achievements else {}
-            dynamic_achievements = achievements['dynamic'] if achievements else {}
+        # Only the programs added since the version was last loaded are fetched
+        tree = self.tree_loader.load(self.version)
+        print(f"Found {len(tree.rows)} programs for version {self.version}")
+
+        def make_node(row: ProgramRow) -> Node:
+            static_achievements = row.static_achievements
+            dynamic_achievements = row.dynamic_achievements
             metrics_dict = {
-                'value': value,
-                'raw_reward': raw_reward,
+                'value': row.value,
+                'raw_reward': row.raw_reward,
                 'dynamic_achievement_count': len(dynamic_achievements),
                 'static_achievement_count': len(static_achievements),
                 'dynamic_achievements': set(dynamic_achievements.keys()),
                 'static_achievements': set(static_achievements.keys()),
                 'achievements': set(static_achievements.keys()).union(set(dynamic_achievements.keys())),
-                'ticks': ticks
+                'ticks': row.ticks
             }
-
-            # Create node
-            node_obj = Node(
-                id=id,
-                parent_id=parent_id,
-                source_code=source_code,
-                response=response,
+            return Node(
+                id=row.id,
+                parent_id=row.parent_id,
+                source_code=row.extra.get('code', ''),
+                response=row.extra.get('response'),
                 static_achievements=static_achievements,
                 dynamic_achievements=dynamic_achievements,
                 children=[],
                 metrics=metrics_dict
             )
-            node_map[id] = node_obj
-
-        print("\nBuilding tree structure:")
-        # Build tree structure
-        for node in node_map.values():
-            if node.parent_id is None or node.parent_id not in node_map:
-                root_nodes.append(node)
-                print(f"Found root node: {node.id}")
-            else:
-                parent = node_map[node.parent_id]
-                parent.children.append(node)
-                print(f"Added node {node.id} as child of {node.parent_id}")
 
-        print(f"\nFinal summary:")
-        print(f"Total nodes processed: {len(processed_ids)}")
+        root_nodes = tree.build(make_node)
         print(f"Root nodes found: {[node.id for node in root_nodes]}")
-
-        return root_nodes, processed_ids
+        return root_nodes, set(tree.rows)
 
     def plot_reward_percentiles(self, root_nodes: List[Node], percentiles=[25, 50, 75], cumulative=True,
                                 metric='raw_reward'):
@@ -15,6 +15,7 @@ from PIL import Image
 
 from eval.open.db_client import DBClient
 from eval.open.plots.run_results import RunResults
+from eval.open.plots.tree_loader import ProgramTreeLoader
 
 load_dotenv()
 
@@ -31,6 +32,8 @@ class Achievement:
 class BaseRunVisualizer(ABC):
     def __init__(self, db_client, icons_path: str, x_axis: Literal["steps", "ticks"] = "steps"):
         self.db_client = db_client
+        # Shared by each version's RunResults, so versions loaded before are only topped up
+        self.tree_loader = ProgramTreeLoader(db_client, columns=("response",))
         self.icons_path = icons_path
         self.version_data = {}
         self.achievements = defaultdict(list)
@@ -41,7 +44,7 @@ class BaseRunVisualizer(ABC):
         """Load data for multiple versions, keeping all runs for each version"""
         for version in versions:
             print(f"\nLoading version {version}")
-            run_results = RunResults(version=version, db_client=self.db_client)
+            run_results = RunResults(version=version, db_client=self.db_client, tree_loader=self.tree_loader)
             root_nodes, processed_ids = run_results._create_trees_from_db()
             print(f"Found {len(root_nodes)} root nodes with {len(processed_ids)} total nodes for version {version}")
             print(f"Root node IDs: {[node.id for node in root_nodes]}")
@@ -793,16 +796,12 @@ class BootstrappedRunVisualizer(MatplotlibRunVisualizer):
                 'std': 0
             }
 
-        bootstrap_means = []
         mean_value = np.mean(values)
         min_value = np.min(values)  # Get minimum value across all runs
 
-        for _ in range(n_bootstrap):
-            sample_idx = np.random.randint(0, len(values), size=len(values))
-            bootstrap_sample = values[sample_idx]
-            bootstrap_means.append(np.mean(bootstrap_sample))
-
-        bootstrap_means = np.array(bootstrap_means)
+        # All the resamples at once, as a matrix of indices
+        sample_idx = np.random.randint(0, len(values), size=(n_bootstrap, len(values)))
+        bootstrap_means = values[sample_idx].mean(axis=1)
 
         return {
             'mean': mean_value,
@@ -0,0 +1,161 @@
+import bisect
+import hashlib
+import json
+import pickle
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Callable, Dict, List, Optional, Sequence, TypeVar
+
+from eval.open.db_client import DBClient, SQLliteDBClient
+
+T = TypeVar("T")
+
+# The columns the plots use - states and conversations are never needed, and are most of each row
+BASE_COLUMNS = ("id", "parent_id", "achievements_json", "value", "raw_reward", "ticks")
+OPTIONAL_COLUMNS = ("response", "code", "holdout_value", "depth", "created_at", "meta")
+
+# Ids are allocated when a program is inserted, but concurrent (and batched) writers can commit them out of order,
+# so programs this far below the high-water mark are fetched again in case they committed after it was loaded
+LATE_ID_WINDOW = 1000
+
+
+@dataclass
+class ProgramRow:
+    id: int
+    parent_id: Optional[int]
+    value: Optional[float]
+    raw_reward: Optional[float]
+    ticks: Optional[int]
+    static_achievements: Dict[str, int]
+    dynamic_achievements: Dict[str, int]
+    extra: Dict[str, object] = field(default_factory=dict)  # Any optional columns requested
+
+
+@dataclass
+class ProgramTree:
+    """The programs of a version, indexed by parent, up to the highest program id loaded (the high-water mark)"""
+    version: int
+    high_water: int = 0
+    rows: Dict[int, ProgramRow] = field(default_factory=dict)
+    children: Dict[Optional[int], List[int]] = field(default_factory=dict)
+
+    def add(self, rows: List[ProgramRow]):
+        for row in rows:
+            if row.id in self.rows:
+                continue
+            self.rows[row.id] = row
+            # Late programs can arrive after their siblings with higher ids
+            bisect.insort(self.children.setdefault(row.parent_id, []), row.id)
+            self.high_water = max(self.high_water, row.id)
+
+    def root_ids(self, orphans_as_roots: bool = True) -> List[int]:
+        """Programs without a parent, and (optionally) those whose parent isn't in the version"""
+        return [id for id, row in self.rows.items()
+                if row.parent_id is None or (orphans_as_roots and row.parent_id not in self.rows)]
+
+    def build(self, make_node: Callable[[ProgramRow], T], orphans_as_roots: bool = True) -> List[T]:
+        """
+        Build the trees of the caller's node type, returning the roots. Nodes must have a `children` list, which
+        is populated in program id order.
+        """
+        nodes = {id: make_node(row) for id, row in self.rows.items()}
+        for parent_id, child_ids in self.children.items():
+            if parent_id in nodes:
+                nodes[parent_id].children.extend(nodes[child_id] for child_id in child_ids)
+        return [nodes[id] for id in self.root_ids(orphans_as_roots)]
+
+
+class ProgramTreeLoader:
+    """
+    Loads the program trees of versions for analysis, fetching only the columns that plots use.
+
+    Trees are kept in memory and pickled to `cache_dir`, with the highest program id loaded. Loading a version
+    again only fetches the programs added since (and the last `late_window` ids before, which may have committed
+    late), so re-plotting a live run doesn't re-read the whole run. Programs are assumed not to change once
+    written - pass `refresh=True` to reload a version from scratch.
+    """
+
+    def __init__(self, db_client: DBClient, cache_dir: Optional[str] = ".tree_cache", columns: Sequence[str] = (),
+                 late_window: int = LATE_ID_WINDOW):
+        """
+        :param db_client: The database to load programs from
+        :param cache_dir: Where to cache trees between runs, or None to only keep them in memory
+        :param columns: Optional columns to load as well (see OPTIONAL_COLUMNS), into each row's `extra`
+        :param late_window: How many ids below the high-water mark to fetch again, for programs that committed late
+        """
+        unknown = set(columns) - set(OPTIONAL_COLUMNS)
+        if unknown:
+            raise ValueError(f"Unknown columns: {sorted(unknown)}")
+        self.db_client = db_client
+        self.columns = tuple(columns)
+        self.cache_dir = Path(cache_dir) if cache_dir else None
+        self.late_window = late_window
+        self.trees: Dict[int, ProgramTree] = {}
+
+    def _cache_path(self, version: int) -> Optional[Path]:
+        if not self.cache_dir:
+            return None
+        # Different databases (and column selections) have their own caches, as version numbers overlap
+        config = {k: v for k, v in self.db_client.db_config.items() if k != "password"}
+        key = json.dumps({"db": config, "columns": self.columns}, sort_keys=True, default=str)
+        return self.cache_dir / f"{hashlib.sha256(key.encode()).hexdigest()[:12]}_{version}.pkl"
+
+    def _read_cache(self, version: int) -> Optional[ProgramTree]:
+        path = self._cache_path(version)
+        if not path or not path.exists():
+            return None
+        try:
+            with open(path, "rb") as f:
+                return pickle.load(f)
+        except Exception as e:
+            print(f"Error loading tree cache {path}: {e}")
+            return None
+
+    def _write_cache(self, tree: ProgramTree):
+        path = self._cache_path(tree.version)
+        if not path:
+            return
+        path.parent.mkdir(parents=True, exist_ok=True)
+        with open(path, "wb") as f:
+            pickle.dump(tree, f)
+
+    def fetch(self, version: int, after_id: int = 0) -> List[ProgramRow]:
+        """The programs of a version with ids above `after_id`, in id order"""
+        placeholder = "?" if isinstance(self.db_client, SQLliteDBClient) else "%s"
+        columns = ", ".join(BASE_COLUMNS + self.columns)
+        with self.db_client.get_connection() as conn:
+            cur = conn.cursor()
+            try:
+                cur.execute(f"SELECT {columns} FROM programs WHERE version = {placeholder} AND id > {placeholder} "
+                            f"ORDER BY id", (version, after_id))
+                results = cur.fetchall()
+            finally:
+                cur.close()
+
+        rows = []
+        for id, parent_id, achievements, value, raw_reward, ticks, *extra in results:
+            # Postgres decodes JSON columns, SQLite leaves them as text
+            if isinstance(achievements, str):
+                achievements = json.loads(achievements)
+            achievements = achievements or {}
+            rows.append(ProgramRow(id=id, parent_id=parent_id, value=value, raw_reward=raw_reward, ticks=ticks,
+                                   static_achievements=achievements.get("static", {}),
+                                   dynamic_achievements=achievements.get("dynamic", {}),
+                                   extra=dict(zip(self.columns, extra))))
+            if isinstance(rows[-1].extra.get("meta"), str):
+                rows[-1].extra["meta"] = json.loads(rows[-1].extra["meta"])
+        return rows
+
+    def load(self, version: int, refresh: bool = False) -> ProgramTree:
+        """The tree of a version, up to date with the database"""
+        tree = None
+        if not refresh:
+            tree = self.trees.get(version) or self._read_cache(version)
+        tree = tree or ProgramTree(version=version)
+
+        count = len(tree.rows)
+        tree.add(self.fetch(version, max(tree.high_water - self.late_window, 0)))
+        if len(tree.rows) > count or refresh:
+            self._write_cache(tree)
+        self.trees[version] = tree
+        return tree
@@ -11,6 +11,7 @@ from dotenv import load_dotenv
 from matplotlib import image as mpimg
 
 from eval.open.db_client import DBClient
+from eval.open.plots.tree_loader import ProgramTreeLoader
 from eval.open.independent_runs.value_calculator import ValueCalculator
 
 load_dotenv()
@@ -197,6 +198,7 @@ class ProgressionVisualizer:
                  cache_file: str = "viz_cache_combined.pkl", x_base: float = 10, y_base: float = 10,
                  use_value_gdp=False, recipes_file="recipes.jsonl", use_log_scale: bool = True):
         self.db_client = db_client
+        self.tree_loader = ProgramTreeLoader(db_client)
         self.icons_path = icons_path
         self.x_axis = x_axis
         self.cache_file = cache_file
@@ -355,37 +357,16 @@ class ProgressionVisualizer:
 
 
     def _load_version_from_db(self, version: int) -> List[Node]:
-        """Load all trajectories for a version from database"""
-        with self.db_client.get_connection() as conn:
-            with conn.cursor() as cur:
-                cur.execute("""
-                    SELECT id, parent_id, achievements_json, value, ticks 
-                    FROM programs WHERE version = %s
-                """, (version,))
-                rows = cur.fetchall()
-
-        # Build node tree
-        nodes = {}
-        roots = []
-        for id, parent_id, achievements, value, ticks in rows:
-            node = Node(
-                id=id,
-                parent_id=parent_id,
-                metrics={'value': value or 0, 'ticks': ticks or 0},
-                static_achievements=achievements.get('static', {}),
-                dynamic_achievements=achievements.get('dynamic', {}),
-                children=[]
-            )
-            nodes[id] = node
-
-        # Connect nodes
-        for node in nodes.values():
-            if node.parent_id is None:
-                roots.append(node)
-            elif node.parent_id in nodes:
-                nodes[node.parent_id].children.append(node)
-
-        return roots
+        """Load all trajectories for a version, fetching only the programs added since it was last loaded"""
+        tree = self.tree_loader.load(version)
+        return tree.build(lambda row: Node(
+            id=row.id,
+            parent_id=row.parent_id,
+            metrics={'value': row.value or 0, 'ticks': row.ticks or 0},
+            static_achievements=row.static_achievements,
+            dynamic_achievements=row.dynamic_achievements,
+            children=[]
+        ), orphans_as_roots=False)
 
     def _calculate_gdp(self, root: Node) -> float:
         """Calculate GDP for a trajectory using either method"""
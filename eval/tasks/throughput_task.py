@@ -1,8 +1,8 @@
 from typing import Any, Dict, List, Union
 from env.src.entities import Inventory, Entity
-from env.src.instance import FactorioInstance
+from env.src.instance import FactorioInstance, TICKS_PER_SECOND
 from eval.tasks.task_abc import TaskABC
-from env.src.utils.achievements import eval_program_with_achievements
+from env.src.utils.achievements import fast_forward_with_achievements
 from models.game_state import GameState
 import copy
 from agents import TaskResponse
@@ -92,7 +92,8 @@ class ThroughputTask(TaskABC):
         # wait the pre-holdout period
         #instance.namespace.sleep(self.pre_holdout_wait_period)
         while True:
-            result_list, result, error,  achievements = eval_program_with_achievements(program = f"sleep({self.holdout_wait_period})", instance=instance)
+            # Measured over a fixed number of ticks, so the throughput doesn't depend on the game speed or host load
+            achievements = fast_forward_with_achievements(instance, self.holdout_wait_period * TICKS_PER_SECOND)
             if max_achievements is None:
                 max_achievements = achievements
             dynamic_achievements = achievements["dynamic"]
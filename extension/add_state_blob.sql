@@ -0,0 +1,10 @@
+/* Adds the column that binary state snapshots are stored in (see GameState.to_binary) to a programs table created
+   before it existed. It is needed to write binary states (binary_state=True); without it, clients only read and
+   write state_json. */
+
+/* Postgres */
+ALTER TABLE programs ADD COLUMN IF NOT EXISTS state_blob BYTEA;
+
+/* SQLite (which has no IF NOT EXISTS for columns - skip this if the table already has it):
+ALTER TABLE programs ADD COLUMN state_blob BLOB;
+*/
@@ -6,6 +6,7 @@ CREATE TABLE programs (
     visits INTEGER DEFAULT 0,
     parent_id INTEGER,
     state_json TEXT,
+    state_blob BLOB,
     conversation_json TEXT NOT NULL,
     completion_token_usage INTEGER,
     prompt_token_usage INTEGER,